@@ -583,6 +583,9 @@ int ca_sg_stat (CA_SYNC_GID gid);
 struct ca_client_context * ca_current_context ();
 int ca_attach_context ( struct ca_client_context * context );
 
+/* returns non-zero if the current context has preemptive callback enabled */
+int ca_preemtive_callback_is_enabled ( void );
+
 
 int ca_client_status ( unsigned level );
 int ca_context_status ( struct ca_client_context *, unsigned level );
@@ -0,0 +1,161 @@
+"""
+Batched delivery of connection changes on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import threading
+import time
+
+from . import ca
+from ._ca import libca
+
+__all__ = ['ConnectionBatcher']
+
+
+class ConnectionBatcher(object):
+    """
+    :param callback:       User function called with a list of (chid, :class:`caffi.constants.CA_OP`) tuples,
+                           the connection changes of a batch in the order of arrival.
+    :param float interval: Batch window in seconds, counted from the first change of the batch.
+                           If it is None or 0, changes are only delivered when :meth:`dispatch` is called.
+    :param int max_size:   Maximum number of changes in a batch. A full batch is delivered without waiting
+                           for the end of the window.
+
+    A connection callback, to be passed to :func:`caffi.ca.create_channel` or :func:`caffi.ca.change_connection_event`,
+    which only queues the changes in the CA callback thread. The user function is called once per batch
+    from the dispatcher thread, so that a reconnection storm of thousands of channels costs one call per batch
+    instead of one call per channel. The same batcher can be shared by any number of channels.
+
+    The dispatcher thread joins the CA context of the thread creating the batcher.
+    Therefore it requires a preemptive context. If the user function raises an exception,
+    the dispatcher counts it and carries on with the next batch.
+    ::
+
+        >>> def on_changes(changes):
+        ...     up = sum(1 for chid, op in changes if op == CA_OP.CONN_UP)
+        ...     print('%d connected, %d disconnected' % (up, len(changes) - up))
+        >>> batcher = ConnectionBatcher(on_changes, interval=0.01)
+        >>> chids = [ca.create_channel(name, batcher)[1] for name in names]
+
+    The changes of a channel cleared meanwhile are still delivered.
+
+    The counters,
+
+    ==========  =============
+    attribute   value
+    ==========  =============
+    changes     number of changes delivered
+    batches     number of calls of the user function
+    errors      number of calls of the user function from the dispatcher thread which raised an exception
+    ==========  =============
+
+    :raises RuntimeError: if *interval* is given and the calling thread has no preemptive CA context.
+    """
+    def __init__(self, callback, interval=0.01, max_size=1000):
+        self.callback = callback
+        self.interval = interval
+        self.max_size = max_size
+
+        self.changes = 0
+        self.batches = 0
+        self.errors = 0
+
+        self._queue = []
+        # protects the queue and notifies the dispatcher
+        self._ready = threading.Condition(threading.Lock())
+        # serializes the deliveries, so that batches are delivered in order
+        self._dispatch_lock = threading.Lock()
+
+        self._stopped = False
+        self._thread = None
+        if interval:
+            self._context = ca.current_context()
+            if self._context is None or not libca.ca_preemtive_callback_is_enabled():
+                raise RuntimeError('The calling thread has no preemptive CA context')
+            self._thread = threading.Thread(target=self._run, name='ConnectionBatcher')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, epics_arg):
+        # called from the CA callback thread, only queue the change
+        with self._ready:
+            self._queue.append((epics_arg['chid'], epics_arg['op']))
+            if len(self._queue) == 1 or len(self._queue) >= self.max_size:
+                self._ready.notify()
+
+    def _run(self):
+        # the context was checked to be preemptive
+        ca.attach_context(self._context)
+
+        while True:
+            with self._ready:
+                while not self._queue and not self._stopped:
+                    self._ready.wait()
+                if self._stopped:
+                    break
+                # collect the changes arriving within the window
+                deadline = time.time() + self.interval
+                while len(self._queue) < self.max_size and not self._stopped:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+            # the changes not delivered yet are queued again, and go with the next batch
+            while True:
+                try:
+                    self.dispatch()
+                    break
+                except Exception:
+                    self.errors += 1
+
+        ca.detach_context()
+
+    def pending(self):
+        """
+        :return: Number of changes waiting to be delivered.
+        """
+        return len(self._queue)
+
+    def dispatch(self):
+        """
+        Deliver the queued changes now, in batches of at most *max_size*.
+        If the user function raises an exception, the changes of the following batches are queued again.
+
+        :return: Number of changes delivered
+        """
+        with self._dispatch_lock:
+            with self._ready:
+                queue, self._queue = self._queue, []
+
+            for start in range(0, len(queue), self.max_size):
+                batch = queue[start:start + self.max_size]
+                self.batches += 1
+                self.changes += len(batch)
+                try:
+                    self.callback(batch)
+                except Exception:
+                    # the batch counts as delivered, the following ones are queued again
+                    with self._ready:
+                        self._queue[:0] = queue[start + self.max_size:]
+                    raise
+
+            return len(queue)
+
+    def close(self):
+        """
+        Stop the dispatcher thread and deliver the remaining changes.
+        Changes arriving afterwards are only delivered by :meth:`dispatch`.
+        """
+        if self._thread is not None:
+            with self._ready:
+                self._stopped = True
+                self._ready.notify()
+            self._thread.join()
+            self._thread = None
+        self.dispatch()
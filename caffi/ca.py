@@ -112,28 +112,56 @@ from __future__ import (print_function, absolute_import)
 import sys
 
 if sys.hexversion < 0x03030000:
-    from collections import Sequence
+    from collections import Sequence, Set
 else:
-    from collections.abc import Sequence
+    from collections.abc import Sequence, Set
 
+import collections
+import itertools
 import numbers
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import Future
 
 from .compat import *
 from ._ca import *
 from .constants import *
 from .dbr import *
+from .dbr import has_numpy, numpy, ctype2dtype, dbr_time_struct, dbr_time_dtype, STAMP_NOT_COMPLETED
 from .macros import *
 
 __all__ = ['create_context', 'current_context', 'attach_context', 'detach_context', 'destroy_context', 'show_context',
-           'add_exception_event', 'replace_access_rights_event', 'change_connection_event',
-           'create_channel', 'clear_channel', 'get', 'put', 'create_subscription', 'clear_subscription',
+           'add_exception_event', 'replace_access_rights_event', 'change_connection_event', 'set_value_cache',
+           'create_channel', 'create_channels', 'clear_channel', 'connect_async',
+           'get', 'get_many', 'get_async', 'put', 'put_many', 'put_many_async', 'put_async',
+           'create_subscription', 'clear_subscription', 'subscription_count',
            'field_type', 'element_count', 'name', 'state', 'host_name', 'read_access', 'write_access',
-           'pend_event', 'pend_io', 'poll', 'pend', 'flush_io', 'test_io', 'message',
+           'connection_counts', 'channels_in_state', 'connection_generation', 'connection_statistics',
+           'circuit_statistics',
+           'pend_event', 'pend_io', 'poll', 'pend', 'flush_io', 'test_io', 'message', 'wait_all',
            'sg_create', 'sg_delete', 'sg_get', 'sg_put', 'sg_reset', 'sg_block', 'sg_test', 'version']
 
 # globals
-__channels = {}
-__exception_callback = {}
+#
+# The channels are kept in the registry of the CA context which created them.
+# The registries are shared by user threads and CA callback threads without lock. Each access is a single
+# dict or set operation, which is atomic, and whoever pops an entry owns it, e.g. clears the channel
+# or calls the callback. A lock must not be held across the library calls which wait for the callbacks
+# in progress, e.g. ca_clear_channel, otherwise a callback taking the same lock would deadlock.
+#
+# CA context -> _ContextRegistry
+__registries = {}
+# registry of the CA context of each thread, which saves looking up the context on each call
+__thread_registry = threading.local()
+__put_completions = {}
+__value_cache = None
+# (server host name, priority) -> traffic counters of the circuit
+__circuits = {}
+__circuits_lock = threading.Lock()
+
+# the channels of a thread without CA context, never modified
+_NO_CHANNELS = {}
 
 DBR_TYPE_STRING = {
     DBR.STRING:   'dbr_string_t',
@@ -147,6 +175,100 @@ DBR_TYPE_STRING = {
     DBR.PUT_ACKS: 'dbr_put_acks_t',
 }
 
+# struct format characters of buffer items that can be written without conversion
+DBR_BUFFER_FORMAT = {
+    DBR.INT:      ('h',),
+    DBR.FLOAT:    ('f',),
+    DBR.CHAR:     ('B', 'b', 'c'),
+    DBR.ENUM:     ('H',),
+    DBR.LONG:     ('i', 'l'),
+    DBR.DOUBLE:   ('d',),
+}
+
+
+class _ContextRegistry(object):
+    """
+    Bookkeeping of the channels created within one CA context.
+    """
+    __slots__ = ('context', 'channels', 'subscriptions', 'exception_callback', 'destroyed',
+                 'connection_lock', 'connection_index', 'unwatched', 'connection_generation')
+
+    def __init__(self, context):
+        self.context = context
+        # chid -> channel
+        self.channels = {}
+        # evid -> chid of the subscriptions
+        self.subscriptions = {}
+        # handle of the exception callback, kept so that it is not garbage collected
+        self.exception_callback = None
+        self.destroyed = False
+
+        # connection state index
+        # reentrant, so that the unwatched channels are promoted while holding it
+        self.connection_lock = threading.RLock()
+        self.connection_index = {
+            ChannelState.NEVER_CONN: set(),
+            ChannelState.CONN: set(),
+            ChannelState.PREV_CONN: set(),
+        }
+        # never connected channels without connection handler, notified by their access rights handler instead
+        self.unwatched = set()
+        self.connection_generation = 0
+
+
+def _registry(create=False):
+    """
+    Return the registry of the calling thread's CA context, or None if there is none.
+    If *create* is True, the registry of a context which has no channel yet is created.
+    """
+    registry = getattr(__thread_registry, 'registry', None)
+    if registry is not None and not registry.destroyed:
+        return registry
+
+    context = libca.ca_current_context()
+    if context == ffi.NULL:
+        return None
+    registry = __registries.get(context)
+    if registry is None:
+        if not create:
+            return None
+        registry = __registries.setdefault(context, _ContextRegistry(context))
+    __thread_registry.registry = registry
+    return registry
+
+
+def _channels():
+    """
+    Return the channels of the calling thread's CA context.
+    """
+    registry = _registry()
+    if registry is None:
+        return _NO_CHANNELS
+    return registry.channels
+
+
+def _release_registry(registry):
+    """
+    Release in bulk the bookkeeping of the channels of a destroyed context.
+    """
+    __registries.pop(registry.context, None)
+    registry.destroyed = True
+
+    channels, registry.channels = registry.channels, {}
+    registry.subscriptions = {}
+    registry.exception_callback = None
+    with registry.connection_lock:
+        for chids in registry.connection_index.values():
+            chids.clear()
+        registry.unwatched.clear()
+        registry.connection_generation += 1
+
+    for chid, channel in channels.items():
+        if __value_cache is not None:
+            __value_cache.discard(chid, cleared=True)
+        _resolve_connect_futures(channel, ECA.CHANDESTROY)
+    _abandon_requests(channels)
+
 
 @ffi.callback('void(*)(struct exception_handler_args)')
 def _exception_callback(arg):
@@ -220,8 +342,9 @@ def add_exception_event(callback=None):
 
     # keep a reference to the returned pointer of (callback, args),
     # otherwise it will be garbage collected
-    context = libca.ca_current_context()
-    __exception_callback[context] = callback_handle
+    registry = _registry(create=True)
+    if registry is not None:
+        registry.exception_callback = callback_handle
 
     return ECA(status)
 
@@ -239,6 +362,7 @@ def create_context(preemptive_callback=True):
     making any of the other Channel Access calls. If one of the above is not called before
     making other CA calls then a non-preemptive context is created by default,
     and future attempts to create a preemptive context for the current threads will fail.
+    :class:`caffi.context.ContextExecutor` provides thread pools whose threads are attached once when they start.
 
     If preemptive callback is disabled then additional threads are not allowed to
     join the CA context using :func:`attach_context` because allowing other threads to join implies
@@ -265,13 +389,19 @@ def destroy_context():
     such as sockets and allocated memory are automatically released by the system when the process exits and
     :func:`destroy_context` hasn't been called, but on light weight systems such as vxWorks or RTEMS
     no cleanup occurs unless the application calls :func:`destroy_context`.
+
+    The channels and subscriptions of the context are released together with it,
+    and the pending :func:`connect_async`, :func:`get_async`, :func:`put_async` and :func:`put_many_async`
+    futures of its channels complete with :data:`ECA.CHANDESTROY`.
     """
-    context = libca.ca_current_context()
-    if context != ffi.NULL and context in __exception_callback:
-        del __exception_callback[context]
+    registry = _registry()
 
     libca.ca_context_destroy()
 
+    __thread_registry.registry = None
+    if registry is not None:
+        _release_registry(registry)
+
 
 def attach_context(context):
     """
@@ -287,6 +417,8 @@ def attach_context(context):
     from more than one thread.
     """
     status = libca.ca_attach_context(context)
+    if status == ECA_NORMAL:
+        __thread_registry.registry = None
     return ECA(status)
 
 
@@ -297,6 +429,7 @@ def detach_context():
     This does not cleanup or shutdown any currently attached CA context.
     """
     libca.ca_detach_context()
+    __thread_registry.registry = None
 
 
 def current_context():
@@ -324,23 +457,204 @@ def show_context(context=None, level=0):
         libca.ca_context_status(context, level)
 
 
+def _set_connection_state(chid, state, watched=True, registry=None):
+    """
+    Move the channel to the set of the state in the connection index, or remove it if *state* is None.
+    The registry is that of the calling thread's CA context, unless given.
+    """
+    if registry is None:
+        registry = _registry()
+        if registry is None:
+            return
+
+    with registry.connection_lock:
+        index = registry.connection_index
+        if state is not None and chid in index[state]:
+            if watched:
+                registry.unwatched.discard(chid)
+            return
+        for channels in index.values():
+            channels.discard(chid)
+        if state is not None:
+            index[state].add(chid)
+        if watched:
+            registry.unwatched.discard(chid)
+        else:
+            registry.unwatched.add(chid)
+        registry.connection_generation += 1
+
+    channel = registry.channels.get(chid)
+    if channel is not None:
+        _record_connection_state(chid, channel, state)
+
+
+class _ConnectionStatistics(object):
+    """
+    Connection history of a channel.
+    """
+    __slots__ = ('host', 'created', 'connected', 'disconnects', 'reconnects', 'downtime', 'down_since')
+
+    def __init__(self, created):
+        self.host = None
+        self.created = created
+        self.connected = None
+        self.disconnects = 0
+        self.reconnects = 0
+        self.downtime = 0.
+        self.down_since = None
+
+
+class _CircuitTraffic(object):
+    """
+    Traffic counters of the channels connected to one server at one priority.
+
+    The counters of requests issued are updated by user threads, and those of replies by the CA callbacks,
+    all under the lock, since the circuits are shared by the contexts, whose callbacks run concurrently.
+    """
+    __slots__ = ('host', 'priority', 'since', 'lock', 'gets', 'puts', 'get_callbacks', 'put_callbacks',
+                 'events', 'bytes', 'gets_completed', 'puts_completed')
+
+    def __init__(self, host, priority):
+        self.host = host
+        self.priority = priority
+        self.since = time.time()
+        self.lock = threading.Lock()
+        self.gets = 0
+        self.puts = 0
+        self.get_callbacks = 0
+        self.put_callbacks = 0
+        self.events = 0
+        self.bytes = 0
+        self.gets_completed = 0
+        self.puts_completed = 0
+
+    def add_gets(self, count, callbacks=0):
+        with self.lock:
+            self.gets += count
+            self.get_callbacks += callbacks
+
+    def add_puts(self, count, callbacks=0):
+        with self.lock:
+            self.puts += count
+            self.put_callbacks += callbacks
+
+    def add_get_reply(self, size):
+        with self.lock:
+            self.gets_completed += 1
+            self.bytes += size
+
+    def add_put_reply(self):
+        with self.lock:
+            self.puts_completed += 1
+
+    def add_event(self, size):
+        with self.lock:
+            self.events += 1
+            self.bytes += size
+
+
+def _circuit(host, priority):
+    key = (host, priority)
+    circuit = __circuits.get(key)
+    if circuit is None:
+        with __circuits_lock:
+            circuit = __circuits.setdefault(key, _CircuitTraffic(host, priority))
+    return circuit
+
+
+def _channel_circuit(chid, channel):
+    """
+    Return the circuit of the channel, looking it up if it has connected since the last use.
+    Return None if the channel is disconnected.
+    """
+    circuit = channel['circuit']
+    if circuit is None and libca.ca_state(chid) == cs_conn:
+        statistics = channel['statistics']
+        statistics.host = host_name(chid)
+        circuit = channel['circuit'] = _circuit(statistics.host, channel['priority'])
+    return circuit
+
+
+def _record_connection_state(chid, channel, state):
+    statistics = channel['statistics']
+    now = time.time()
+    if state == ChannelState.CONN:
+        now = channel.pop('connecting', None) or now
+        if statistics.connected is None:
+            statistics.connected = now
+        else:
+            statistics.reconnects += 1
+        if statistics.down_since is not None:
+            statistics.downtime += now - statistics.down_since
+            statistics.down_since = None
+        # the server may have changed, the circuit is looked up again on first use, see _channel_circuit
+        channel['circuit'] = None
+    elif state == ChannelState.PREV_CONN:
+        statistics.disconnects += 1
+        statistics.down_since = now
+
+
+def _check_unwatched(registry):
+    """
+    Channels created without callback have no connection handler until they have connected,
+    check them and install the connection handler for those which have connected.
+    Their access rights handler does so as well, this only catches up in the calling thread.
+    The lock keeps the channels from being cleared meanwhile.
+    """
+    with registry.connection_lock:
+        for chid in list(registry.unwatched):
+            if libca.ca_state(chid) == cs_conn:
+                _update_plan(chid)
+
+
+def _resolve_connect_futures(channel, status):
+    # Whoever pops a future from the queue completes it, so each is completed once.
+    futures = channel.get('connect_futures')
+    while futures:
+        try:
+            future = futures.popleft()
+        except IndexError:
+            break
+        future.set_result(status)
+
+
+# connection operations, looked up without enum conversion for each change
+_CONNECTION_OPS = {
+    CA_OP_CONN_UP: CA_OP.CONN_UP,
+    CA_OP_CONN_DOWN: CA_OP.CONN_DOWN,
+}
+
+
 @ffi.callback('void(*)(struct connection_handler_args)')
 def _connect_callback(arg):
-    epics_arg = {
-        'chid': arg.chid,
-        'op':   CA_OP(arg.op)
-    }
-
     # If chid is not in cache, it well indicates
     # that the python object has been garbage collected.
     # Then don't try to call from_handle, that is undefined and may crash.
-    if arg.chid not in __channels:
+    channel = _channels().get(arg.chid)
+    if channel is None:
         return
 
-    user_callback = __channels[arg.chid]['connection_callback']
+    # Native type and element count might have changed after reconnection. The plan and the circuit are rebuilt
+    # on first use, not to delay the other callbacks of the context with channels which are not used meanwhile.
+    if arg.op == CA_OP_CONN_UP:
+        # the handler is installed, from now on it follows the connection changes
+        channel['tracked'] = True
+        channel['plan'] = None
+        _set_connection_state(arg.chid, ChannelState.CONN)
+        _resolve_connect_futures(channel, ECA.NORMAL)
+    else:
+        _set_connection_state(arg.chid, ChannelState.PREV_CONN)
+        channel['plan'] = None
+        if __value_cache is not None:
+            __value_cache.discard(arg.chid)
+
+    user_callback = channel['connection_callback']
 
     if callable(user_callback):
-        user_callback(epics_arg)
+        user_callback({
+            'chid': arg.chid,
+            'op':   _CONNECTION_OPS[arg.op]
+        })
 
 
 def create_channel(name, callback=None, priority=CA_PRIORITY.DEFAULT):
@@ -425,21 +739,92 @@ def create_channel(name, callback=None, priority=CA_PRIORITY.DEFAULT):
     else:
         connect_callback = ffi.NULL
 
+    created = time.time()
     status = libca.ca_create_channel(name, connect_callback, ffi.NULL, priority, pchid)
     if status != ECA_NORMAL:
         return ECA(status), None
 
     chid = pchid[0]
-    __channels[chid] = {'callbacks': set(), 'monitors': {}}
-
-    if callable(callback):
-        __channels[chid]['connection_callback'] = callback
-    else:
-        __channels[chid]['connection_callback'] = None
+    # handle -> handle of outstanding get and put callbacks
+    channel = {'callbacks': {}, 'plan': None, 'tracked': False,
+               # evid -> handle, and the set of handles of the subscriptions
+               'monitors': {}, 'monitor_handles': set(),
+               'statistics': _ConnectionStatistics(created), 'priority': int(priority), 'circuit': None,
+               'connection_callback': callback if callable(callback) else None}
+    # the context is created implicitly by the first channel if there is none yet
+    registry = _registry(create=True)
+    # the connection handler may run as soon as the channel is registered
+    _set_connection_state(chid, ChannelState.NEVER_CONN, callable(callback), registry)
+    registry.channels[chid] = channel
+    if not callable(callback):
+        # notified of the first connection by the access rights handler instead
+        libca.ca_replace_access_rights_event(chid, _access_rights_callback)
 
     return ECA(status), chid
 
 
+def create_channels(names, timeout=1.0, priority=CA_PRIORITY.DEFAULT):
+    """
+    Create many channels and wait until all of them have connected or the timeout expires.
+
+    :param names:    Sequence of process variable names
+    :param timeout:  Time in seconds to wait for the connections.
+    :param priority: The priority level, see :func:`create_channel`
+    :type names:     list, tuple
+    :type timeout:   float
+    :type priority:  int, :class:`CA_PRIORITY`
+    :return: (dict of name to channel identifier of the connected channels, list of names not connected)
+
+    All channels are created with one shared connection handler, which counts down the connections.
+    It returns as soon as all channels have connected, so that the wait is bounded by *timeout*
+    even if some names do not exist, and the missing names are known. The channels not connected are cleared.
+    Unlike :func:`pend_io`, this also works in a non preemptive context by processing the callbacks.
+
+    """
+    names = list(collections.OrderedDict.fromkeys(names))
+    connected = {}
+    missing = []
+    if not names:
+        return connected, missing
+
+    done = Future()
+    countdown = itertools.count(1)
+    connected_chids = set()
+
+    def connection_callback(epics_arg):
+        # reconnections during the wait must not be counted again
+        if epics_arg['op'] == CA_OP.CONN_UP and epics_arg['chid'] not in connected_chids:
+            connected_chids.add(epics_arg['chid'])
+            if next(countdown) == len(names):
+                done.set_result(ECA.NORMAL)
+
+    chids = []
+    for name in names:
+        status, chid = create_channel(name, connection_callback, priority)
+        if status != ECA_NORMAL:
+            missing.append(name)
+            if next(countdown) == len(names):
+                done.set_result(ECA.NORMAL)
+        else:
+            chids.append((name, chid))
+
+    wait_all([done], timeout)
+
+    for name, chid in chids:
+        if libca.ca_state(chid) == cs_conn:
+            # keep the internal connection handler, so that pend_io does not wait for the channel
+            channel = _channels()[chid]
+            channel['connection_callback'] = None
+            channel['tracked'] = True
+            connected[name] = chid
+        else:
+            clear_channel(chid)
+            missing.append(name)
+    libca.ca_flush_io()
+
+    return connected, missing
+
+
 def change_connection_event(chid, callback=None):
     """
     Change the connection event callback function.
@@ -453,36 +838,94 @@ def change_connection_event(chid, callback=None):
         - :data:`ECA.BADCHID` - Corrupted CHID
 
     """
-    if chid not in __channels:
+    channel = _channels().get(chid)
+    if channel is None:
         return ECA.BADCHID
 
     if callable(callback):
-        __channels[chid]['connection_callback'] = callback
+        channel['connection_callback'] = callback
         status = libca.ca_change_connection_event(chid, _connect_callback)
+    elif channel['tracked']:
+        # keep the internal connection handler
+        channel['connection_callback'] = None
+        status = ECA_NORMAL
     else:
-        __channels[chid]['connection_callback'] = None
+        channel['connection_callback'] = None
         status = libca.ca_change_connection_event(chid, ffi.NULL)
 
     # store the reference so it won't be garbage collected
     return ECA(status)
 
 
+def connect_async(chid):
+    """
+    Get notified when a channel has connected.
+
+    :param chid: Channel identifier
+    :return: :class:`concurrent.futures.Future`, whose result is :class:`ECA`
+
+        - :data:`ECA.NORMAL` - The channel is connected
+        - :data:`ECA.BADCHID` - Corrupted CHID
+        - :data:`ECA.CHANDESTROY` - The channel was cleared before it connected
+
+    The future is completed immediately if the channel is already connected,
+    otherwise from the connection handler when the channel connects.
+    Like a channel created with a callback, :func:`pend_io` no longer waits for this channel to connect.
+
+    """
+    future = Future()
+    channel = _channels().get(chid)
+    if channel is None:
+        future.set_result(ECA.BADCHID)
+        return future
+
+    futures = channel.setdefault('connect_futures', collections.deque())
+    futures.append(future)
+    if channel['connection_callback'] is None and not channel['tracked']:
+        channel['tracked'] = True
+        libca.ca_change_connection_event(chid, _connect_callback)
+        _set_connection_state(chid, ChannelState.NEVER_CONN)
+
+    if libca.ca_state(chid) == cs_conn:
+        _set_connection_state(chid, ChannelState.CONN)
+        try:
+            futures.remove(future)
+        except ValueError:
+            # already completed by the connection handler
+            pass
+        else:
+            future.set_result(ECA.NORMAL)
+
+    return future
+
+
 @ffi.callback('void(*)(struct access_rights_handler_args)')
 def _access_rights_callback(arg):
-    epics_arg = {
-        'chid': arg.chid,
-        'read_access': arg.ar.access & 0x01 == 0x01,
-        'write_access': arg.ar.access & 0x02 == 0x02
-    }
     # If chid is not in cache, it well indicates
     # that the python object has been garbage collected.
     # Then don't try to call from_handle, that is undefined and may crash.
-    if arg.chid not in __channels:
+    channel = _channels().get(arg.chid)
+    if channel is None:
         return
 
-    callback = __channels[arg.chid]['access_rights_callback']
+    # Channels created without connection handler, not to affect pend_io, learn of their first connection here.
+    # The handler is called as the channel connects, before its state is updated, and installing the connection handler
+    # then delivers the connection to it. Installed on an already connected channel, it is called at once.
+    if not channel['tracked'] and channel['connection_callback'] is None:
+        if libca.ca_state(arg.chid) == cs_conn:
+            _update_plan(arg.chid)
+        else:
+            # the time of the connection, should pend_io notice it before the connection handler is called
+            channel['connecting'] = time.time()
+            libca.ca_change_connection_event(arg.chid, _connect_callback)
+
+    callback = channel.get('access_rights_callback')
     if callable(callback):
-        callback(epics_arg)
+        callback({
+            'chid': arg.chid,
+            'read_access': arg.ar.access & 0x01 == 0x01,
+            'write_access': arg.ar.access & 0x02 == 0x02
+        })
 
 
 def replace_access_rights_event(chid, callback=None):
@@ -514,44 +957,157 @@ def replace_access_rights_event(chid, callback=None):
         - once immediately after installation if the channel is connected.
         - whenever the access rights state of a connected channel changes
 
-    When a channel is created no access rights handler is installed.
+    When a channel is created no user access rights handler is installed.
     """
-    if chid not in __channels:
+    channel = _channels().get(chid)
+    if channel is None:
         return ECA.BADCHID
 
     if callable(callback):
-        __channels[chid]['access_rights_callback'] = callback
+        channel['access_rights_callback'] = callback
         status = libca.ca_replace_access_rights_event(chid, _access_rights_callback)
     else:
-        __channels[chid]['access_rights_callback'] = None
-        status = libca.ca_replace_access_rights_event(chid, ffi.NULL)
+        channel['access_rights_callback'] = None
+        if channel['tracked'] or channel['connection_callback'] is not None:
+            status = libca.ca_replace_access_rights_event(chid, ffi.NULL)
+        else:
+            # the internal handler stays until the first connection
+            status = ECA_NORMAL
 
     return ECA(status)
 
 
+class _ChannelPlan(object):
+    """
+    Native type and element count of a connected channel, together with the C types
+    used to issue requests of the native type. It saves the FFI calls for each request.
+    """
+    __slots__ = ('field_type', 'count', 'ctype', 'size', 'pointer_type', 'array_type')
+
+    def __init__(self, native_type, native_count):
+        self.field_type = DBF(native_type)
+        self.count = native_count
+        self.ctype = DBR_TYPE_STRING[native_type]
+        self.size = dbr_size_n(native_type, native_count)
+        self.pointer_type = ffi.typeof(self.ctype + '*')
+        self.array_type = ffi.typeof(self.ctype + '[]')
+
+
+def _update_plan(chid):
+    """
+    Rebuild the plan of the channel from its current native type and element count.
+    Return None if the channel is disconnected.
+    """
+    native_type = libca.ca_field_type(chid)
+    if native_type in DBR_TYPE_STRING:
+        plan = _ChannelPlan(native_type, element_count(chid))
+    else:
+        plan = None
+
+    channel = _channels().get(chid)
+    if channel is None:
+        return plan
+
+    channel['plan'] = plan
+    if plan is not None:
+        _channel_circuit(chid, channel)
+    if plan is not None and not channel['tracked']:
+        # Once the channel has connected, installing the connection handler does not affect pend_io any more.
+        # From now on the connection handler invalidates the plan on connection changes. The access rights handler
+        # is kept by libca and called on every connection, but before the channel state is updated, so it cannot
+        # build the plan itself. It installs the connection handler at the first connection instead.
+        channel['tracked'] = True
+        if channel['connection_callback'] is None:
+            libca.ca_change_connection_event(chid, _connect_callback)
+        _set_connection_state(chid, ChannelState.CONN)
+
+    return plan
+
+
+def _get_plan(chid):
+    """
+    Return the cached plan of the channel, or None if the channel is disconnected.
+    """
+    channel = _channels().get(chid)
+    if channel is None or channel['plan'] is None:
+        return _update_plan(chid)
+    return channel['plan']
+
+
+def _native_type_count(chid):
+    """
+    Return (native type, native count) tuple of the channel, from the plan if available.
+    """
+    plan = _get_plan(chid)
+    if plan is None:
+        return field_type(chid), element_count(chid)
+    return plan.field_type, plan.count
+
+
+def _dbr_size(chid, chtype, count):
+    """
+    Return the size of the buffer to hold *count* elements of *chtype*.
+    """
+    plan = _get_plan(chid)
+    if plan is not None and chtype == plan.field_type and count == plan.count:
+        return plan.size
+    return dbr_size_n(chtype, count)
+
+
+def set_value_cache(cache=None):
+    """
+    Install a value cache, which is kept up to date by all subscriptions and
+    serves :func:`get` requests with *max_age*.
+
+    :param cache: The value cache, or None to uninstall the current one.
+    :type cache:  :class:`caffi.cache.ValueCache`, None
+
+    Call :meth:`caffi.cache.ValueCache.clear` to clear its automatic subscriptions after uninstalling it.
+    """
+    global __value_cache
+    __value_cache = cache
+
+
+def _lookup_value_cache(chid, chtype, count, max_age):
+    """
+    Return the cached value buffer if it can serve the request, otherwise None.
+    """
+    if max_age is None or __value_cache is None or count <= 0 or chtype > DBR_CTRL_DOUBLE:
+        return None
+    return __value_cache.lookup(chid, chtype, count, max_age)
+
+
 @ffi.callback('void(struct event_handler_args)')
 def _get_callback(arg):
     # If chid or the callback object is not in cache, it well indicates
     # that the python object has been garbage collected.
     # Then don't try to call from_handle, that is undefined and may crash.
-    if arg.chid not in __channels or arg.usr not in __channels[arg.chid]['callbacks']:
+    channel = _channels().get(arg.chid)
+    if channel is None:
+        return
+    # the popped handle stays alive while in use
+    handle = channel['callbacks'].pop(arg.usr, None)
+    if handle is None:
         return
 
-    user_callback, use_numpy = ffi.from_handle(arg.usr)
-    __channels[arg.chid]['callbacks'].remove(arg.usr)
+    user_callback, use_numpy, use_bytes = ffi.from_handle(handle)
+
+    circuit = channel['circuit']
+    if circuit is not None:
+        circuit.add_get_reply(dbr_size_n(arg.type, arg.count) if arg.status == ECA_NORMAL else 0)
 
     epics_arg = {
         'chid':   arg.chid,
         'type':   DBR(arg.type),
         'count':  arg.count,
         'status': ECA(arg.status),
-        'value':  format_dbr(arg.type, arg.count, arg.dbr, use_numpy)
+        'value':  format_dbr(arg.type, arg.count, arg.dbr, use_numpy, use_bytes)
     }
     if callable(user_callback):
         user_callback(epics_arg)
 
 
-def get(chid, chtype=None, count=None, callback=None, use_numpy=False):
+def get(chid, chtype=None, count=None, callback=None, use_numpy=False, use_bytes=False, max_age=None):
     """
     Read a scalar or array value from a process variable.
 
@@ -576,11 +1132,16 @@ def get(chid, chtype=None, count=None, callback=None, use_numpy=False):
                       ============   =============
 
     :param use_numpy: whether to format numeric waveform as numpy array
+    :param use_bytes: whether to format char value as bytes instead of integers
+    :param max_age:   If the value cache is installed by :func:`set_value_cache`, serve the request from the cache
+                      if the cached value is not older than *max_age* seconds.
     :type chid:       cdata
     :type chtype:     int, :class:`DBR`, None
     :type count:      int, None
     :type callback:   callable, None
     :type use_numpy:  bool
+    :type use_bytes:  bool
+    :type max_age:    float, None
     :return:          (:class:`ECA`, :class:`DBRValue` or None)
 
                       - :data:`ECA.NORMAL` - Normal successful completion
@@ -608,30 +1169,313 @@ def get(chid, chtype=None, count=None, callback=None, use_numpy=False):
     :func:`flush_io`, :func:`pend_io`, or :func:`pend_event` are called.
     This allows several requests to be efficiently sent over the network in one message.
 
+    When the request is served from the value cache, no request is sent.
+    The returned :class:`DBRValue` is valid immediately, or the *callback* is called before returning.
+
     """
-    if chid not in __channels:
+    channel = _channels().get(chid)
+    if channel is None:
         return ECA.BADCHID, None
 
+    native_type, native_count = _native_type_count(chid)
     if chtype is None:
-        chtype = field_type(chid)
+        chtype = native_type
     if chtype == DBR.INVALID:
         return ECA.BADTYPE, None
 
-    native_count = element_count(chid)
     if callable(callback):
         if count is None or count < 0 or count > native_count:
             count = native_count
-        get_callback = ffi.new_handle((callback, use_numpy))
+        cvalue = _lookup_value_cache(chid, chtype, count, max_age)
+        if cvalue is not None:
+            callback({
+                'chid':   chid,
+                'type':   DBR(chtype),
+                'count':  count,
+                'status': ECA.NORMAL,
+                'value':  format_dbr(chtype, count, cvalue, use_numpy, use_bytes)
+            })
+            return ECA.NORMAL, None
+        get_callback = ffi.new_handle((callback, use_numpy, use_bytes))
+        # register before issuing, as the reply may arrive before the call returns
+        channel['callbacks'][get_callback] = get_callback
         status = libca.ca_array_get_callback(chtype, count, chid, _get_callback, get_callback)
-        if status == ECA.NORMAL:
-            __channels[chid]['callbacks'].add(get_callback)
+        if status != ECA_NORMAL:
+            channel['callbacks'].pop(get_callback, None)
+        elif channel['circuit'] is not None:
+            channel['circuit'].add_gets(1, 1)
         return ECA(status), None
     else:
         if count is None or count <= 0 or count > native_count:
             count = native_count
-        value = ffi.new('char[]', dbr_size_n(chtype, count))
+        cvalue = _lookup_value_cache(chid, chtype, count, max_age)
+        if cvalue is not None:
+            return ECA.NORMAL, DBRValue(chtype, count, cvalue, use_numpy, use_bytes)
+        value = ffi.new('char[]', _dbr_size(chid, chtype, count))
         status = libca.ca_array_get(chtype, count, chid, value)
-        return ECA(status), DBRValue(chtype, count, value, use_numpy)
+        if status == ECA_NORMAL and channel['circuit'] is not None:
+            channel['circuit'].add_gets(1)
+        return ECA(status), DBRValue(chtype, count, value, use_numpy, use_bytes)
+
+
+def get_async(chid, chtype=None, count=None, use_numpy=False, use_bytes=False):
+    """
+    Read a scalar or array value from a process variable and get notified by a future.
+
+    :param chid:      Channel identifier
+    :param chtype:    The external type of the returned value. Default is the native type.
+    :param count:     Element count to be read. Default is the current element count from the server.
+    :param use_numpy: whether to format numeric waveform as numpy array
+    :param use_bytes: whether to format char value as bytes instead of integers
+    :return: :class:`concurrent.futures.Future`, whose result is the *dict* passed to the callback of :func:`get`.
+             If the request cannot be issued, it is completed immediately with the failure *status* and *value* None.
+
+    It is the same as calling :func:`get` with a callback, whose argument becomes the result of the future.
+    The request is buffered until one of :func:`flush_io`, :func:`pend_event` or :func:`wait_all` is called.
+    If the channel is cleared before the value arrives, the future is completed with the *status*
+    :data:`ECA.CHANDESTROY`.
+
+    """
+    future = Future()
+    futures = _request_futures(chid)
+    futures[future] = _failed_get(chid, ECA.CHANDESTROY)
+
+    def complete(epics_arg):
+        # whoever pops the future completes it
+        if futures.pop(future, None) is not None:
+            future.set_result(epics_arg)
+
+    status, _ = get(chid, chtype, count, complete, use_numpy, use_bytes)
+    if status != ECA.NORMAL and futures.pop(future, None) is not None:
+        future.set_result(_failed_get(chid, status))
+    return future
+
+
+def _failed_get(chid, status):
+    return {
+        'chid':   chid,
+        'type':   DBR.INVALID,
+        'count':  0,
+        'status': status,
+        'value':  None
+    }
+
+
+def _request_futures(chid):
+    """
+    Return the futures of the pending get_async and put_async requests of the channel,
+    each mapped to its result should the channel be cleared.
+    """
+    channel = _channels().get(chid)
+    if channel is None:
+        # the request fails anyway
+        return {}
+    return channel.setdefault('request_futures', {})
+
+
+def _abandon_requests(channels):
+    """
+    Complete the futures of the pending requests of the cleared channels, whose callbacks are not called any more.
+    """
+    for channel in channels.values():
+        futures = channel.get('request_futures')
+        while futures:
+            try:
+                future, result = futures.popitem()
+            except KeyError:
+                break
+            future.set_result(result)
+
+    for completion in list(__put_completions.values()):
+        for chid, pending in list(completion.pending.items()):
+            if chid not in channels:
+                continue
+            while pending:
+                _complete_put(completion, pending.popleft(), ECA_CHANDESTROY)
+
+
+GetManyResult = collections.namedtuple('GetManyResult', ['values', 'statuses', 'severities', 'timestamps'])
+
+# indexed by the severity number
+_SEVERITIES = tuple(AlarmSeverity)
+
+
+def _incomplete_status(chid, finished):
+    """
+    Return the status of a request without callback which has not written its value,
+    *finished* telling whether the wait for the requests has returned normally.
+    """
+    if libca.ca_state(chid) != cs_conn:
+        return ECA.DISCONN
+    if finished:
+        # The wait only returns normally once all requests have completed, including those failed by the server,
+        # whose status is only reported to the exception handler.
+        return ECA.GETFAIL
+    return ECA.TIMEOUT
+
+
+def get_many(chids, chtype=None, count=None, timeout=1.0, use_numpy=False, use_bytes=False):
+    """
+    Read the values of many channels together with their alarm severities and time stamps.
+
+    :param chids:     Sequence of channel identifiers
+    :param chtype:    The plain type of the values, e.g. :data:`DBR.DOUBLE`. Default is the native type of each channel.
+    :param count:     Element count to be read from each channel. Default is the native element count.
+                      It is limited to the native element count of each channel.
+    :param timeout:   Time in seconds to wait for the values.
+    :param use_numpy: whether to format numeric waveform as numpy array
+    :param use_bytes: whether to format char value as bytes instead of integers
+    :type chids:      list, tuple
+    :type chtype:     int, :class:`DBR`, None
+    :type count:      int, None
+    :type timeout:    float
+    :type use_numpy:  bool
+    :type use_bytes:  bool
+    :return: GetManyResult, a named tuple of columns, each has one item for each channel in *chids*
+
+        ==========  =============
+        field       value
+        ==========  =============
+        values      the value, or None if the request failed
+        statuses    status code of the request, :class:`ECA`
+        severities  alarm severity, :class:`AlarmSeverity`. :data:`AlarmSeverity.Invalid` if the request failed.
+        timestamps  POSIX time stamp in seconds, or None if the request failed
+        ==========  =============
+
+        The status code of each channel,
+
+        - :data:`ECA.NORMAL` - Normal successful completion
+        - :data:`ECA.BADCHID` - Corrupted CHID
+        - :data:`ECA.BADTYPE` - Invalid DBR_XXXX type
+        - :data:`ECA.DISCONN` - Channel is disconnected
+        - :data:`ECA.GETFAIL` - The server failed the request
+        - :data:`ECA.TIMEOUT` - The value did not arrive in time
+        - Other status codes returned by :func:`get`
+
+    The DBR_TIME_XXX requests are issued in a tight loop using the cached native type and element count,
+    and then :func:`pend_io` waits once for all of them. A channel which fails does not affect the others.
+    Scalar numbers of the same type are read into one contiguous array, and decoded in bulk if numpy is available.
+
+    """
+    size = len(chids)
+    values = [None] * size
+    statuses = [ECA.NORMAL] * size
+    severities = [AlarmSeverity.Invalid] * size
+    timestamps = [None] * size
+
+    # scalar number requests grouped by the plain type
+    groups = {}
+    # other requests as (index, request type, count)
+    singles = []
+    # number of requests of each circuit
+    circuits = {}
+    channels = _channels()
+    for index, chid in enumerate(chids):
+        channel = channels.get(chid)
+        if channel is None:
+            statuses[index] = ECA.BADCHID
+            continue
+
+        plan = channel['plan'] or _update_plan(chid)
+        if plan is None:
+            statuses[index] = ECA.DISCONN
+            continue
+
+        value_type = plan.field_type if chtype is None else chtype
+        if not dbr_type_is_plain(value_type):
+            statuses[index] = ECA.BADTYPE
+            continue
+
+        if count is None or count <= 0 or count > plan.count:
+            request_count = plan.count
+        else:
+            request_count = count
+
+        if request_count == 1 and value_type != DBR.STRING and not (use_bytes and value_type == DBR.CHAR):
+            groups.setdefault(value_type, []).append(index)
+        else:
+            singles.append((index, dbf_type_to_DBR_TIME(value_type), request_count))
+
+        circuit = channel['circuit']
+        if circuit is not None:
+            circuits[circuit] = circuits.get(circuit, 0) + 1
+
+    for circuit, requests in circuits.items():
+        circuit.add_gets(requests)
+
+    array_get = libca.ca_array_get
+    buffers = []
+    for value_type, indices in groups.items():
+        request_type = dbf_type_to_DBR_TIME(value_type)
+        cvalues = ffi.new(dbr_time_struct(value_type) + '[]', len(indices))
+        if has_numpy:
+            records = numpy.frombuffer(ffi.buffer(cvalues), dtype=dbr_time_dtype(value_type))
+            records['nanoseconds'] = STAMP_NOT_COMPLETED
+        else:
+            records = None
+            for cvalue in cvalues:
+                cvalue.stamp.nsec = STAMP_NOT_COMPLETED
+
+        for i, index in enumerate(indices):
+            status = array_get(request_type, 1, chids[index], cvalues + i)
+            if status != ECA_NORMAL:
+                statuses[index] = ECA(status)
+        buffers.append((indices, cvalues, records))
+
+    for i, (index, request_type, request_count) in enumerate(singles):
+        cvalue = ffi.new('char[]', dbr_size_n(request_type, request_count))
+        # all DBR_TIME_XXX structures start with status, severity and stamp
+        ffi.cast('struct dbr_time_string*', cvalue).stamp.nsec = STAMP_NOT_COMPLETED
+        status = array_get(request_type, request_count, chids[index], cvalue)
+        if status != ECA_NORMAL:
+            statuses[index] = ECA(status)
+        singles[i] = (index, request_type, request_count, cvalue)
+
+    status = libca.ca_pend_io(timeout)
+    if status not in (ECA_NORMAL, ECA_TIMEOUT):
+        statuses = [ECA(status) if code == ECA.NORMAL else code for code in statuses]
+        return GetManyResult(values, statuses, severities, timestamps)
+    finished = status == ECA_NORMAL
+
+    for indices, cvalues, records in buffers:
+        if records is not None:
+            completed = (records['nanoseconds'] != STAMP_NOT_COMPLETED).tolist()
+            column_values = records['value'].tolist()
+            column_severities = records['severity'].tolist()
+            column_timestamps = (records['seconds'] + (POSIX_TIME_AT_EPICS_EPOCH + records['nanoseconds'] / 1e9)).tolist()
+            for i, index in enumerate(indices):
+                if statuses[index] != ECA.NORMAL:
+                    continue
+                if not completed[i]:
+                    statuses[index] = _incomplete_status(chids[index], finished)
+                    continue
+                values[index] = column_values[i]
+                severities[index] = _SEVERITIES[column_severities[i]]
+                timestamps[index] = column_timestamps[i]
+        else:
+            for i, index in enumerate(indices):
+                if statuses[index] != ECA.NORMAL:
+                    continue
+                cvalue = cvalues[i]
+                if cvalue.stamp.nsec == STAMP_NOT_COMPLETED:
+                    statuses[index] = _incomplete_status(chids[index], finished)
+                    continue
+                values[index] = cvalue.value
+                severities[index] = _SEVERITIES[cvalue.severity]
+                timestamps[index] = cvalue.stamp.secPastEpoch + POSIX_TIME_AT_EPICS_EPOCH + cvalue.stamp.nsec / 1e9
+
+    for index, request_type, request_count, cvalue in singles:
+        if statuses[index] != ECA.NORMAL:
+            continue
+        if ffi.cast('struct dbr_time_string*', cvalue).stamp.nsec == STAMP_NOT_COMPLETED:
+            statuses[index] = _incomplete_status(chids[index], finished)
+            continue
+        value = format_dbr(request_type, request_count, cvalue, use_numpy, use_bytes)
+        values[index] = value['value']
+        severities[index] = value['severity']
+        timestamps[index] = value['stamp']['timestamp']
+
+    return GetManyResult(values, statuses, severities, timestamps)
 
 
 @ffi.callback('void(struct event_handler_args)')
@@ -645,27 +1489,81 @@ def _put_callback(arg):
     # If chid or the callback object is not in cache, it well indicates
     # that the python object has been garbage collected.
     # Then don't try to call from_handle, that is undefined and may crash.
-    if arg.chid not in __channels or arg.usr not in __channels[arg.chid]['callbacks']:
+    channel = _channels().get(arg.chid)
+    if channel is None:
+        return
+    # the popped handle stays alive while in use
+    handle = channel['callbacks'].pop(arg.usr, None)
+    if handle is None:
         return
 
-    user_callback = ffi.from_handle(arg.usr)
-    __channels[arg.chid]['callbacks'].remove(arg.usr)
+    user_callback = ffi.from_handle(handle)
+    if channel['circuit'] is not None:
+        channel['circuit'].add_put_reply()
     if callable(user_callback):
         user_callback(epics_arg)
 
 
+def _setup_buffer(value, chtype):
+    """
+    Setup the C value from an object supporting the buffer protocol, e.g. numpy array.
+    If the buffer is C-contiguous and its items match *chtype*, the C value refers to the buffer memory directly.
+    Otherwise a numpy array is converted once to the matching dtype.
+    Return (value_count, c_value) tuple, or None if the value cannot be used as buffer.
+    """
+    ctype = DBR_TYPE_STRING.get(chtype)
+    if has_numpy and isinstance(value, numpy.ndarray):
+        dtype = ctype2dtype.get(ctype)
+        if dtype is None:
+            return None
+        if value.dtype != dtype or not value.flags.c_contiguous:
+            value = value.astype(dtype, order='C')
+        return value.size, ffi.from_buffer(value)
+
+    try:
+        view = memoryview(value)
+    except TypeError:
+        return None
+
+    if (view.format.lstrip('@=') in DBR_BUFFER_FORMAT.get(chtype, ()) and
+            view.itemsize == ffi.sizeof(ctype) and getattr(view, 'c_contiguous', False)):
+        return view.nbytes // view.itemsize, ffi.from_buffer(view)
+    elif has_numpy:
+        return _setup_buffer(numpy.asarray(view), chtype)
+    else:
+        return None
+
+
 def _setup_put(chid, value, chtype=None, count=None):
     """
     Setup the C value for ca put. This is used by both :func:`put` and :func:`sg_put`.
     Return (chtype, count, c_value) tuple.
     """
+    plan = _get_plan(chid)
+    if plan is None:
+        native_type, native_count = field_type(chid), element_count(chid)
+    else:
+        native_type, native_count = plan.field_type, plan.count
+
     if chtype is None:
-        chtype = field_type(chid)
+        chtype = native_type
+
+    # shortcut for a scalar number of the native type
+    if plan is not None and chtype is native_type and type(value) in (int, float) and chtype != DBR.STRING:
+        return chtype, 1, ffi.new(plan.pointer_type, value)
 
-    native_count = element_count(chid)
     if count is None or count <= 0 or count > native_count:
         count = native_count
 
+    # numpy array and other buffer objects are passed without element-wise conversion
+    if not isinstance(value, (numbers.Number, basestring)):
+        buffer_value = _setup_buffer(value, chtype)
+        if buffer_value is not None:
+            value_count, cvalue = buffer_value
+            return chtype, min(count, value_count), cvalue
+        if has_numpy and isinstance(value, numpy.ndarray):
+            value = value.tolist()
+
     if isinstance(value, numbers.Number):
         value_count = 1
     elif isinstance(value, Sequence):
@@ -679,8 +1577,10 @@ def _setup_put(chid, value, chtype=None, count=None):
                 chtype = DBR.STRING
                 value_count = 1
             elif chtype == DBR.CHAR:
-                value = [x for x in bytearray(value)] + [0]
-                value_count = len(value)
+                # NUL terminate if there is room, at the cost of one copy
+                if len(value) < count:
+                    value += b'\0'
+                return chtype, min(count, len(value)), ffi.from_buffer(value)
             else:
                 value = [float(value)]
                 value_count = 1
@@ -719,9 +1619,15 @@ def put(chid, value, chtype=None, count=None, callback=None):
                      ============  =============
                      DBR.STRING    nothing
                      DBR.ENUM      request type is changed to DBR.STRING
-                     DBR.CHAR      a list of byte integers
+                     DBR.CHAR      a NUL terminated byte array if it fits
                      Other types   a float number
                      ============  =============
+
+                     For DBR.CHAR, *bytearray* and *memoryview* are written as they are.
+
+                     If *value* is a numpy array or any other object supporting the buffer protocol,
+                     it is written without copy if it is C-contiguous and its item type matches *chtype*.
+                     Otherwise a numpy array is converted to the matching dtype in one go.
     :param chtype:   The external type of the supplied value to be written.
                      Conversion on the server will occur if this does not match the native type.
                      Default is the native type.
@@ -740,7 +1646,7 @@ def put(chid, value, chtype=None, count=None, callback=None):
                      ============   =============
 
     :type chid:      cdata
-    :type value:     int, float, bytes, str, tuple, list, array
+    :type value:     int, float, bytes, bytearray, memoryview, str, tuple, list, array, numpy.ndarray
     :type chtype:    int, :class:`DBR`, None
     :type count:     int, None
     :type callback:  callable, None
@@ -774,46 +1680,295 @@ def put(chid, value, chtype=None, count=None, callback=None):
     This allows several requests to be efficiently combined into one message.
 
     """
-    if chid not in __channels:
+    channel = _channels().get(chid)
+    if channel is None:
         return ECA.BADCHID
 
-    chtype, count, cvalue = _setup_put(chid, value, chtype, count)
+    plan = channel['plan']
+    if plan is not None and chtype is None and type(value) in (int, float) and plan.field_type != DBF.STRING:
+        # shortcut for a scalar number written in the native type
+        chtype, count, cvalue = plan.field_type, 1, ffi.new(plan.pointer_type, value)
+    else:
+        chtype, count, cvalue = _setup_put(chid, value, chtype, count)
 
     if cvalue is None:
         return ECA.BADTYPE
 
     if callback is None or not callable(callback):
+        callbacks = 0
         status = libca.ca_array_put(chtype, count, chid, cvalue)
     else:
+        callbacks = 1
         put_callback = ffi.new_handle(callback)
-        __channels[chid]['callbacks'].add(put_callback)
+        # register before issuing, as the reply may arrive before the call returns
+        channel['callbacks'][put_callback] = put_callback
         status = libca.ca_array_put_callback(chtype, count, chid, cvalue, _put_callback, put_callback)
+        if status != ECA_NORMAL:
+            channel['callbacks'].pop(put_callback, None)
+
+    if status == ECA_NORMAL and channel['circuit'] is not None:
+        channel['circuit'].add_puts(1, callbacks)
 
     return ECA(status)
 
 
+def put_many(chids, values, chtype=None):
+    """
+    Write scalar or array values to many channels at once.
+
+    :param chids:  Sequence of channel identifiers
+    :param values: Sequence of values, one for each channel in *chids*.
+                   The same conversions as :func:`put` apply.
+    :param chtype: The external type of the supplied values. Default is the native type of each channel.
+    :type chids:   list, tuple
+    :type values:  list, tuple, numpy.ndarray
+    :type chtype:  int, :class:`DBR`, None
+    :return: a list of :class:`ECA`, the status of the put request of each channel.
+
+        - :data:`ECA.NORMAL` - Normal successful completion
+        - :data:`ECA.BADCHID` - Corrupted CHID
+        - :data:`ECA.DISCONN` - Channel is disconnected
+        - :data:`ECA.BADTYPE` - The value cannot be converted to the request type
+        - Other status codes returned by :func:`put`
+
+    :raises ValueError: if the numbers of channels and values differ.
+
+    Scalar numbers are grouped by the request type and converted in one go, using numpy if available.
+    If any number of a group does not fit the request type, none of the group is written and all get
+    :data:`ECA.BADTYPE`. Then the requests are issued in a tight loop and the send buffer is flushed once at the end.
+
+    """
+    if len(values) != len(chids):
+        raise ValueError('%d values given for %d channels' % (len(values), len(chids)))
+
+    statuses = [ECA.NORMAL] * len(chids)
+    groups = {}
+    # number of requests of each circuit
+    circuits = {}
+    channels = _channels()
+    for index, (chid, value) in enumerate(zip(chids, values)):
+        channel = channels.get(chid)
+        if channel is None:
+            statuses[index] = ECA.BADCHID
+            continue
+
+        plan = channel['plan'] or _update_plan(chid)
+        if plan is None:
+            statuses[index] = ECA.DISCONN
+            continue
+
+        circuit = channel['circuit']
+        if circuit is not None:
+            circuits[circuit] = circuits.get(circuit, 0) + 1
+
+        request_type = plan.field_type if chtype is None else chtype
+        if (type(value) in (int, float) or isinstance(value, numbers.Number)) and \
+                request_type != DBR.STRING and request_type in DBR_TYPE_STRING:
+            groups.setdefault(request_type, []).append(index)
+        else:
+            request_type, count, cvalue = _setup_put(chid, value, request_type)
+            if cvalue is None:
+                statuses[index] = ECA.BADTYPE
+            else:
+                statuses[index] = ECA(libca.ca_array_put(request_type, count, chid, cvalue))
+
+    for request_type, indices in groups.items():
+        ctype = DBR_TYPE_STRING[request_type]
+        try:
+            if has_numpy:
+                if isinstance(values, numpy.ndarray):
+                    group_values = values[indices]
+                else:
+                    group_values = [values[index] for index in indices]
+                # keep the reference to the converted array until all requests are issued
+                array = numpy.asarray(group_values, dtype=ctype2dtype[ctype])
+                cvalues = ffi.cast(ctype + '*', ffi.from_buffer(array))
+            else:
+                cvalues = ffi.new(ctype + '[]', [values[index] for index in indices])
+        except (OverflowError, ValueError, TypeError):
+            for index in indices:
+                statuses[index] = ECA.BADTYPE
+            continue
+
+        array_put = libca.ca_array_put
+        for i, index in enumerate(indices):
+            status = array_put(request_type, 1, chids[index], cvalues + i)
+            if status != ECA_NORMAL:
+                statuses[index] = ECA(status)
+
+    for circuit, requests in circuits.items():
+        circuit.add_puts(requests)
+
+    libca.ca_flush_io()
+
+    return statuses
+
+
+class _PutCompletion(object):
+    """
+    Completion state shared by all put requests issued by one :func:`put_many_async` call.
+    """
+    __slots__ = ('future', 'statuses', 'completed', 'pending', 'handle')
+
+    def __init__(self, count):
+        self.future = Future()
+        self.statuses = [ECA.NORMAL] * count
+        # next() on itertools.count is atomic, so it serves as countdown without lock
+        self.completed = itertools.count(1)
+        # request indices awaiting completion for each channel, in the order of issue
+        self.pending = {}
+        self.handle = None
+
+
+def _complete_put(completion, index, status):
+    completion.statuses[index] = ECA(status)
+    if next(completion.completed) == len(completion.statuses):
+        __put_completions.pop(completion.handle, None)
+        completion.future.set_result(completion.statuses)
+
+
+@ffi.callback('void(struct event_handler_args)')
+def _put_many_callback(arg):
+    # If the handle is not in cache, the requests have completed or been abandoned.
+    completion = __put_completions.get(arg.usr)
+    if completion is None:
+        return
+
+    channel = _channels().get(arg.chid)
+    if channel is not None and channel['circuit'] is not None:
+        channel['circuit'].add_put_reply()
+
+    # put callbacks of the same channel arrive in the order of issue
+    index = completion.pending[arg.chid].popleft()
+    _complete_put(completion, index, arg.status)
+
+
+def put_many_async(chids, values, chtype=None):
+    """
+    Write values to many channels and get notified when all of them have completed.
+
+    :param chids:  Sequence of channel identifiers
+    :param values: Sequence of values, one for each channel in *chids*.
+                   The same conversions as :func:`put` apply.
+    :param chtype: The external type of the supplied values. Default is the native type of each channel.
+    :type chids:   list, tuple
+    :type values:  list, tuple, numpy.ndarray
+    :type chtype:  int, :class:`DBR`, None
+    :return: :class:`concurrent.futures.Future`, whose result is a list of :class:`ECA`,
+             the completion status of each put request.
+    :raises ValueError: if the numbers of channels and values differ.
+
+    The requests are issued with put callback, so that completion means the write operation
+    and all actions resulting from it have completed in the server, as with the callback of :func:`put`.
+    Requests which cannot be issued, e.g. the channel is disconnected, complete immediately with the failure status.
+    Unlike calling :func:`put` with a callback for each channel, all requests share one completion object.
+
+    The send buffer is flushed once all requests have been issued.
+    The future is resolved from the CA callback thread, so are the callbacks added to it.
+    The requests of a channel cleared before they complete get the status :data:`ECA.CHANDESTROY`.
+
+    """
+    if len(values) != len(chids):
+        raise ValueError('%d values given for %d channels' % (len(values), len(chids)))
+
+    completion = _PutCompletion(len(chids))
+    if len(chids) == 0:
+        completion.future.set_result(completion.statuses)
+        return completion.future
+
+    completion.handle = ffi.new_handle(completion)
+    __put_completions[completion.handle] = completion
+
+    channels = _channels()
+    for index, (chid, value) in enumerate(zip(chids, values)):
+        channel = channels.get(chid)
+        if channel is None:
+            _complete_put(completion, index, ECA_BADCHID)
+            continue
+
+        request_type, count, cvalue = _setup_put(chid, value, chtype)
+        if cvalue is None:
+            _complete_put(completion, index, ECA_BADTYPE)
+            continue
+
+        # register the index before issuing, as the callback might run before the call returns
+        pending = completion.pending.setdefault(chid, collections.deque())
+        pending.append(index)
+        status = libca.ca_array_put_callback(request_type, count, chid, cvalue, _put_many_callback, completion.handle)
+        if status != ECA_NORMAL:
+            pending.remove(index)
+            _complete_put(completion, index, status)
+        elif channel['circuit'] is not None:
+            channel['circuit'].add_puts(1, 1)
+
+    libca.ca_flush_io()
+
+    return completion.future
+
+
+def put_async(chid, value, chtype=None, count=None):
+    """
+    Write a value to a channel with put callback and get notified by a future.
+
+    :param chid:   Channel identifier
+    :param value:  The value or array of values to write, as accepted by :func:`put`
+    :param chtype: The external type of the supplied value. Default is the native type.
+    :param count:  The element count to be written.
+    :return: :class:`concurrent.futures.Future`, whose result is the completion status, :class:`ECA`.
+             If the request cannot be issued, it is completed immediately with the failure status.
+
+    It is the same as calling :func:`put` with a callback.
+    The request is buffered until one of :func:`flush_io`, :func:`pend_event` or :func:`wait_all` is called.
+    If the channel is cleared before the completion arrives, the future is completed with :data:`ECA.CHANDESTROY`.
+
+    """
+    future = Future()
+    futures = _request_futures(chid)
+    futures[future] = ECA.CHANDESTROY
+
+    def complete(epics_arg):
+        # whoever pops the future completes it
+        if futures.pop(future, None) is not None:
+            future.set_result(epics_arg['status'])
+
+    status = put(chid, value, chtype, count, complete)
+    if status != ECA.NORMAL and futures.pop(future, None) is not None:
+        future.set_result(status)
+    return future
+
+
 @ffi.callback('void(struct event_handler_args)')
 def _event_callback(arg):
     # If chid or the callback object is not in cache, it well indicates
     # that the python object has been garbage collected.
     # Then don't try to call from_handle, that is undefined and may crash.
-    if arg.chid not in __channels or arg.usr not in __channels[arg.chid]['monitors'].values():
+    channel = _channels().get(arg.chid)
+    # the handle stays alive until the subscription has been cleared, which waits for the callback in progress
+    if channel is None or arg.usr not in channel['monitor_handles']:
         return
 
-    user_callback, use_numpy = ffi.from_handle(arg.usr)
+    circuit = _channel_circuit(arg.chid, channel)
+    if circuit is not None:
+        circuit.add_event(dbr_size_n(arg.type, arg.count) if arg.status == ECA_NORMAL else 0)
+
+    if __value_cache is not None and arg.status == ECA_NORMAL:
+        __value_cache.update(arg.chid, arg.type, arg.count, arg.dbr)
+
+    user_callback, use_numpy, use_bytes = ffi.from_handle(arg.usr)
+    if not callable(user_callback):
+        return
 
     epics_arg = {
         'chid':   arg.chid,
         'type':   DBR(arg.type),
         'count':  arg.count,
         'status': ECA(arg.status),
-        'value':  format_dbr(arg.type, arg.count, arg.dbr, use_numpy)
+        'value':  format_dbr(arg.type, arg.count, arg.dbr, use_numpy, use_bytes)
     }
-    if callable(user_callback):
-        user_callback(epics_arg)
+    user_callback(epics_arg)
 
 
-def create_subscription(chid, callback, chtype=None, count=None, mask=None, use_numpy=False):
+def create_subscription(chid, callback, chtype=None, count=None, mask=None, use_numpy=False, use_bytes=False):
     """
     Register a state change subscription and specify a call back function to be invoked
     whenever the process variable undergoes significant state changes.
@@ -840,12 +1995,14 @@ def create_subscription(chid, callback, chtype=None, count=None, mask=None, use_
     :param mask:      A mask with bits set for each of the event trigger types requested.
                       The event trigger mask must be a bitwise or of one or more of :class:`DBE`.
     :param use_numpy: whether to format numeric waveform as numpy array
+    :param use_bytes: whether to format char value as bytes instead of integers
     :type chid:       cdata
     :type callback:   callable
     :type chtype:     :class:`DBR`, None
     :type count:      int, None
     :type mask:       :class:`DBE`, None
     :type use_numpy:  bool
+    :type use_bytes:  bool
 
     :return: (:class:`ECA`, event identifier or None)
 
@@ -884,16 +2041,17 @@ def create_subscription(chid, callback, chtype=None, count=None, mask=None, use_
     with at least one update indicating the current state of the channel.
 
     """
-    if chid not in __channels:
+    channel = _channels().get(chid)
+    if channel is None:
         return ECA.BADCHID, None
 
+    native_type, native_count = _native_type_count(chid)
     if chtype is None:
-        chtype = field_type(chid)
+        chtype = native_type
     if chtype == DBR.INVALID:
         return ECA.BADTYPE, None
 
     # count = 0 is valid for subscription. It means only the number of changes elements.
-    native_count = element_count(chid)
     if count is None or count < 0 or count > native_count:
         count = native_count
 
@@ -902,14 +2060,18 @@ def create_subscription(chid, callback, chtype=None, count=None, mask=None, use_
 
     pevid = ffi.new('evid *')
 
-    monitor_callback = ffi.new_handle((callback, use_numpy))
+    monitor_callback = ffi.new_handle((callback, use_numpy, use_bytes))
 
+    # register before subscribing, as the first update may arrive before the call returns
+    channel['monitor_handles'].add(monitor_callback)
     status = libca.ca_create_subscription(chtype, count, chid, mask, _event_callback, monitor_callback, pevid)
     if status != ECA_NORMAL:
+        channel['monitor_handles'].discard(monitor_callback)
         return ECA(status), None
 
     evid = pevid[0]
-    __channels[chid]['monitors'][evid] = monitor_callback
+    channel['monitors'][evid] = monitor_callback
+    _registry().subscriptions[evid] = chid
 
     return ECA(status), evid
 
@@ -927,16 +2089,33 @@ def clear_subscription(evid):
     until one of :func:`flush_io`, :func:`pend_io`, or :func:`pend_event` are called.
     This allows several requests to be efficiently sent together in one message.
 
+    If several threads clear the same subscription concurrently, it is cleared once
+    and the others get :data:`ECA.BADCHID`, as after its channel has been cleared.
+
     """
-    status = libca.ca_clear_subscription(evid)
-    chid = libca.ca_evid_to_chid(evid)
+    registry = _registry()
+    if registry is None:
+        return ECA.BADCHID
+
+    # whoever pops the subscription clears it, so that it is not freed twice
+    chid = registry.subscriptions.pop(evid, None)
+    if chid is None:
+        return ECA.BADCHID
 
-    if chid not in __channels:
+    channel = registry.channels.get(chid)
+    if channel is None:
+        # the channel is being cleared together with its subscriptions
         return ECA.BADCHID
 
-    if evid in __channels[chid]['monitors']:
-        del __channels[chid]['monitors'][evid]
+    return _clear_subscription(channel, evid)
 
+
+def _clear_subscription(channel, evid):
+    # Unregister before clearing, as the evid may be reused by a new subscription as soon as it is freed.
+    # The handle is kept alive until no callback of the subscription is in progress any more.
+    monitor_callback = channel['monitors'].pop(evid, None)
+    status = libca.ca_clear_subscription(evid)
+    channel['monitor_handles'].discard(monitor_callback)
     return ECA(status)
 
 
@@ -957,18 +2136,35 @@ def clear_channel(chid):
     but clearing a channel does shutdown and reclaim any channel state change event subscriptions (monitors)
     registered with the channel.
 
+    If several threads clear the same channel concurrently, it is cleared once and the others get :data:`ECA.BADCHID`.
+    Otherwise the channel must not be used by other threads while it is cleared, nor afterwards.
+
     """
-    if chid not in __channels:
+    registry = _registry()
+    if registry is None:
         return ECA.BADCHID
 
+    # whoever pops the channel clears it, so that it is not freed twice.
+    # From now on the callbacks of the channel are ignored.
+    channel = registry.channels.pop(chid, None)
+    if channel is None:
+        return ECA.BADCHID
+
+    # not to be checked by the connection index any more
+    _set_connection_state(chid, None, registry=registry)
+
+    if __value_cache is not None:
+        __value_cache.discard(chid, cleared=True)
+
     # clear all subscriptions for this channel
-    for evid in list(__channels[chid]['monitors']):
-        clear_subscription(evid)
+    for evid in list(channel['monitors']):
+        if registry.subscriptions.pop(evid, None) is not None:
+            _clear_subscription(channel, evid)
 
     status = libca.ca_clear_channel(chid)
 
-    # remove from channels list
-    del __channels[chid]
+    _resolve_connect_futures(channel, ECA.CHANDESTROY)
+    _abandon_requests({chid: channel})
 
     return ECA(status)
 
@@ -1045,6 +2241,11 @@ def pend_io(timeout):
 
     """
     status = libca.ca_pend_io(timeout)
+    if status == ECA_NORMAL:
+        registry = _registry()
+        if registry is not None and registry.unwatched:
+            # all channels have connected
+            _check_unwatched(registry)
     return ECA(status)
 
 
@@ -1062,6 +2263,57 @@ def pend(timeout, early):
     return ECA(status)
 
 
+# time slice of pend_event while waiting for futures in a non preemptive context
+_PEND_SLICE = 0.01
+
+
+def wait_all(futures, timeout=None):
+    """
+    Flush the send buffer and wait until all futures have completed.
+
+    :param futures: Iterable of futures returned by :func:`get_async`, :func:`put_async`,
+                    :func:`connect_async` or :func:`put_many_async`
+    :param timeout: Time in seconds to wait. None to wait forever.
+    :type timeout:  float, None
+    :return: True if all have completed, False if timed out.
+
+    In a preemptive context the futures are completed from the CA callback thread, so it just waits for them.
+    Otherwise it calls :func:`pend_event` in short slices to process the callbacks, until all have completed.
+    A thread attached to no context just waits, without creating one, for the futures completed by other threads.
+    It must not be called from within a CA callback.
+
+    """
+    futures = list(futures)
+    if libca.ca_current_context() == ffi.NULL:
+        done, not_done = concurrent.futures.wait(futures, timeout)
+        return not not_done
+
+    libca.ca_flush_io()
+
+    if libca.ca_preemtive_callback_is_enabled():
+        done, not_done = concurrent.futures.wait(futures, timeout)
+        return not not_done
+
+    if timeout is not None:
+        deadline = time.time() + timeout
+
+    # futures complete mostly in the order of issue, so check from the first one not yet done
+    index = 0
+    while True:
+        while index < len(futures) and futures[index].done():
+            index += 1
+        if index == len(futures):
+            return True
+
+        if timeout is None:
+            libca.ca_pend_event(_PEND_SLICE)
+        else:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            libca.ca_pend_event(min(remaining, _PEND_SLICE))
+
+
 def test_io():
     """
     This function tests to see if all get requests are complete and channels created without
@@ -1172,6 +2424,180 @@ def write_access(chid):
     return libca.ca_write_access(chid) == 1
 
 
+def subscription_count(chid):
+    """
+    :param chid: channel identifier
+    :return: the number of subscriptions created by :func:`create_subscription` and not yet cleared.
+    """
+    channel = _channels().get(chid)
+    if channel is None:
+        return 0
+    return len(channel['monitors'])
+
+
+class _ChannelSetView(Set):
+    """
+    A read only view of a set of channels in the connection index.
+    """
+    def __init__(self, channels):
+        self._channels = channels
+
+    def __contains__(self, chid):
+        return chid in self._channels
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __iter__(self):
+        # iterate over a copy, as the set is updated from the CA callback thread
+        return iter(list(self._channels))
+
+
+def connection_counts():
+    """
+    :return: a dict of the number of channels in each of the states
+             :data:`ChannelState.NEVER_CONN`, :data:`ChannelState.CONN` and :data:`ChannelState.PREV_CONN`.
+
+    The connection state index is updated incrementally by the connection handler,
+    so that it does not query the state of each channel.
+    It covers the channels of the calling thread's CA context.
+    """
+    registry = _registry()
+    if registry is None:
+        return dict((state, 0) for state in (ChannelState.NEVER_CONN, ChannelState.CONN, ChannelState.PREV_CONN))
+    return dict((state, len(channels)) for state, channels in registry.connection_index.items())
+
+
+def channels_in_state(state):
+    """
+    :param state: :data:`ChannelState.NEVER_CONN`, :data:`ChannelState.CONN` or :data:`ChannelState.PREV_CONN`
+    :type state:  :class:`ChannelState`
+    :return: a read only set view of the channel identifiers in the state, which follows the state changes.
+             It covers the channels of the calling thread's CA context.
+    """
+    registry = _registry()
+    if registry is None:
+        return _ChannelSetView(frozenset())
+    return _ChannelSetView(registry.connection_index[state])
+
+
+def connection_generation():
+    """
+    :return: a counter incremented on every change of the connection state index.
+             Pollers compare it with the previous value to detect any change cheaply.
+             It covers the channels of the calling thread's CA context.
+    """
+    registry = _registry()
+    if registry is None:
+        return 0
+    return registry.connection_generation
+
+
+def connection_statistics(chid):
+    """
+    :param chid: channel identifier
+    :return: a dict of the connection history of the channel, or None if the channel does not exist.
+
+        ============  =============
+        field         value
+        ============  =============
+        host          the server of the last connection, None if never connected
+        created       POSIX time the channel was created
+        connected     POSIX time of the first connection, None if never connected
+        connect_time  seconds from creation to the first connection, None if never connected
+        disconnects   number of disconnections
+        reconnects    number of connections after a disconnection
+        downtime      total seconds disconnected after the first connection, including the current one
+        ============  =============
+
+    The times are those at which the client library reports the connection changes, for channels created
+    with or without callback alike.
+    """
+    channel = _channels().get(chid)
+    if channel is None:
+        return None
+
+    _channel_circuit(chid, channel)
+    statistics = channel['statistics']
+    downtime = statistics.downtime
+    if statistics.down_since is not None:
+        downtime += time.time() - statistics.down_since
+    connect_time = None
+    if statistics.connected is not None:
+        connect_time = statistics.connected - statistics.created
+
+    return {
+        'host': statistics.host,
+        'created': statistics.created,
+        'connected': statistics.connected,
+        'connect_time': connect_time,
+        'disconnects': statistics.disconnects,
+        'reconnects': statistics.reconnects,
+        'downtime': downtime,
+    }
+
+
+def circuit_statistics():
+    """
+    :return: a dict keyed by (server host name, priority) of the traffic of each circuit, i.e.
+             the channels connected to one server at one priority. Each item is a dict of,
+
+        =============  =============
+        field          value
+        =============  =============
+        since          POSIX time the first channel connected to the circuit
+        channels       number of channels currently connected, in all CA contexts
+        subscriptions  number of subscriptions of the connected channels
+        events         number of subscription updates received
+        bytes          payload bytes received by subscription updates and get requests with callback
+        gets           number of get requests issued
+        puts           number of put requests issued
+        pending_gets   number of get requests with callback waiting for completion
+        pending_puts   number of put requests with callback waiting for completion
+        =============  =============
+
+    The counters are cumulative and cover the requests issued by this module, excluding synchronous groups.
+    A circuit stays in the result after all its channels have disconnected.
+    """
+    # the connected channels of all contexts, with the circuits of those not used since they connected
+    connected = []
+    for registry in list(__registries.values()):
+        # the lock keeps the channels from being cleared meanwhile
+        with registry.connection_lock:
+            for chid in registry.connection_index[ChannelState.CONN]:
+                channel = registry.channels.get(chid)
+                if channel is not None:
+                    connected.append((_channel_circuit(chid, channel), channel))
+    with __circuits_lock:
+        circuits = list(__circuits.values())
+
+    table = {}
+    for circuit in circuits:
+        with circuit.lock:
+            table[(circuit.host, circuit.priority)] = {
+                'since': circuit.since,
+                'channels': 0,
+                'subscriptions': 0,
+                'events': circuit.events,
+                'bytes': circuit.bytes,
+                'gets': circuit.gets,
+                'puts': circuit.puts,
+                # the reply may be accounted before its request
+                'pending_gets': max(circuit.get_callbacks - circuit.gets_completed, 0),
+                'pending_puts': max(circuit.put_callbacks - circuit.puts_completed, 0),
+            }
+
+    for circuit, channel in connected:
+        if circuit is None:
+            # disconnected meanwhile
+            continue
+        item = table[(circuit.host, circuit.priority)]
+        item['channels'] += 1
+        item['subscriptions'] += len(channel['monitors'])
+
+    return table
+
+
 def sg_create():
     """
     Create a synchronous group and return an identifier for it.
@@ -1261,7 +2687,7 @@ def sg_reset(gid):
         - :data:`ECA.NORMAL` - Normal successful completion
         - :data:`ECA.BADSYNCGRP` - Invalid synchronous group
     """
-    status = libca.sg_reset(gid)
+    status = libca.ca_sg_reset(gid)
     return ECA(status)
 
 
@@ -1279,16 +2705,17 @@ def sg_put(gid, chid, value, chtype=None, count=None):
                      ============  =============
                      DBR.STRING    nothing
                      DBR.ENUM      request type is changed to DBR.STRING
-                     DBR.CHAR      a list of byte integers
+                     DBR.CHAR      a NUL terminated byte array if it fits
                      Other types   a float number
                      ============  =============
 
+                   Numpy arrays and buffer objects are handled the same as in :func:`put`.
     :param chtype: The type of supplied value.
                    Conversion on the server will occur if it does not match the native type.
     :param count:  The element count to be written to the specified channel.
     :type gid:     int
     :type chid:    cdata
-    :type value:   int, float, bytes, str, tuple, list, array
+    :type value:   int, float, bytes, bytearray, memoryview, str, tuple, list, array, numpy.ndarray
     :type chtype:  int, :class:`DBR`
     :return:
         - :data:`ECA.NORMAL` - Normal successful completion
@@ -1315,7 +2742,7 @@ def sg_put(gid, chid, value, chtype=None, count=None):
     return ECA(status)
 
 
-def sg_get(gid, chid, chtype=None, count=None, use_numpy=False):
+def sg_get(gid, chid, chtype=None, count=None, use_numpy=False, use_bytes=False):
     """
     Read a value from a channel and increment the outstanding request count of a synchronous group.
 
@@ -1325,6 +2752,7 @@ def sg_get(gid, chid, chtype=None, count=None, use_numpy=False):
                       Conversion on the server will occur if this does not match native type.
     :param count:     Element count to be read from the specified channel.
     :param use_numpy: whether to format numeric waveform as numpy array
+    :param use_bytes: whether to format char value as bytes instead of integers
     :type gid:        int
     :type chid:       cdata
     :type chtype:     int, :class:`DBR`, None
@@ -1347,19 +2775,19 @@ def sg_get(gid, chid, chtype=None, count=None, use_numpy=False):
 
     If a connection is lost and then resumed outstanding gets are not reissued.
     """
-    native_count = element_count(chid)
+    native_type, native_count = _native_type_count(chid)
     if count is None or count <= 0 or count > native_count:
         count = native_count
 
     if chtype is None:
-        chtype = libca.ca_field_type(chid)
+        chtype = native_type
 
-    cvalue = ffi.new('char[]', dbr_size_n(chtype, count))
+    cvalue = ffi.new('char[]', _dbr_size(chid, chtype, count))
     status = libca.ca_sg_array_get(gid, chtype, count, chid, cvalue)
     if status != ECA_NORMAL:
         return ECA(status), None
     else:
-        return ECA(status), DBRValue(chtype, count, cvalue, use_numpy)
+        return ECA(status), DBRValue(chtype, count, cvalue, use_numpy, use_bytes)
 
 
 def version():
@@ -0,0 +1,190 @@
+"""
+Value cache on top of :mod:`caffi.ca` subscriptions.
+
+"""
+from __future__ import (print_function, absolute_import)
+import collections
+import threading
+import time
+
+from . import ca
+from ._ca import ffi
+from .constants import ECA
+from .macros import *
+
+__all__ = ['ValueCache']
+
+# plain, STS, TIME, GR and CTRL
+_DBR_CLASSES = 5
+
+
+class ValueCache(object):
+    """
+    :param int capacity:        Maximum number of automatic subscriptions. The least recently used one
+                                is cleared when it is exceeded, except those of pinned channels.
+    :param bool auto_subscribe: Whether to subscribe a channel automatically when it misses the cache.
+                                If False, only pinned channels are subscribed automatically.
+
+    A cache of the latest values received by subscriptions, keyed by channel and DBR class,
+    i.e. plain, STS, TIME, GR or CTRL. Once installed by :func:`caffi.ca.set_value_cache`,
+    all subscriptions keep it up to date, and :func:`caffi.ca.get` with *max_age* is served from it
+    if the cached value has the requested type and is not older than *max_age* seconds.
+    ::
+
+        >>> cache = ValueCache(capacity=100)
+        >>> ca.set_value_cache(cache)
+        >>> status, dbrvalue = ca.get(chid, max_age=1)    # miss, subscribed and read from the server
+        >>> ca.pend_io(2)
+        <ECA.NORMAL: 1>
+        >>> status, dbrvalue = ca.get(chid, max_age=1)    # hit, served from the latest monitor update
+        >>> cache.hits, cache.misses
+        (1, 1)
+
+    The counters,
+
+    ==========  =============
+    attribute   value
+    ==========  =============
+    hits        number of reads served from the cache
+    misses      number of reads which went to the server
+    evictions   number of automatic subscriptions cleared to respect *capacity*
+    ==========  =============
+
+    """
+    def __init__(self, capacity=1000, auto_subscribe=True):
+        self.capacity = capacity
+        self.auto_subscribe = auto_subscribe
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # (chid, DBR class) -> (chtype, count, cvalue, receive time)
+        self._entries = {}
+        # (chid, DBR class) -> evid of automatic subscriptions, in the order of use
+        self._subscriptions = collections.OrderedDict()
+        self._pinned = set()
+        # protects the counters, the subscriptions and the pinned channels,
+        # never held while calling the library, which may wait for callbacks needing it
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def pin(self, chid):
+        """
+        Keep the channel in the cache. It is subscribed automatically on first read,
+        and its automatic subscriptions are never evicted.
+
+        :param chid: Channel identifier
+        """
+        with self._lock:
+            self._pinned.add(chid)
+
+    def unpin(self, chid):
+        """
+        Make the automatic subscriptions of the channel subject to eviction again.
+
+        :param chid: Channel identifier
+        """
+        with self._lock:
+            self._pinned.discard(chid)
+
+    def lookup(self, chid, chtype, count, max_age):
+        """
+        Return the cached value buffer, or None if it is not fresh or does not match the request.
+        It is called by :func:`caffi.ca.get`.
+        """
+        key = (chid, chtype // (LAST_TYPE + 1))
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry_type, entry_count, cvalue, received = entry
+            if entry_type == chtype and entry_count >= count and time.time() - received <= max_age:
+                with self._lock:
+                    self.hits += 1
+                    # mark as recently used
+                    evid = self._subscriptions.pop(key, None)
+                    if evid is not None:
+                        self._subscriptions[key] = evid
+                return cvalue
+
+        with self._lock:
+            self.misses += 1
+            if key in self._subscriptions or not (self.auto_subscribe or chid in self._pinned):
+                return None
+            # reserve the key, so that concurrent misses subscribe once
+            self._subscriptions[key] = None
+
+        self._subscribe(chid, chtype, key)
+        return None
+
+    def update(self, chid, chtype, count, dbr):
+        """
+        Copy the value received by a subscription into the cache. It is called from the subscription handler.
+        """
+        if chtype > DBR_CTRL_DOUBLE:
+            return
+        size = dbr_size_n(chtype, count)
+        cvalue = ffi.new('char[]', size)
+        ffi.memmove(cvalue, dbr, size)
+        # values already handed out keep referring to their own buffer
+        self._entries[(chid, chtype // (LAST_TYPE + 1))] = (chtype, count, cvalue, time.time())
+
+    def discard(self, chid, cleared=False):
+        """
+        Drop the cached values of the channel, e.g. on disconnection.
+        If *cleared* is True, the channel has been cleared together with its subscriptions.
+        It is called by :func:`caffi.ca.clear_channel` and the connection handler.
+        """
+        keys = [(chid, dbr_class) for dbr_class in range(_DBR_CLASSES)]
+        for key in keys:
+            self._entries.pop(key, None)
+
+        if cleared:
+            with self._lock:
+                self._pinned.discard(chid)
+                for key in keys:
+                    self._subscriptions.pop(key, None)
+
+    def clear(self):
+        """
+        Clear all automatic subscriptions and cached values.
+        """
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, collections.OrderedDict()
+
+        for evid in subscriptions.values():
+            if evid is not None:
+                ca.clear_subscription(evid)
+        ca.flush_io()
+        self._entries.clear()
+
+    def _subscribe(self, chid, chtype, key):
+        status, evid = ca.create_subscription(chid, None, chtype)
+
+        evicted = []
+        with self._lock:
+            # the key is gone if the channel has been cleared meanwhile, together with the subscription
+            if key in self._subscriptions and status != ECA.NORMAL:
+                del self._subscriptions[key]
+            elif key in self._subscriptions:
+                self._subscriptions[key] = evid
+                excess = len(self._subscriptions) - self.capacity
+                # the least recently used first, skipping those being subscribed by other threads
+                for victim, victim_evid in self._subscriptions.items():
+                    if len(evicted) >= excess:
+                        break
+                    if victim_evid is not None and victim != key and victim[0] not in self._pinned:
+                        evicted.append((victim, victim_evid))
+                for victim, _ in evicted:
+                    del self._subscriptions[victim]
+                self.evictions += len(evicted)
+
+        # clearing waits for the callbacks in progress, which may need the lock
+        for victim, victim_evid in evicted:
+            ca.clear_subscription(victim_evid)
+            # after the last update of the subscription
+            self._entries.pop(victim, None)
+
+        if status == ECA.NORMAL or evicted:
+            ca.flush_io()
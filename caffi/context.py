@@ -0,0 +1,215 @@
+"""
+CA contexts as objects, and thread pools attached to them, on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import concurrent.futures
+import threading
+
+from . import ca
+from ._ca import libca
+from .constants import ECA
+
+__all__ = ['Context', 'ContextExecutor']
+
+
+def _reattach(context):
+    status = ca.attach_context(context)
+    if status != ECA.NORMAL:
+        raise RuntimeError('Failed to attach the CA context again: %s' % ca.message(status))
+
+
+class Context(object):
+    """
+    :param cdata context: An existing CA context to wrap instead of creating one.
+
+    A CA context. A new context is created and later destroyed by a thread of its own,
+    so that creating it does not attach the calling thread. It is preemptive, as other threads must join it.
+
+    Use it as a context manager to attach the calling thread for the duration of a block.
+    The context the thread was attached to before, if any, is restored afterwards,
+    and the blocks may be nested. A thread already attached to this context stays attached.
+    ::
+
+        >>> context = Context()
+        >>> with context:
+        ...     status, chid = ca.create_channel('catest')
+        ...     ca.pend_io(2)
+        >>> with context.executor(max_workers=8) as executor:
+        ...     futures = [executor.submit(read, name) for name in names]
+        >>> context.close()
+
+    :raises RuntimeError: if the context cannot be created.
+    """
+    def __init__(self, context=None):
+        self.context = context
+        # saved contexts of the threads in a block, per thread
+        self._local = threading.local()
+        self._thread = None
+
+        if context is not None:
+            return
+
+        status = []
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(status,), name='CAContext')
+        self._thread.daemon = True
+        self._thread.start()
+        self._ready.wait()
+        if status[0] != ECA.NORMAL:
+            self._thread.join()
+            self._thread = None
+            raise RuntimeError('Failed to create CA context: %s' % ca.message(status[0]))
+
+    def _run(self, status):
+        status.append(ca.create_context(True))
+        if status[0] == ECA.NORMAL:
+            self.context = ca.current_context()
+        self._ready.set()
+        if status[0] != ECA.NORMAL:
+            return
+
+        self._stopped.wait()
+        ca.destroy_context()
+
+    @classmethod
+    def current(cls):
+        """
+        :return: A :class:`Context` wrapping the calling thread's CA context, or None if it has none.
+        """
+        context = ca.current_context()
+        if context is None:
+            return None
+        return cls(context=context)
+
+    def __eq__(self, other):
+        return isinstance(other, Context) and self.context == other.context
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.context)
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.detach()
+
+    def attach(self):
+        """
+        Attach the calling thread, saving the context it is attached to.
+        Each call must be paired with a call to :meth:`detach`.
+
+        :raises RuntimeError: if the context cannot be joined, e.g. because a wrapped context is not preemptive,
+                              or if the calling thread is attached to a non-preemptive context,
+                              which it could not join again afterwards.
+        """
+        saved = getattr(self._local, 'saved', None)
+        if saved is None:
+            saved = self._local.saved = []
+
+        current = ca.current_context()
+        if current == self.context:
+            # nothing to restore
+            saved.append(False)
+            return
+
+        if current is not None:
+            if not libca.ca_preemtive_callback_is_enabled():
+                raise RuntimeError('The calling thread is attached to a non-preemptive CA context')
+            ca.detach_context()
+        status = ca.attach_context(self.context)
+        if status != ECA.NORMAL:
+            if current is not None:
+                _reattach(current)
+            raise RuntimeError('Failed to attach CA context: %s' % ca.message(status))
+        saved.append(current)
+
+    def detach(self):
+        """
+        Detach the calling thread, and attach it again to the context saved by the matching :meth:`attach`.
+
+        :raises RuntimeError: if the saved context cannot be joined again.
+        """
+        current = self._local.saved.pop()
+        if current is False:
+            return
+
+        ca.detach_context()
+        if current is not None:
+            _reattach(current)
+
+    def executor(self, max_workers=None, **kwargs):
+        """
+        :return: A :class:`ContextExecutor` whose threads are attached to this context.
+        """
+        return ContextExecutor(self, max_workers, **kwargs)
+
+    def close(self):
+        """
+        Destroy a context created by this object, which releases its channels and subscriptions.
+        The threads attached to it must have stopped using it. A wrapped context is left alone.
+        """
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            self.context = None
+
+
+class ContextExecutor(concurrent.futures.ThreadPoolExecutor):
+    """
+    :param context:         :class:`Context` or CA context the threads attach to.
+                            Default is the calling thread's context.
+    :param int max_workers: Maximum number of threads, see :class:`concurrent.futures.ThreadPoolExecutor`
+    :param initializer:     Function called once in each thread, after attaching it.
+    :param tuple initargs:  Arguments of the initializer.
+    :param kwargs:          Other arguments of :class:`concurrent.futures.ThreadPoolExecutor`.
+
+    A thread pool whose threads attach to the context once, before running their first task, rather than per task,
+    so that the tasks share the circuits of the context. Otherwise a thread calling the library
+    without attaching first would create a non-preemptive context of its own.
+    ::
+
+        >>> with ContextExecutor(max_workers=8) as executor:
+        ...     statuses = list(executor.map(lambda chid: ca.put(chid, 0), chids))
+
+    A task run by a thread which fails to attach raises RuntimeError, and the thread tries again with its next task.
+    Shut the executor down before destroying the context.
+
+    :raises RuntimeError: if there is no context to attach to.
+    """
+    def __init__(self, context=None, max_workers=None, initializer=None, initargs=(), **kwargs):
+        if context is None:
+            context = Context.current()
+            if context is None:
+                raise RuntimeError('The calling thread has no CA context')
+        elif not isinstance(context, Context):
+            context = Context(context=context)
+        self.context = context
+
+        # the initializer of ThreadPoolExecutor is not available before Python 3.7
+        self._thread_initializer = initializer
+        self._thread_initargs = initargs
+        self._attached = threading.local()
+        super(ContextExecutor, self).__init__(max_workers, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        return super(ContextExecutor, self).submit(self._run, fn, args, kwargs)
+
+    submit.__doc__ = concurrent.futures.ThreadPoolExecutor.submit.__doc__
+
+    def _run(self, fn, args, kwargs):
+        if not getattr(self._attached, 'value', False):
+            # first task of the thread
+            status = ca.attach_context(self.context.context)
+            if status != ECA.NORMAL:
+                raise RuntimeError('Failed to attach CA context: %s' % ca.message(status))
+            self._attached.value = True
+            if self._thread_initializer is not None:
+                self._thread_initializer(*self._thread_initargs)
+        return fn(*args, **kwargs)
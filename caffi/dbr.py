@@ -231,8 +231,10 @@ def format_dbr_enum(cvalue, value):
     value['strs'] = tuple(to_string(ffi.string(cstr)) for cstr in cvalue.strs[0:no_str])
 
 
-def format_plain_value(valueType, count, cvalue, use_numpy):
-    if count == 1:
+def format_plain_value(valueType, count, cvalue, use_numpy, use_bytes=False):
+    if use_bytes and valueType == 'dbr_char_t':
+        value = ffi.buffer(ffi.cast('dbr_char_t*', cvalue), count)[:]
+    elif count == 1:
         value = ffi.cast(valueType+'*', cvalue)[0]
     else:
         cvalue = ffi.cast(valueType+'[%d]'%count, cvalue)
@@ -256,13 +258,15 @@ def format_string_value(count, dbrValue):
     return value
 
 
-def format_dbr(dbrType, count, dbrValue, use_numpy):
+def format_dbr(dbrType, count, dbrValue, use_numpy, use_bytes=False):
     """
     Convert the specified dbr data structure to Python dict
 
     :param dbrType: The data type, DBR_XXX
     :param count: The array element count
     :param dbrValue: A pointer of data of the specified type and number
+    :param use_numpy: whether to format numeric waveform as numpy array
+    :param use_bytes: whether to format char value as bytes
     :return: A dict filled with the values from the C structure fields.
 
     """
@@ -279,7 +283,7 @@ def format_dbr(dbrType, count, dbrValue, use_numpy):
         value = format_plain_value('dbr_enum_t', count, dbrValue, use_numpy)
 
     elif dbrType == DBR_CHAR:
-        value = format_plain_value('dbr_char_t', count, dbrValue, use_numpy)
+        value = format_plain_value('dbr_char_t', count, dbrValue, use_numpy, use_bytes)
 
     elif dbrType == DBR_LONG:
         value = format_plain_value('dbr_long_t', count, dbrValue, use_numpy)
@@ -315,7 +319,7 @@ def format_dbr(dbrType, count, dbrValue, use_numpy):
         value = {}
         cvalue = ffi.cast('struct dbr_sts_char*', dbrValue)
         format_dbr_sts(cvalue, value)
-        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy)
+        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy, use_bytes)
 
     elif dbrType == DBR_STS_LONG:
         value = {}
@@ -362,7 +366,7 @@ def format_dbr(dbrType, count, dbrValue, use_numpy):
         cvalue = ffi.cast('struct dbr_time_char*', dbrValue)
         format_dbr_sts(cvalue, value)
         format_dbr_time(cvalue, value)
-        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy)
+        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy, use_bytes)
 
     elif dbrType == DBR_TIME_LONG:
         value = {}
@@ -405,7 +409,7 @@ def format_dbr(dbrType, count, dbrValue, use_numpy):
         cvalue = ffi.cast('struct dbr_gr_char*', dbrValue)
         format_dbr_sts(cvalue, value)
         format_dbr_gr(cvalue, value)
-        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy)
+        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy, use_bytes)
 
     elif dbrType == DBR_GR_LONG:
         value = {}
@@ -452,7 +456,7 @@ def format_dbr(dbrType, count, dbrValue, use_numpy):
         format_dbr_sts(cvalue, value)
         format_dbr_gr(cvalue, value)
         format_dbr_ctrl(cvalue, value)
-        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy)
+        value['value'] = format_plain_value('dbr_char_t', count, dbr_value_ptr(cvalue, dbrType), use_numpy, use_bytes)
 
     elif dbrType == DBR_CTRL_LONG:
         value = {}
@@ -489,12 +493,65 @@ def format_dbr(dbrType, count, dbrValue, use_numpy):
     return value
 
 
+# nanoseconds never sent by the server, which marks the time stamp of a request not yet completed
+STAMP_NOT_COMPLETED = 0xFFFFFFFF
+
+# DBR_TIME_XXX structure names indexed by the plain type
+_time_struct_names = ['string', 'int', 'float', 'enum', 'char', 'long', 'double']
+
+# numpy structured types of DBR_TIME_XXX structures
+_time_dtypes = {}
+
+
+def dbr_time_struct(valueType):
+    """
+    :param valueType: The plain type, DBR_XXX
+    :return: The C structure name of the DBR_TIME_XXX type
+    """
+    return 'struct dbr_time_' + _time_struct_names[valueType]
+
+
+def dbr_time_dtype(valueType, count=1, itemsize=None):
+    """
+    Create the numpy structured type to view the DBR_TIME_XXX structure of the plain type.
+
+    :param valueType: The plain type, DBR_XXX
+    :param count: The array element count, the value field is a subarray if it is larger than 1.
+    :param itemsize: The distance in bytes between consecutive structures. Default is the structure size.
+    :return: numpy.dtype with fields severity, seconds, nanoseconds and value
+
+    """
+    key = (valueType, count, itemsize)
+    dtype = _time_dtypes.get(key)
+    if dtype is None:
+        struct = dbr_time_struct(valueType)
+        if valueType == DBR_STRING:
+            value_dtype = numpy.dtype('S%d' % ffi.sizeof('dbr_string_t'))
+        else:
+            value_dtype = numpy.dtype(ctype2dtype['dbr_%s_t' % _time_struct_names[valueType]])
+        if count > 1:
+            value_dtype = numpy.dtype((value_dtype, (count,)))
+        stamp = ffi.offsetof(struct, 'stamp')
+        dtype = numpy.dtype({
+            'names': ['severity', 'seconds', 'nanoseconds', 'value'],
+            'formats': [numpy.int16, numpy.uint32, numpy.uint32, value_dtype],
+            'offsets': [ffi.offsetof(struct, 'severity'),
+                        stamp + ffi.offsetof('epicsTimeStamp', 'secPastEpoch'),
+                        stamp + ffi.offsetof('epicsTimeStamp', 'nsec'),
+                        ffi.offsetof(struct, 'value')],
+            'itemsize': itemsize or dbr_size_n(valueType + 2 * (LAST_TYPE + 1), count)
+        })
+        _time_dtypes[key] = dtype
+    return dtype
+
+
 class DBRValue(object):
     """
     :param dbrtype: The external type of the supplied *cvalue*
     :param count: Element count of the supplied *cvalue*
     :param cvalue: Pointer to the structure of *dbrtype* with *count* element
     :param bool use_numpy: whether to format numeric waveform as numpy array
+    :param bool use_bytes: whether to format char value as bytes
 
     An convenient object to represent the value returned by :func:`caffi.ca.get` and :func:`caffi.ca.sg_get`.
     It holds the reference to the memory allocated by the get functions,
@@ -504,13 +561,14 @@ class DBRValue(object):
     call :meth:`get` to get the returned values.
 
     """
-    def __init__(self, dbrtype=DBR.INVALID, count=0, cvalue=ffi.NULL, use_numpy=False):
+    def __init__(self, dbrtype=DBR.INVALID, count=0, cvalue=ffi.NULL, use_numpy=False, use_bytes=False):
         """
         """
         self.dbrtype = dbrtype
         self.count = count
         self.cvalue = cvalue
         self.use_numpy = use_numpy
+        self.use_bytes = use_bytes
 
     def get(self):
         """
@@ -518,4 +576,4 @@ class DBRValue(object):
 
         .. note:: This method should be called only if the get request has succeeded.
         """
-        return format_dbr(self.dbrtype, self.count, self.cvalue, self.use_numpy)
+        return format_dbr(self.dbrtype, self.count, self.cvalue, self.use_numpy, self.use_bytes)
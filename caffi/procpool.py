@@ -0,0 +1,507 @@
+"""
+Subscriptions served by a pool of worker processes on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import array
+import collections
+import multiprocessing
+import struct
+import threading
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from . import ca
+from .compat import to_bytes, to_string
+from .constants import ECA, CA_OP, ChannelState
+from .dbr import DBR, has_numpy, numpy
+from .macros import dbf_type_to_DBR_TIME
+from .sharding import _shard_index
+
+__all__ = ['ProcessPool', 'Update']
+
+#: A subscription update received through a :class:`ProcessPool`
+Update = collections.namedtuple('Update', ['name', 'value', 'status', 'severity', 'timestamp'])
+
+# array type codes of the TIME types, 's' for strings
+_TYPECODES = {
+    DBR.TIME_STRING: b's',
+    DBR.TIME_SHORT:  b'h',
+    DBR.TIME_FLOAT:  b'f',
+    DBR.TIME_ENUM:   b'H',
+    DBR.TIME_CHAR:   b'B',
+    DBR.TIME_LONG:   b'i',
+    DBR.TIME_DOUBLE: b'd',
+}
+
+# numpy types of the array type codes
+if has_numpy:
+    _DTYPES = {
+        'h': numpy.int16,
+        'f': numpy.float32,
+        'H': numpy.uint16,
+        'B': numpy.uint8,
+        'i': numpy.int32,
+        'd': numpy.float64,
+    }
+
+
+class _Ring(object):
+    """
+    A ring buffer of variable length records in shared memory, with one writing and one reading process.
+
+    The write position and the read position are monotonic byte counts, each updated by one side only.
+    A record is written before the write position is advanced past it, and read before the read position is.
+    A record which does not fit before the end of the buffer is preceded by a wrap marker.
+    """
+    # write position, dropped records, capacity, and on its own cache line, read position
+    _POSITION = struct.Struct('<Q')
+    _WRITE = 0
+    _DROPPED = 8
+    _CAPACITY = 16
+    _READ = 64
+    _HEADER = 128
+
+    # channel index, payload size, alarm status, alarm severity, type code, time stamp
+    _RECORD = struct.Struct('<IIHHc3xd')
+    _INDEX = struct.Struct('<I')
+    _WRAP = 0xffffffff
+
+    def __init__(self, buf, capacity=None):
+        # the creator records the capacity, as the mapping of another process may be rounded up to pages
+        self.buf = buf
+        if capacity is not None:
+            self._set(self._CAPACITY, (capacity + 7) & ~7)
+        self.capacity = self._get(self._CAPACITY)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def size(cls, capacity):
+        return cls._HEADER + ((capacity + 7) & ~7)
+
+    def _get(self, offset):
+        return self._POSITION.unpack_from(self.buf, offset)[0]
+
+    def _set(self, offset, value):
+        self._POSITION.pack_into(self.buf, offset, value)
+
+    def reset(self):
+        # only while no writer is running
+        self._set(self._WRITE, 0)
+        self._set(self._DROPPED, 0)
+        self._set(self._READ, 0)
+
+    @property
+    def dropped(self):
+        return self._get(self._DROPPED)
+
+    @property
+    def pending(self):
+        return self._get(self._WRITE) - self._get(self._READ)
+
+    def write(self, index, status, severity, typecode, stamp, payload):
+        size = self._RECORD.size + len(payload)
+        padded = (size + 7) & ~7
+        with self._lock:
+            write = self._get(self._WRITE)
+            offset = write % self.capacity
+            tail = self.capacity - offset
+            skip = tail if tail < padded else 0
+            if padded + skip > self.capacity - (write - self._get(self._READ)):
+                self._set(self._DROPPED, self._get(self._DROPPED) + 1)
+                return False
+
+            if skip:
+                self._INDEX.pack_into(self.buf, self._HEADER + offset, self._WRAP)
+                write += skip
+                offset = 0
+            start = self._HEADER + offset
+            self._RECORD.pack_into(self.buf, start, index, len(payload), status, severity, typecode, stamp)
+            start += self._RECORD.size
+            self.buf[start:start + len(payload)] = payload
+            # publish the record
+            self._set(self._WRITE, write + padded)
+            return True
+
+    def read(self, max_count=None):
+        records = []
+        write = self._get(self._WRITE)
+        read = self._get(self._READ)
+        while read < write and (max_count is None or len(records) < max_count):
+            offset = read % self.capacity
+            start = self._HEADER + offset
+            if self._INDEX.unpack_from(self.buf, start)[0] == self._WRAP:
+                read += self.capacity - offset
+                continue
+            index, size, status, severity, typecode, stamp = self._RECORD.unpack_from(self.buf, start)
+            start += self._RECORD.size
+            records.append((index, status, severity, typecode, stamp, bytes(self.buf[start:start + size])))
+            read += (self._RECORD.size + size + 7) & ~7
+        # release the space
+        self._set(self._READ, read)
+        return records
+
+
+def _encode(typecode, value):
+    if typecode == b's':
+        if isinstance(value, list):
+            value = '\0'.join(value)
+        return to_bytes(value)
+    if has_numpy and isinstance(value, numpy.ndarray):
+        return value.tobytes()
+    if not isinstance(value, list):
+        value = [value]
+    return array.array(to_string(typecode), value).tobytes()
+
+
+def _decode(typecode, payload, use_numpy):
+    if typecode == b's':
+        value = to_string(payload).split('\0')
+        return value[0] if len(value) == 1 else value
+    typecode = to_string(typecode)
+    if use_numpy:
+        value = numpy.frombuffer(payload, dtype=_DTYPES[typecode])
+        return value[0] if len(value) == 1 else value
+    value = array.array(typecode)
+    value.frombytes(payload)
+    return value[0] if len(value) == 1 else value.tolist()
+
+
+def _worker_main(shm_name, items, timeout, conn):
+    # the entry point of a worker process, items are (channel index, name)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = _Ring(shm.buf)
+
+    status = ca.create_context(True)
+    if status != ECA.NORMAL:
+        conn.send(('error', ca.message(status)))
+        return
+
+    indices = {}
+    by_name = dict((name, index) for index, name in items)
+    subscriptions = {}
+
+    def on_event(epics_arg):
+        if epics_arg['status'] != ECA.NORMAL:
+            return
+        typecode = _TYPECODES.get(epics_arg['type'])
+        if typecode is None:
+            return
+        chid = epics_arg['chid']
+        index = indices.get(chid)
+        if index is None:
+            # connected before create_channel returned
+            index = by_name[ca.name(chid)]
+        value = epics_arg['value']
+        ring.write(index, int(value['status']), int(value['severity']),
+                   typecode, value['stamp']['timestamp'], _encode(typecode, value['value']))
+
+    def on_connection(epics_arg):
+        chid = epics_arg['chid']
+        if epics_arg['op'] != CA_OP.CONN_UP or chid in subscriptions:
+            return
+        # subscriptions survive disconnections, subscribe once
+        chtype = dbf_type_to_DBR_TIME(ca.field_type(chid))
+        status, evid = ca.create_subscription(chid, on_event, chtype=chtype, use_numpy=has_numpy)
+        if status == ECA.NORMAL:
+            subscriptions[chid] = evid
+            ca.flush_io()
+
+    for index, name in items:
+        status, chid = ca.create_channel(name, on_connection)
+        if status == ECA.NORMAL:
+            indices[chid] = index
+    ca.flush_io()
+
+    # report once connected, or at the timeout
+    deadline = time.time() + timeout
+    while ca.connection_counts()[ChannelState.CONN] < len(items) and time.time() < deadline:
+        time.sleep(0.01)
+    conn.send(('ready', ca.connection_counts()[ChannelState.CONN]))
+
+    # serve until asked to stop, or until the parent process has gone
+    while True:
+        try:
+            if conn.poll(0.5) and conn.recv() == 'stop':
+                break
+        except (EOFError, OSError):
+            break
+
+    ca.destroy_context()
+    del ring
+    shm.close()
+
+
+class _Worker(object):
+    def __init__(self, index, items, capacity):
+        self.index = index
+        self.items = items
+        self.shm = shared_memory.SharedMemory(create=True, size=_Ring.size(capacity))
+        self.ring = _Ring(self.shm.buf, capacity)
+        self.ring.reset()
+        self.process = None
+        self.conn = None
+        self.connected = 0
+        self.restarts = 0
+        self.dropped = 0
+
+    def start(self, mp_context, timeout):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, name='CAWorker-%d' % self.index,
+                                          args=(self.shm.name, self.items, timeout, child_conn))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+    def poll_ready(self, timeout=0):
+        # :return: True once the worker has reported, raise if it has failed
+        try:
+            if not self.conn.poll(timeout):
+                return False
+            message, value = self.conn.recv()
+        except (EOFError, OSError):
+            raise RuntimeError('Worker %d exited during startup' % self.index)
+        if message == 'error':
+            raise RuntimeError('Worker %d failed: %s' % (self.index, value))
+        self.connected = value
+        return True
+
+    def stop(self, timeout):
+        if self.process is None:
+            return
+        try:
+            self.conn.send('stop')
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+
+    def release(self):
+        self.ring = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ProcessPool(object):
+    """
+    :param names:          Process variable names to subscribe.
+    :param int workers:    Number of worker processes.
+    :param int capacity:   Size in bytes of the ring buffer of each worker.
+    :param assign:         How channels are assigned to the workers, as for :class:`caffi.sharding.ShardedClient`.
+    :param float timeout:  Time in seconds :meth:`start` waits for the channels to connect.
+    :param bool use_numpy: Whether to return numeric waveforms as numpy arrays.
+    :param bool restart:   Whether to restart a worker which has exited unexpectedly.
+
+    A pool of worker processes, each owning a preemptive CA context and a share of the channels,
+    for subscribers whose decoding is bound by one interpreter. Each worker subscribes its channels
+    with the TIME type of their native type, decodes the updates and writes them into
+    a shared memory ring buffer, which the parent process reads without pickling.
+
+    The workers are spawned rather than forked, since forking a process with running library threads is unsafe.
+    Therefore the main module of the program must be importable, i.e. guard its start with ``if __name__ == '__main__'``.
+    ::
+
+        >>> with ProcessPool(names, workers=4) as pool:
+        ...     while True:
+        ...         for update in pool.read(timeout=1):
+        ...             print(update.name, update.value, update.timestamp)
+
+    The updates of a channel are read in order, while the updates of channels of different workers may interleave.
+    An update which does not fit into the ring buffer, because the parent reads too slowly, is dropped and counted.
+
+    A worker which has exited unexpectedly is found by :meth:`check`, which :meth:`read` calls.
+    The updates it has written are still read, then it is restarted with a cleared ring buffer,
+    and its channels reconnect and send their current values again.
+
+    The counters,
+
+    ==========  =============
+    attribute   value
+    ==========  =============
+    updates     number of updates read
+    restarts    number of workers restarted
+    ==========  =============
+
+    Requires :mod:`multiprocessing.shared_memory`, i.e. Python 3.8 or newer.
+    """
+    def __init__(self, names, workers=4, capacity=1 << 22, assign='name', timeout=5.0, use_numpy=False,
+                 restart=True):
+        if shared_memory is None:
+            raise RuntimeError('ProcessPool requires multiprocessing.shared_memory')
+        if assign != 'name' and not callable(assign):
+            raise ValueError("assign must be either 'name' or a function")
+        if use_numpy and not has_numpy:
+            raise ValueError('numpy is not available')
+
+        self.names = [to_string(name) for name in names]
+        self.timeout = timeout
+        self.use_numpy = use_numpy
+        self.restart = restart
+
+        self.updates = 0
+        self.restarts = 0
+
+        shards = [[] for _ in range(workers)]
+        for index, name in enumerate(self.names):
+            key = name if assign == 'name' else assign(name)
+            shards[_shard_index(key, workers)].append((index, name))
+
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._workers = []
+        self._started = False
+        # updates read from the ring of a crashed worker before it is reset
+        self._backlog = []
+        self._lock = threading.Lock()
+        try:
+            for index, items in enumerate(shards):
+                self._workers.append(_Worker(index, items, capacity))
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """
+        Start the workers and wait until they have connected their channels, or until the timeout.
+
+        :return: Number of channels connected
+        :raises RuntimeError: if a worker fails to start
+        """
+        if self._started:
+            return self.connected()
+
+        self._started = True
+        for worker in self._workers:
+            worker.start(self._mp_context, self.timeout)
+        try:
+            # allow for the interpreter startup beyond the connection timeout
+            deadline = time.time() + self.timeout + 30
+            for worker in self._workers:
+                if not worker.poll_ready(max(deadline - time.time(), 0)):
+                    raise RuntimeError('Worker %d did not start' % worker.index)
+        except Exception:
+            self.close()
+            raise
+        return self.connected()
+
+    def connected(self):
+        """
+        :return: Number of channels connected at the startup of the workers.
+        """
+        return sum(worker.connected for worker in self._workers)
+
+    def check(self):
+        """
+        Find the workers which have exited unexpectedly, and restart them if *restart* is True.
+
+        :return: A list of the indices of the workers which have exited.
+        """
+        exited = []
+        with self._lock:
+            for worker in self._workers:
+                if worker.process is None:
+                    continue
+                if worker.process.is_alive():
+                    # pick up the report of a restarted worker
+                    try:
+                        worker.poll_ready()
+                    except RuntimeError:
+                        pass
+                    continue
+                exited.append(worker.index)
+                worker.process.join()
+                worker.conn.close()
+                worker.process = None
+
+                # keep what it has written, then start again from an empty ring
+                self._backlog.extend(self._decode(worker.ring.read()))
+                worker.dropped += worker.ring.dropped
+                worker.ring.reset()
+                if self.restart:
+                    worker.start(self._mp_context, self.timeout)
+                    worker.restarts += 1
+                    self.restarts += 1
+        return exited
+
+    def _decode(self, records):
+        names = self.names
+        use_numpy = self.use_numpy
+        return [Update(names[index], _decode(typecode, payload, use_numpy), status, severity, stamp)
+                for index, status, severity, typecode, stamp, payload in records]
+
+    def read(self, max_count=None, timeout=0):
+        """
+        Read the updates received by the workers.
+
+        :param int max_count:  Maximum number of updates to read from each worker. Default is all.
+        :param float timeout:  Time in seconds to wait for an update if there is none.
+        :return: A list of :class:`Update`, i.e. (name, value, status, severity, timestamp) tuples,
+                 where status and severity are those of the alarm.
+        """
+        deadline = time.time() + timeout
+        while True:
+            self.check()
+            with self._lock:
+                updates, self._backlog = self._backlog, []
+                for worker in self._workers:
+                    updates.extend(self._decode(worker.ring.read(max_count)))
+            if updates or time.time() >= deadline:
+                break
+            time.sleep(0.001)
+
+        self.updates += len(updates)
+        return updates
+
+    def statistics(self):
+        """
+        :return: A list of dicts, one for each worker, of,
+
+            ========  =============
+            field     value
+            ========  =============
+            pid       process id, or None if it is not running
+            channels  number of channels
+            connected number of channels connected at its last startup
+            restarts  number of restarts
+            dropped   number of updates dropped because the ring buffer was full
+            pending   number of bytes written and not yet read
+            ========  =============
+
+        """
+        statistics = []
+        for worker in self._workers:
+            statistics.append({
+                'pid': worker.process.pid if worker.process is not None else None,
+                'channels': len(worker.items),
+                'connected': worker.connected,
+                'restarts': worker.restarts,
+                'dropped': worker.dropped + worker.ring.dropped,
+                'pending': worker.ring.pending,
+            })
+        return statistics
+
+    def close(self):
+        """
+        Stop the workers, which clear their channels, and release the shared memory.
+        The updates not read yet are discarded.
+        """
+        with self._lock:
+            for worker in self._workers:
+                worker.stop(self.timeout)
+                worker.release()
+            self._workers = []
+            self._backlog = []
@@ -0,0 +1,332 @@
+"""
+Channels shared by process variable name on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import collections
+import threading
+import time
+
+from . import ca
+from .compat import to_string
+from .constants import ECA, CA_PRIORITY
+from .context import Context
+
+__all__ = ['ChannelHandle', 'ChannelRegistry', 'ChannelPool', 'registry']
+
+
+class ChannelHandle(object):
+    """
+    A reference to a channel shared through a :class:`ChannelRegistry`.
+    Call :meth:`release` when it is not needed any more, or use it as a context manager.
+
+    ========  =============
+    attribute value
+    ========  =============
+    name      process variable name
+    priority  channel priority
+    chid      channel identifier
+    ========  =============
+
+    """
+    __slots__ = ('name', 'priority', 'chid', '_registry', '_key')
+
+    def __init__(self, registry, key, chid):
+        self._registry = registry
+        self._key = key
+        self.name = key[1]
+        self.priority = key[2]
+        self.chid = chid
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def release(self):
+        """
+        Release the reference. The channel is cleared when the last reference has been released.
+        Releasing more than once has no effect.
+
+        A thread attached to another context, or to none, may release the reference. It is attached temporarily
+        to the context of the channel to clear it, see :class:`caffi.context.Context`.
+
+        :raises RuntimeError: if the calling thread cannot join the context of the channel,
+                              in which case the reference is kept.
+        """
+        if self._registry is not None:
+            registry, self._registry = self._registry, None
+            try:
+                registry._release(self._key)
+            except RuntimeError:
+                self._registry = registry
+                raise
+
+
+class ChannelRegistry(object):
+    """
+    A registry which creates one channel for each process variable name and priority,
+    and shares it among all users through reference counted :class:`ChannelHandle`.
+    The channel is cleared only when the last handle has been released.
+
+    The channels are shared within the CA context of the calling thread,
+    because a channel can only be used by threads attached to the context which created it.
+    A thread without context gets the default non-preemptive one on its first :meth:`acquire`,
+    as the library would create when creating the channel.
+    ::
+
+        >>> status, handle = registry.acquire('catest')
+        >>> status, other = registry.acquire('catest')
+        >>> handle.chid == other.chid
+        True
+        >>> registry.lookup('catest') == handle.chid
+        True
+        >>> handle.release()
+        >>> other.release()
+        >>> registry.lookup('catest') is None
+        True
+
+    """
+    def __init__(self):
+        # (context, name, priority) -> [chid, reference count]
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, name, priority):
+        return ca.current_context(), to_string(name), int(priority)
+
+    def acquire(self, name, priority=CA_PRIORITY.DEFAULT):
+        """
+        Get a reference to the channel of the name and priority, creating the channel if it does not exist yet.
+
+        :param name:     Process variable name
+        :param priority: Channel priority, see :func:`caffi.ca.create_channel`
+        :return: (:class:`ECA`, :class:`ChannelHandle` or None)
+
+            - :data:`ECA.NORMAL` - Normal successful completion
+            - Other status codes returned by :func:`caffi.ca.create_channel`
+
+        A new channel is created without connection callback, use :func:`caffi.ca.pend_io` or
+        :func:`caffi.ca.connect_async` to wait for the connection.
+        """
+        if ca.current_context() is None:
+            # key the channel under the context it is created in
+            ca.create_context(False)
+        key = self._key(name, priority)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                status, chid = ca.create_channel(key[1], priority=key[2])
+                if status != ECA.NORMAL:
+                    return status, None
+                entry = self._entries[key] = [chid, 0]
+            entry[1] += 1
+            return ECA.NORMAL, ChannelHandle(self, key, entry[0])
+
+    def lookup(self, name, priority=CA_PRIORITY.DEFAULT):
+        """
+        :param name:     Process variable name
+        :param priority: Channel priority
+        :return: The channel identifier if the channel exists in the registry, otherwise None.
+        """
+        entry = self._entries.get(self._key(name, priority))
+        if entry is None:
+            return None
+        return entry[0]
+
+    def refcount(self, name, priority=CA_PRIORITY.DEFAULT):
+        """
+        :param name:     Process variable name
+        :param priority: Channel priority
+        :return: Number of handles not yet released of the channel.
+        """
+        entry = self._entries.get(self._key(name, priority))
+        if entry is None:
+            return 0
+        return entry[1]
+
+    def _release(self, key):
+        if key[0] != ca.current_context():
+            # the channel can only be cleared within its context
+            with Context(context=key[0]):
+                self._release(key)
+            return
+
+        with self._lock:
+            entry = self._entries[key]
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._entries[key]
+        ca.clear_channel(entry[0])
+        ca.flush_io()
+
+
+class ChannelPool(object):
+    """
+    :param int max_size:         Maximum number of channels kept in the pool.
+    :param float idle_timeout:   Time in seconds after which a channel not used is cleared. None to keep them.
+    :param int priority:         Priority of the channels, see :func:`caffi.ca.create_channel`
+
+    A pool of channels by name, for applications which touch many distinct process variables over time.
+    The least recently used channels beyond *max_size*, or not used within *idle_timeout*, are cleared,
+    unless they have subscriptions. An evicted channel is recreated transparently when it is used again.
+    Therefore always get the channel identifier from :meth:`get`, instead of keeping it.
+
+    A pool belongs to the CA context of the thread of its first :meth:`get`, which gets the default
+    non-preemptive context if it has none, as in :meth:`ChannelRegistry.acquire`. Use one pool per context.
+    ::
+
+        >>> pool = ChannelPool(max_size=1000, idle_timeout=600)
+        >>> status, chid = pool.get('catest')
+        >>> ca.connect_async(chid).result(2)
+        <ECA.NORMAL: 1>
+
+    The counters,
+
+    ===========  =============
+    attribute    value
+    ===========  =============
+    hits         number of uses of an existing channel
+    created      number of channels created, including the recreations
+    recreations  number of channels created again after being evicted, among the latest *max_size* evicted names
+    evictions    number of channels cleared by the pool
+    ===========  =============
+
+    """
+    def __init__(self, max_size=1000, idle_timeout=None, priority=CA_PRIORITY.DEFAULT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.priority = priority
+
+        self.hits = 0
+        self.created = 0
+        self.recreations = 0
+        self.evictions = 0
+
+        # name -> (chid, last use time), in the order of use
+        self._channels = collections.OrderedDict()
+        # names evicted and not yet recreated, the latest max_size of them
+        self._evicted = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # the context of the channels, bound by the first get
+        self._context = None
+
+    def __len__(self):
+        return len(self._channels)
+
+    def get(self, name):
+        """
+        Get the channel of the name, creating it if it is not in the pool. Idle channels are evicted meanwhile.
+
+        :param name: Process variable name
+        :return: (:class:`ECA`, channel identifier or None)
+
+            - :data:`ECA.NORMAL` - Normal successful completion
+            - Other status codes returned by :func:`caffi.ca.create_channel`
+
+        A new channel is created without connection callback, use :func:`caffi.ca.pend_io` or
+        :func:`caffi.ca.connect_async` to wait for the connection.
+
+        :raises RuntimeError: if the calling thread is attached to another context than the pool.
+        """
+        name = to_string(name)
+        now = time.time()
+        with self._lock:
+            if self._context is None:
+                if ca.current_context() is None:
+                    ca.create_context(False)
+                self._context = ca.current_context()
+            self._check_context()
+            entry = self._channels.pop(name, None)
+            if entry is not None:
+                self.hits += 1
+                chid = entry[0]
+            else:
+                status, chid = ca.create_channel(name, priority=self.priority)
+                if status != ECA.NORMAL:
+                    return status, None
+                self.created += 1
+                if name in self._evicted:
+                    del self._evicted[name]
+                    self.recreations += 1
+            self._channels[name] = (chid, now)
+            victims = self._evict(now)
+
+        self._clear(victims)
+        return ECA.NORMAL, chid
+
+    def evict_idle(self):
+        """
+        Evict the channels not used within the idle timeout, or beyond the maximum size.
+        :meth:`get` does this already, call it periodically if the pool may be unused for long.
+
+        :return: Number of channels evicted
+        :raises RuntimeError: if the calling thread is attached to another context than the pool.
+        """
+        with self._lock:
+            self._check_context()
+            victims = self._evict(time.time())
+        self._clear(victims)
+        return len(victims)
+
+    def clear(self):
+        """
+        Clear all channels of the pool, including those with subscriptions.
+
+        :raises RuntimeError: if the calling thread is attached to another context than the pool.
+        """
+        with self._lock:
+            self._check_context()
+            channels, self._channels = self._channels, collections.OrderedDict()
+            self._evicted.clear()
+        for chid, _ in channels.values():
+            ca.clear_channel(chid)
+        ca.flush_io()
+
+    def _check_context(self):
+        # called with the lock held, the channels can only be used and cleared within their context
+        if self._context is not None and ca.current_context() != self._context:
+            raise RuntimeError('The pool belongs to another CA context')
+
+    def _clear(self, victims):
+        # Called without the lock, because clearing a channel waits for its callbacks in progress,
+        # which may use the pool.
+        for chid in victims:
+            ca.clear_channel(chid)
+        if victims:
+            ca.flush_io()
+
+    def _evict(self, now):
+        # called with the lock held, check from the least recently used, return the channels to clear
+        victims = []
+        busy = []
+        while self._channels:
+            name, (chid, last_use) = next(iter(self._channels.items()))
+            expired = self.idle_timeout is not None and now - last_use > self.idle_timeout
+            if len(self._channels) + len(busy) <= self.max_size and not expired:
+                break
+
+            del self._channels[name]
+            if ca.subscription_count(chid) > 0:
+                # in use by subscriptions, check again after the others
+                busy.append((name, (chid, now)))
+                continue
+
+            victims.append(chid)
+            self._evicted[name] = None
+            if len(self._evicted) > self.max_size:
+                # forget the oldest, not to grow with every name ever used
+                self._evicted.popitem(last=False)
+
+        self._channels.update(busy)
+        self.evictions += len(victims)
+        return victims
+
+
+#: The registry shared by all modules of the process
+registry = ChannelRegistry()
@@ -0,0 +1,230 @@
+"""
+Channels spread over several CA contexts on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import time
+import zlib
+
+from . import ca
+from .compat import to_bytes
+from .constants import ECA, CA_PRIORITY
+from .context import Context
+
+__all__ = ['ShardedClient']
+
+
+def _shard_index(key, shards):
+    # stable across processes and runs, unlike hash()
+    return (zlib.crc32(to_bytes(str(key))) & 0xffffffff) % shards
+
+
+class _Shard(object):
+    def __init__(self, index):
+        self.index = index
+        self.context = Context()
+        self.channels = 0
+
+
+class ShardedClient(object):
+    """
+    :param int shards: Number of CA contexts.
+    :param assign:     How channels are assigned to the contexts. 'name' to hash the process variable name,
+                       or a function of the name returning the key to hash instead, e.g. the name of the IOC
+                       serving it, so that all channels of an IOC share the same context.
+
+    A client which spreads the channels over several preemptive CA contexts, each created and owned by its own thread.
+    Each context has its own circuits to the servers, and so its own library receive threads,
+    so that the subscription updates of different contexts are received in parallel.
+
+    The methods have the same arguments and return values as those of :mod:`caffi.ca`.
+    They are executed within the context of the channel, to which the calling thread is attached temporarily,
+    see :class:`caffi.context.Context`. The preemptive CA context of the calling thread, if any, is restored afterwards.
+    A thread attached to a non-preemptive context cannot use the client, as it could not join its context again,
+    and the calls raise RuntimeError.
+    A thread making many calls on the channels of one shard can attach itself to that context,
+    see :attr:`contexts` and :meth:`shard_of`, to save the temporary attachment.
+    ::
+
+        >>> client = ShardedClient(4)
+        >>> status, chid = client.create_channel('catest')
+        >>> client.pend_io(2)
+        <ECA.NORMAL: 1>
+        >>> status, evid = client.create_subscription(chid, callback)
+        >>> client.flush_io()
+        >>> client.close()
+
+    The callbacks are called from the library threads of the context of the channel.
+    """
+    def __init__(self, shards=4, assign='name'):
+        if assign != 'name' and not callable(assign):
+            raise ValueError("assign must be either 'name' or a function")
+        if shards < 1:
+            raise ValueError('shards must be at least 1')
+
+        self.assign = assign
+        self._shards = []
+        try:
+            for index in range(shards):
+                self._shards.append(_Shard(index))
+        except RuntimeError:
+            self.close()
+            raise
+
+        # chid -> shard, evid -> (shard, chid)
+        self._channels = {}
+        self._subscriptions = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def contexts(self):
+        """
+        The CA contexts of the shards.
+        """
+        return [shard.context.context for shard in self._shards]
+
+    def shard_of(self, name):
+        """
+        :param str name: Process variable name
+        :return: The index of the shard the channel of the name is assigned to.
+        :raises RuntimeError: if the client has been closed.
+        """
+        if not self._shards:
+            raise RuntimeError('The client has been closed')
+        key = name if self.assign == 'name' else self.assign(name)
+        return _shard_index(key, len(self._shards))
+
+    def _call(self, shard, function, *args, **kwargs):
+        with shard.context:
+            return function(*args, **kwargs)
+
+    def _shard(self, chid):
+        return self._channels.get(chid)
+
+    def call(self, chid, function, *args, **kwargs):
+        """
+        Call any function of :mod:`caffi.ca` within the context of the channel.
+
+        :param chid:     Channel identifier
+        :param function: The function, called with the remaining arguments
+        :return: The return value of the function, or :data:`ECA.BADCHID` if the channel is unknown.
+        """
+        shard = self._shard(chid)
+        if shard is None:
+            return ECA.BADCHID
+        return self._call(shard, function, *args, **kwargs)
+
+    def create_channel(self, name, callback=None, priority=CA_PRIORITY.DEFAULT):
+        """
+        Create a channel in the context it is assigned to, see :func:`caffi.ca.create_channel`.
+        """
+        shard = self._shards[self.shard_of(name)]
+        status, chid = self._call(shard, ca.create_channel, name, callback, priority)
+        if status == ECA.NORMAL:
+            self._channels[chid] = shard
+            shard.channels += 1
+        return status, chid
+
+    def clear_channel(self, chid):
+        """
+        See :func:`caffi.ca.clear_channel`.
+        """
+        shard = self._channels.pop(chid, None)
+        if shard is None:
+            return ECA.BADCHID
+        shard.channels -= 1
+        for evid, (_, evid_chid) in list(self._subscriptions.items()):
+            if evid_chid == chid:
+                self._subscriptions.pop(evid, None)
+        return self._call(shard, ca.clear_channel, chid)
+
+    def connect_async(self, chid):
+        """
+        See :func:`caffi.ca.connect_async`.
+        """
+        shard = self._shard(chid)
+        if shard is None:
+            # an already completed future with the failure
+            return ca.connect_async(chid)
+        return self._call(shard, ca.connect_async, chid)
+
+    def get(self, chid, *args, **kwargs):
+        """
+        See :func:`caffi.ca.get`.
+        """
+        shard = self._shard(chid)
+        if shard is None:
+            return ECA.BADCHID, None
+        return self._call(shard, ca.get, chid, *args, **kwargs)
+
+    def put(self, chid, *args, **kwargs):
+        """
+        See :func:`caffi.ca.put`.
+        """
+        return self.call(chid, ca.put, chid, *args, **kwargs)
+
+    def create_subscription(self, chid, *args, **kwargs):
+        """
+        See :func:`caffi.ca.create_subscription`.
+        """
+        shard = self._shard(chid)
+        if shard is None:
+            return ECA.BADCHID, None
+        status, evid = self._call(shard, ca.create_subscription, chid, *args, **kwargs)
+        if status == ECA.NORMAL:
+            self._subscriptions[evid] = (shard, chid)
+        return status, evid
+
+    def clear_subscription(self, evid):
+        """
+        See :func:`caffi.ca.clear_subscription`.
+        """
+        entry = self._subscriptions.pop(evid, None)
+        if entry is None:
+            return ECA.BADCHID
+        return self._call(entry[0], ca.clear_subscription, evid)
+
+    def flush_io(self):
+        """
+        Flush the send buffers of all contexts.
+        """
+        for shard in self._shards:
+            self._call(shard, ca.flush_io)
+        return ECA.NORMAL
+
+    def pend_io(self, timeout):
+        """
+        Wait until the outstanding get requests and connections of all contexts have completed,
+        see :func:`caffi.ca.pend_io`. The timeout applies to the whole wait, 0 to wait forever.
+
+        :return: :data:`ECA.NORMAL` if all have completed, otherwise the first failure status.
+        """
+        result = ECA.NORMAL
+        deadline = time.time() + timeout
+        for shard in self._shards:
+            remaining = 0 if timeout <= 0 else max(deadline - time.time(), 1e-6)
+            status = self._call(shard, ca.pend_io, remaining)
+            if status != ECA.NORMAL and result == ECA.NORMAL:
+                result = status
+        return result
+
+    def statistics(self):
+        """
+        :return: A list of the number of channels of each shard.
+        """
+        return [shard.channels for shard in self._shards]
+
+    def close(self):
+        """
+        Destroy all contexts, which clears their channels.
+        """
+        for shard in self._shards:
+            shard.context.close()
+        self._shards = []
+        self._channels = {}
+        self._subscriptions = {}
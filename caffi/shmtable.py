@@ -0,0 +1,286 @@
+"""
+A shared memory table of the latest values of subscriptions on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import json
+import os
+import struct
+import threading
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from . import ca
+from .compat import to_bytes, to_string
+from .constants import ECA, CA_OP, AlarmCondition, AlarmSeverity
+from .dbr import has_numpy
+from .macros import dbf_type_to_DBR_TIME
+from .procpool import Update, _TYPECODES, _encode, _decode
+
+__all__ = ['TablePublisher', 'TableReader']
+
+_MAGIC = b'CAFFITBL'
+_FORMAT_VERSION = 1
+
+# magic, version, number of slots, slot size, directory size, offset of the first slot
+_HEADER = struct.Struct('<8sIIIIQ')
+_DIRECTORY = 64
+_ALIGN = 64
+
+# sequence counter, odd while the slot is being written
+_SEQUENCE = struct.Struct('<Q')
+# type code, alarm status, alarm severity, payload size, time stamp
+_META = struct.Struct('<cxHH2xI4xd')
+_PAYLOAD = _SEQUENCE.size + _META.size
+
+# the segments created by this process, which must stay tracked
+_created = set()
+
+
+def _align(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class TablePublisher(object):
+    """
+    :param str table:       Name of the shared memory segment, shared with the readers.
+    :param names:           Process variable names to publish.
+    :param int value_size:  Bytes reserved for the value of each channel. Longer values are truncated.
+
+    A publisher which subscribes the channels in the calling thread's CA context, and keeps the latest value,
+    alarm status, alarm severity and time stamp of each channel in a shared memory table,
+    so that any number of local processes read them with :class:`TableReader` without CA traffic.
+
+    Each slot of the table is guarded by a sequence counter, incremented before and after each write.
+    A reader copies a slot between two reads of the counter, and retries if the counter was odd or has changed,
+    so that it never waits for the publisher nor sees a partial update.
+    ::
+
+        >>> publisher = TablePublisher('beamline', names)        # in the publishing process
+        >>> reader = TableReader('beamline')                     # in any process of the host
+        >>> reader.get('catest')
+        Update(name='catest', value=1.5, status=0, severity=0, timestamp=1760000000.1)
+
+    A disconnected channel keeps its last value with the alarm status :data:`AlarmCondition.Comm`
+    and the alarm severity :data:`AlarmSeverity.Invalid`.
+
+    The counters,
+
+    ==========  =============
+    attribute   value
+    ==========  =============
+    updates     number of updates written
+    truncated   number of updates whose value did not fit into *value_size*
+    ==========  =============
+
+    Requires :mod:`multiprocessing.shared_memory`, i.e. Python 3.8 or newer.
+    """
+    def __init__(self, table, names, value_size=64):
+        if shared_memory is None:
+            raise RuntimeError('TablePublisher requires multiprocessing.shared_memory')
+
+        self.names = [to_string(name) for name in names]
+        self.value_size = value_size
+
+        self.updates = 0
+        self.truncated = 0
+
+        directory = to_bytes(json.dumps(self.names))
+        self._slot_size = _align(_PAYLOAD + value_size)
+        self._first = _align(_DIRECTORY + len(directory))
+        size = self._first + self._slot_size * len(self.names)
+
+        self._shm = shared_memory.SharedMemory(name=table, create=True, size=size)
+        _created.add(self._shm.name)
+        buf = self._shm.buf
+        buf[_DIRECTORY:_DIRECTORY + len(directory)] = directory
+        _HEADER.pack_into(buf, 0, _MAGIC, _FORMAT_VERSION, len(self.names), self._slot_size, len(directory),
+                          self._first)
+
+        # writes of the library threads
+        self._lock = threading.Lock()
+        # chid -> slot offset
+        self._slots = {}
+        self._subscriptions = {}
+        for index, name in enumerate(self.names):
+            status, chid = ca.create_channel(name, self._on_connection)
+            if status == ECA.NORMAL:
+                self._slots[chid] = self._first + index * self._slot_size
+        ca.flush_io()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def table(self):
+        """
+        The name of the shared memory segment.
+        """
+        return self._shm.name
+
+    def _write(self, offset, typecode, status, severity, stamp, payload=None, truncated=False):
+        # payload None keeps the value
+        buf = self._shm.buf
+        with self._lock:
+            if payload is not None:
+                self.updates += 1
+                self.truncated += truncated
+            sequence = _SEQUENCE.unpack_from(buf, offset)[0]
+            _SEQUENCE.pack_into(buf, offset, sequence + 1)
+            if payload is None:
+                typecode, _, _, size, stamp = _META.unpack_from(buf, offset + _SEQUENCE.size)
+            else:
+                size = len(payload)
+                start = offset + _PAYLOAD
+                buf[start:start + size] = payload
+            _META.pack_into(buf, offset + _SEQUENCE.size, typecode, status, severity, size, stamp)
+            _SEQUENCE.pack_into(buf, offset, sequence + 2)
+
+    def _on_connection(self, epics_arg):
+        chid = epics_arg['chid']
+        offset = self._slots.get(chid)
+        if offset is None:
+            # connected before create_channel returned
+            offset = self._first + self.names.index(ca.name(chid)) * self._slot_size
+        if epics_arg['op'] != CA_OP.CONN_UP:
+            self._write(offset, None, AlarmCondition.Comm, AlarmSeverity.Invalid, None)
+            return
+        if chid in self._subscriptions:
+            # subscriptions survive disconnections, subscribe once
+            return
+        chtype = dbf_type_to_DBR_TIME(ca.field_type(chid))
+        callback = lambda epics_arg: self._on_event(offset, epics_arg)
+        status, evid = ca.create_subscription(chid, callback, chtype=chtype, use_numpy=has_numpy)
+        if status == ECA.NORMAL:
+            self._subscriptions[chid] = evid
+            ca.flush_io()
+
+    def _on_event(self, offset, epics_arg):
+        if epics_arg['status'] != ECA.NORMAL:
+            return
+        typecode = _TYPECODES.get(epics_arg['type'])
+        if typecode is None:
+            return
+        value = epics_arg['value']
+        payload = _encode(typecode, value['value'])
+        truncated = len(payload) > self.value_size
+        if truncated:
+            # keep whole elements
+            itemsize = 1 if typecode == b's' else struct.calcsize(to_string(typecode))
+            payload = payload[:self.value_size // itemsize * itemsize]
+        self._write(offset, typecode, int(value['status']), int(value['severity']),
+                    value['stamp']['timestamp'], payload, truncated)
+
+    def close(self):
+        """
+        Clear the channels and remove the table. Attached readers keep the last values.
+        """
+        for chid in list(self._slots):
+            ca.clear_channel(chid)
+        ca.flush_io()
+        self._slots = {}
+        self._subscriptions = {}
+        _created.discard(self._shm.name)
+        self._shm.close()
+        self._shm.unlink()
+
+
+class TableReader(object):
+    """
+    :param str table:      Name of the shared memory segment of a :class:`TablePublisher`.
+    :param bool use_numpy: Whether to return numeric waveforms as numpy arrays.
+    :param float timeout:  Time in seconds :meth:`get` retries a slot which is being written.
+
+    A reader of the table published by a :class:`TablePublisher`, possibly in another process.
+    It needs no CA context and generates no CA traffic.
+
+    :raises ValueError: if the shared memory segment is not a table.
+    """
+    def __init__(self, table, use_numpy=False, timeout=1.0):
+        if shared_memory is None:
+            raise RuntimeError('TableReader requires multiprocessing.shared_memory')
+
+        self.use_numpy = use_numpy
+        self.timeout = timeout
+        self._shm = shared_memory.SharedMemory(name=table)
+        if os.name == 'posix' and self._shm.name not in _created:
+            # the table belongs to the publisher, do not let this process remove it when it exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+
+        buf = self._shm.buf
+        magic, version, count, self._slot_size, size, self._first = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            self.close()
+            raise ValueError('%s is not a table of version %d' % (table, _FORMAT_VERSION))
+        names = json.loads(to_string(bytes(buf[_DIRECTORY:_DIRECTORY + size])))
+        self._offsets = dict((name, self._first + index * self._slot_size) for index, name in enumerate(names))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._offsets
+
+    def names(self):
+        """
+        :return: A list of the process variable names in the table.
+        """
+        return list(self._offsets)
+
+    def get(self, name):
+        """
+        :param str name: Process variable name
+        :return: :class:`caffi.procpool.Update` of the latest value, or None if it has never been received.
+        :raises KeyError: if the name is not in the table.
+        :raises RuntimeError: if the slot is still being written after the timeout,
+                              e.g. because the publisher has died in the middle of a write.
+        """
+        name = to_string(name)
+        offset = self._offsets[name]
+        buf = self._shm.buf
+        tries = 0
+        deadline = None
+        while True:
+            sequence = _SEQUENCE.unpack_from(buf, offset)[0]
+            if not sequence & 1:
+                typecode, status, severity, size, stamp = _META.unpack_from(buf, offset + _SEQUENCE.size)
+                payload = bytes(buf[offset + _PAYLOAD:offset + _PAYLOAD + size])
+                if _SEQUENCE.unpack_from(buf, offset)[0] == sequence:
+                    break
+            tries += 1
+            if tries % 100 == 0:
+                # the publisher may have been preempted in the middle of a write
+                now = time.time()
+                if deadline is None:
+                    deadline = now + self.timeout
+                elif now > deadline:
+                    raise RuntimeError('The slot of %s is still being written' % name)
+                time.sleep(0)
+
+        if typecode == b'\0':
+            return None
+        return Update(name, _decode(typecode, payload, self.use_numpy), status, severity, stamp)
+
+    def get_many(self, names):
+        """
+        :param names: Process variable names
+        :return: A dict of the :class:`caffi.procpool.Update` of each name, see :meth:`get`.
+        """
+        return dict((name, self.get(name)) for name in names)
+
+    def close(self):
+        """
+        Detach from the table.
+        """
+        self._shm.close()
@@ -0,0 +1,161 @@
+"""
+Repeated snapshots of many channels on top of :mod:`caffi.ca` synchronous groups.
+
+"""
+from __future__ import (print_function, absolute_import)
+
+from . import ca
+from ._ca import ffi, libca
+from .constants import ECA
+from .dbr import DBR, has_numpy, numpy, dbr_time_dtype, STAMP_NOT_COMPLETED
+from .macros import *
+
+__all__ = ['Snapshot']
+
+
+class Snapshot(object):
+    """
+    :param chids:     Sequence of channel identifiers
+    :param chtype:    The plain type of the values, :class:`caffi.dbr.DBR`
+    :param int count: Element count to read from each channel.
+                      It is limited to the native element count of each channel.
+
+    A reusable snapshot of many channels. The result buffers are allocated once at construction,
+    and each :meth:`acquire` reads all channels within one synchronous group into the same buffers.
+    The results are exposed as numpy columns, one row for each channel,
+
+    ==========  =============
+    attribute   value
+    ==========  =============
+    values      the values, a 2D array if *count* is larger than 1
+    counts      number of elements read from each channel
+    severities  alarm severities
+    timestamps  POSIX time stamps in seconds
+    statuses    status code of each channel, :class:`caffi.constants.ECA`
+    ==========  =============
+
+    The columns are updated in place, copy them to keep the results of one acquisition.
+    The values of a channel are only valid if its status is :data:`ECA.NORMAL`.
+    The elements of a channel beyond its native element count are zero.
+    The channels must not be cleared while the snapshot is in use. It requires numpy.
+    ::
+
+        >>> snapshot = Snapshot(chids, DBR.DOUBLE)
+        >>> snapshot.acquire(2)
+        <ECA.NORMAL: 1>
+        >>> snapshot.values
+        array([1.5, 3. , 1. ])
+
+    """
+    def __init__(self, chids, chtype=DBR.DOUBLE, count=1):
+        if not has_numpy:
+            raise ImportError('Snapshot requires numpy')
+        if not dbr_type_is_plain(chtype):
+            raise ValueError('chtype must be a plain DBR type')
+
+        self.chids = list(chids)
+        self.chtype = DBR(chtype)
+        self.count = count
+
+        size = len(self.chids)
+        self._request_type = dbf_type_to_DBR_TIME(chtype)
+        # round up so that every structure is aligned
+        itemsize = (dbr_size_n(self._request_type, count) + 7) // 8 * 8
+        self._buffer = ffi.new('char[]', max(size * itemsize, 1))
+        self._pointers = [self._buffer + index * itemsize for index in range(size)]
+
+        records = numpy.frombuffer(ffi.buffer(self._buffer), dtype=dbr_time_dtype(chtype, count, itemsize),
+                                   count=size)
+        self._seconds = records['seconds']
+        self._nanoseconds = records['nanoseconds']
+        self._incomplete = numpy.zeros(size, dtype=bool)
+
+        self.values = records['value']
+        self.counts = numpy.zeros(size, dtype=numpy.int64)
+        self.severities = records['severity']
+        self.timestamps = numpy.zeros(size)
+        self._zero = numpy.zeros((), dtype=self.values.dtype)
+        self.statuses = numpy.zeros(size, dtype=numpy.int32)
+
+        self._gid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def acquire(self, timeout=1.0):
+        """
+        Read all channels into the columns and wait until they have completed.
+
+        :param float timeout: Time in seconds to wait. A timeout of zero waits forever, as :func:`caffi.ca.sg_block`.
+        :return:
+            - :data:`ECA.NORMAL` - Normal successful completion
+            - :data:`ECA.TIMEOUT` - Some values did not arrive in time, their status is :data:`ECA.TIMEOUT`
+            - Other status codes returned by :func:`caffi.ca.sg_create` or :func:`caffi.ca.sg_block`
+
+        A disconnected channel gets status :data:`ECA.DISCONN`, and a channel whose request the server failed
+        gets :data:`ECA.GETFAIL`, without affecting the others.
+        It must not be called from within a CA callback.
+        """
+        if self._gid is None:
+            status, gid = ca.sg_create()
+            if status != ECA.NORMAL:
+                return status
+            self._gid = gid
+
+        self._nanoseconds.fill(STAMP_NOT_COMPLETED)
+        self.statuses.fill(ECA_NORMAL)
+
+        gid = self._gid
+        request_type = self._request_type
+        count = self.count
+        element_count = libca.ca_element_count
+        sg_array_get = libca.ca_sg_array_get
+        counts = self.counts
+        failures = []
+        for index, (chid, pointer) in enumerate(zip(self.chids, self._pointers)):
+            native_count = element_count(chid)
+            if native_count == 0:
+                counts[index] = 0
+                failures.append((index, ECA_DISCONN))
+                continue
+            request_count = counts[index] = min(count, native_count)
+            status = sg_array_get(gid, request_type, request_count, chid, pointer)
+            if status != ECA_NORMAL:
+                failures.append((index, status))
+
+        status = libca.ca_sg_block(gid, timeout)
+        if status == ECA_TIMEOUT:
+            # discard the outstanding requests, so that late values do not arrive into the columns
+            libca.ca_sg_reset(gid)
+        elif status != ECA_NORMAL:
+            self.statuses.fill(status)
+            return ECA(status)
+
+        numpy.equal(self._nanoseconds, STAMP_NOT_COMPLETED, out=self._incomplete)
+        finished = status == ECA_NORMAL
+        for index in numpy.flatnonzero(self._incomplete).tolist():
+            self.statuses[index] = ca._incomplete_status(self.chids[index], finished)
+        for index, failure in failures:
+            self.statuses[index] = failure
+
+        if count > 1:
+            # the requests only write the elements read, clear the rest of the previous acquisition
+            for index in numpy.flatnonzero(counts < count).tolist():
+                self.values[index, counts[index]:] = self._zero
+
+        numpy.multiply(self._nanoseconds, 1e-9, out=self.timestamps)
+        numpy.add(self.timestamps, self._seconds, out=self.timestamps)
+        numpy.add(self.timestamps, POSIX_TIME_AT_EPICS_EPOCH, out=self.timestamps)
+
+        return ECA(status)
+
+    def close(self):
+        """
+        Delete the synchronous group.
+        """
+        if self._gid is not None:
+            ca.sg_delete(self._gid)
+            self._gid = None
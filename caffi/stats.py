@@ -0,0 +1,147 @@
+"""
+Statistics aggregated per server on top of :mod:`caffi.ca`.
+
+"""
+from __future__ import (print_function, absolute_import)
+import math
+import time
+
+from . import ca
+from .constants import ChannelState
+
+__all__ = ['all_channels', 'connection_summary', 'circuit_table']
+
+
+def _percentile(values, fraction):
+    # nearest rank of the sorted values
+    if not values:
+        return None
+    rank = int(math.ceil(fraction * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+def all_channels():
+    """
+    :return: a list of the identifiers of all existing channels of the calling thread's CA context.
+    """
+    chids = []
+    for state in (ChannelState.NEVER_CONN, ChannelState.CONN, ChannelState.PREV_CONN):
+        chids.extend(ca.channels_in_state(state))
+    return chids
+
+
+def connection_summary(chids=None):
+    """
+    Aggregate the connection statistics, see :func:`caffi.ca.connection_statistics`, by server.
+
+    :param chids: Channel identifiers to include. Default is all channels of the calling thread's CA context.
+    :return: a dict keyed by server host name as :func:`caffi.ca.host_name`,
+             or None for the channels never connected. Each item is a dict of,
+
+        ================  =============
+        field             value
+        ================  =============
+        channels          number of channels
+        connected         number of channels currently connected
+        connect_time_p50  median seconds from creation to the first connection
+        connect_time_p99  99th percentile seconds from creation to the first connection
+        connect_time_max  maximum seconds from creation to the first connection
+        disconnects       total number of disconnections, i.e. flaps
+        reconnects        total number of reconnections
+        downtime          total seconds disconnected
+        ================  =============
+
+    """
+    if chids is None:
+        chids = all_channels()
+
+    connected = ca.channels_in_state(ChannelState.CONN)
+    summary = {}
+    connect_times = {}
+    for chid in chids:
+        statistics = ca.connection_statistics(chid)
+        if statistics is None:
+            continue
+
+        host = statistics['host']
+        item = summary.get(host)
+        if item is None:
+            item = summary[host] = {
+                'channels': 0,
+                'connected': 0,
+                'disconnects': 0,
+                'reconnects': 0,
+                'downtime': 0.,
+            }
+            connect_times[host] = []
+
+        item['channels'] += 1
+        if chid in connected:
+            item['connected'] += 1
+        item['disconnects'] += statistics['disconnects']
+        item['reconnects'] += statistics['reconnects']
+        item['downtime'] += statistics['downtime']
+        if statistics['connect_time'] is not None:
+            connect_times[host].append(statistics['connect_time'])
+
+    for host, item in summary.items():
+        values = sorted(connect_times[host])
+        item['connect_time_p50'] = _percentile(values, 0.5)
+        item['connect_time_p99'] = _percentile(values, 0.99)
+        item['connect_time_max'] = values[-1] if values else None
+
+    return summary
+
+
+def circuit_table(previous=None):
+    """
+    Tabulate the traffic of each circuit, see :func:`caffi.ca.circuit_statistics`, with the rates.
+
+    :param previous: A table returned by a previous call. The rates are averaged since then,
+                     or since the circuit came up if it is None or the circuit is not in it.
+    :return: a list of dicts sorted by *events_per_second* in descending order, with the fields of
+             :func:`caffi.ca.circuit_statistics` and,
+
+        =================  =============
+        field              value
+        =================  =============
+        host               server host name
+        priority           channel priority
+        time               POSIX time the table was taken
+        events_per_second  subscription updates received per second
+        bytes_per_second   payload bytes received per second
+        =================  =============
+
+    Call it periodically with the previous table to spot the busiest servers::
+
+        >>> table = circuit_table()
+        >>> time.sleep(10)
+        >>> table = circuit_table(table)
+        >>> for row in table[:5]:
+        ...     print(row['host'], row['subscriptions'], row['events_per_second'])
+
+    """
+    now = time.time()
+    before = {}
+    if previous is not None:
+        for row in previous:
+            before[(row['host'], row['priority'])] = row
+
+    table = []
+    for (host, priority), item in ca.circuit_statistics().items():
+        row = dict(item, host=host, priority=priority, time=now)
+        last = before.get((host, priority))
+        if last is not None:
+            elapsed = now - last['time']
+            events = item['events'] - last['events']
+            received = item['bytes'] - last['bytes']
+        else:
+            elapsed = now - item['since']
+            events = item['events']
+            received = item['bytes']
+        row['events_per_second'] = events / elapsed if elapsed > 0 else 0.
+        row['bytes_per_second'] = received / elapsed if elapsed > 0 else 0.
+        table.append(row)
+
+    table.sort(key=lambda row: row['events_per_second'], reverse=True)
+    return table
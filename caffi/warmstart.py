@@ -0,0 +1,191 @@
+"""
+Warm start of channel searches from the servers learned in a previous run.
+
+"""
+from __future__ import (print_function, absolute_import)
+import json
+import os
+import tempfile
+import time
+
+from . import ca
+from .constants import ChannelState
+
+__all__ = ['WarmStartCache']
+
+_FORMAT_VERSION = 1
+
+
+class WarmStartCache(object):
+    """
+    :param str path:        File storing the cache
+    :param float max_age:   Time in seconds after which an entry not refreshed by :meth:`record` expires.
+
+    An on-disk cache of the server, as given by :func:`caffi.ca.host_name`, of each process variable.
+    After a restart, :meth:`configure` directs the searches to the known servers
+    through the environment variables read by the client library, which must be done before
+    :func:`caffi.ca.create_context`. Once the channels have connected, :meth:`record` and :meth:`save`
+    refresh the cache for the next start.
+    ::
+
+        >>> cache = WarmStartCache('/var/cache/myapp/servers.json')
+        >>> cache.load()
+        30000
+        >>> added = cache.configure(names)
+        >>> ca.create_context()
+        <ECA.NORMAL: 1>
+        >>> connected, missing = ca.create_channels(names, 5)
+        >>> cache.record(connected.values())
+        >>> cache.save()
+
+    """
+    def __init__(self, path, max_age=7 * 86400):
+        self.path = path
+        self.max_age = max_age
+        # name -> (host, port, time last seen)
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def load(self):
+        """
+        Read the cache file. A missing or malformed file gives an empty cache,
+        and malformed or expired entries are dropped.
+
+        :return: Number of valid entries
+        """
+        self._entries = {}
+        try:
+            with open(self.path) as f:
+                content = json.load(f)
+        except (IOError, OSError, ValueError):
+            return 0
+
+        if not isinstance(content, dict) or content.get('version') != _FORMAT_VERSION:
+            return 0
+        entries = content.get('entries')
+        if not isinstance(entries, dict):
+            return 0
+
+        now = time.time()
+        for name, entry in entries.items():
+            try:
+                host, port, seen = entry
+                port = int(port)
+                seen = float(seen)
+            except (TypeError, ValueError):
+                continue
+            if not host or not 0 < port < 65536 or not self._fresh(seen, now):
+                continue
+            self._entries[name] = (str(host), port, seen)
+
+        return len(self._entries)
+
+    def save(self):
+        """
+        Write the cache file, dropping the expired entries.
+        The file is replaced atomically, so that a concurrent reader never sees a partial file.
+        """
+        now = time.time()
+        entries = dict((name, list(entry)) for name, entry in self._entries.items() if self._fresh(entry[2], now))
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.warmstart')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': _FORMAT_VERSION, 'entries': entries}, f)
+            if os.name == 'nt' and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(temp_path, self.path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def record(self, chids=None):
+        """
+        Learn the servers of the connected channels. The entries of the channels not connected are kept
+        until they expire, so that a server being down at the time does not lose its entries.
+
+        :param chids: Channel identifiers. Default is all connected channels.
+        :return: Number of entries recorded
+        """
+        if chids is None:
+            chids = ca.channels_in_state(ChannelState.CONN)
+
+        now = time.time()
+        recorded = 0
+        for chid in chids:
+            if ca.state(chid) != ChannelState.CONN:
+                continue
+            host, _, port = ca.host_name(chid).rpartition(':')
+            if not host or not port.isdigit():
+                continue
+            self._entries[ca.name(chid)] = (host, int(port), now)
+            recorded += 1
+        return recorded
+
+    def forget(self, name):
+        """
+        Drop the entry of a process variable, e.g. after it has been removed.
+
+        :param str name: Process variable name
+        """
+        self._entries.pop(name, None)
+
+    def servers(self, names=None):
+        """
+        :param names: Process variable names. Default is all names in the cache.
+        :return: A sorted list of the distinct (host, port) of the names which are in the cache.
+        """
+        if names is None:
+            entries = self._entries.values()
+        else:
+            entries = [self._entries[name] for name in names if name in self._entries]
+        return sorted(set((host, port) for host, port, _ in entries))
+
+    def configure(self, names=None, mode='addr_list', exclusive=False, environ=None):
+        """
+        Direct the searches to the servers of the names, by prepending them to the search list
+        of the client library. It has no effect on contexts already created.
+
+        :param names:          Process variable names. Default is all names in the cache.
+        :param str mode:       'addr_list' to send UDP searches to the server hosts via ``EPICS_CA_ADDR_LIST``,
+                               or 'name_servers' to search over TCP connections to the servers
+                               via ``EPICS_CA_NAME_SERVERS``.
+        :param bool exclusive: If True, disable the broadcast to the automatic address list,
+                               i.e. only the servers in the cache and the existing list are searched.
+                               Names not in the cache may then be found only if the existing list covers them.
+        :param environ:        Mapping to modify. Default is :data:`os.environ`.
+        :return: The servers added
+
+        In 'addr_list' mode, only the host is used and the search goes to the default server port,
+        because the learned port is the TCP port which may differ from the UDP search port.
+        """
+        if mode not in ('addr_list', 'name_servers'):
+            raise ValueError("mode must be either 'addr_list' or 'name_servers'")
+        if environ is None:
+            environ = os.environ
+
+        servers = self.servers(names)
+        if mode == 'addr_list':
+            variable = 'EPICS_CA_ADDR_LIST'
+            added = sorted(set(host for host, _ in servers))
+        else:
+            variable = 'EPICS_CA_NAME_SERVERS'
+            added = ['%s:%d' % server for server in servers]
+
+        existing = environ.get(variable, '').split()
+        addresses = added + [address for address in existing if address not in added]
+        if addresses:
+            environ[variable] = ' '.join(addresses)
+        if exclusive:
+            environ['EPICS_CA_AUTO_ADDR_LIST'] = 'NO'
+
+        return added
+
+    def _fresh(self, seen, now):
+        return self.max_age is None or now - seen <= self.max_age
@@ -0,0 +1,375 @@
+"""
+Writers on top of :mod:`caffi.ca` for streams of put requests.
+
+"""
+from __future__ import (print_function, absolute_import)
+import collections
+import threading
+import time
+
+from . import ca
+from ._ca import libca
+from .constants import ECA
+
+__all__ = ['CoalescingWriter', 'PipelinedWriter']
+
+
+class CoalescingWriter(object):
+    """
+    :param float rate: Number of flushes per second done by the background flusher.
+                       If it is None or 0, values are only written when :meth:`flush_io` is called.
+
+    A write-behind writer which keeps only the latest pending value of each channel.
+    Values submitted faster than they are flushed supersede each other,
+    and only the latest one is written to the server.
+
+    The background flusher joins the CA context of the thread creating the writer.
+    Therefore it requires a preemptive context. A flush which raises an exception is counted,
+    and the flusher carries on with the next one.
+    ::
+
+        >>> writer = CoalescingWriter(rate=None)
+        >>> for i in range(1000):
+        ...     writer.submit(chid, i)
+        >>> writer.flush_io()
+        1
+        >>> writer.superseded
+        999
+
+    The counters,
+
+    ==========  =============
+    attribute   value
+    ==========  =============
+    submitted   number of values submitted
+    superseded  number of values replaced by a later value before being written
+    written     number of values written successfully
+    failed      number of values whose put request failed
+    flushes     number of flushes that wrote at least one value
+    errors      number of background flushes which raised an exception
+    ==========  =============
+
+    :raises RuntimeError: if *rate* is given and the calling thread has no preemptive CA context.
+    """
+    def __init__(self, rate=10):
+        self.submitted = 0
+        self.superseded = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.errors = 0
+
+        self._pending = {}
+        # protects the pending values and the counters
+        self._lock = threading.Lock()
+        # serializes flushes, so that older values never overtake newer ones
+        self._flush_lock = threading.Lock()
+
+        self._stopped = threading.Event()
+        self._thread = None
+        if rate:
+            self._interval = 1.0 / rate
+            self._context = ca.current_context()
+            if self._context is None or not libca.ca_preemtive_callback_is_enabled():
+                raise RuntimeError('The calling thread has no preemptive CA context')
+            self._thread = threading.Thread(target=self._run, name='CoalescingWriter')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        # the context was checked to be preemptive
+        ca.attach_context(self._context)
+
+        while not self._stopped.wait(self._interval):
+            try:
+                self.flush_io()
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+
+        ca.detach_context()
+
+    def submit(self, chid, value, chtype=None):
+        """
+        Submit a value to be written to the channel. It replaces the pending value of the channel, if any.
+
+        :param chid:   Channel identifier
+        :param value:  A scalar or array value, as accepted by :func:`caffi.ca.put`
+        :param chtype: The external type of the supplied value. Default is the native type.
+        """
+        with self._lock:
+            if chid in self._pending:
+                self.superseded += 1
+            self._pending[chid] = (value, chtype)
+            self.submitted += 1
+
+    def pending(self):
+        """
+        :return: Number of channels with a value waiting to be written.
+        """
+        return len(self._pending)
+
+    def flush_io(self):
+        """
+        Write the pending values of all channels, and flush the requests to the server.
+
+        :return: Number of values written
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            # group by the requested type, in most cases it is the native type
+            groups = {}
+            for chid, (value, chtype) in pending.items():
+                chids, values = groups.setdefault(chtype, ([], []))
+                chids.append(chid)
+                values.append(value)
+
+            written = 0
+            try:
+                for chtype, (chids, values) in groups.items():
+                    statuses = ca.put_many(chids, values, chtype)
+                    written += statuses.count(ECA.NORMAL)
+            finally:
+                # the values of the groups not written are failed
+                with self._lock:
+                    self.written += written
+                    self.failed += len(pending) - written
+                    self.flushes += 1
+
+            return written
+
+    def close(self):
+        """
+        Stop the background flusher and write the remaining pending values.
+        """
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        self.flush_io()
+
+
+class PipelinedWriter(object):
+    """
+    :param int window:   Maximum number of outstanding put callbacks in each group.
+    :param str group_by: 'circuit' to group channels by the server they are connected to, as given by
+                         :func:`caffi.ca.host_name`, or 'channel' to apply the window to each channel.
+
+    A writer which issues put requests with callback, see :func:`caffi.ca.put`, while keeping
+    at most *window* of them outstanding per group. Further values are queued and issued as
+    the completions arrive, so that the server is kept busy without overrunning its put callback processing.
+
+    A channel is grouped by the server it is connected to when a value is submitted with no earlier value pending,
+    so that a channel which reconnects to another server joins the group of that server.
+
+    The completions are processed in the CA callback thread. Therefore it requires a preemptive context.
+    ::
+
+        >>> writer = PipelinedWriter(window=4)
+        >>> for i in range(1000):
+        ...     writer.submit(chid, i)
+        >>> writer.wait(10)
+        True
+        >>> writer.statistics()['completed']
+        1000
+
+    :raises RuntimeError: if the calling thread has no preemptive CA context.
+    """
+    def __init__(self, window=8, group_by='circuit'):
+        if group_by not in ('circuit', 'channel'):
+            raise ValueError("group_by must be either 'circuit' or 'channel'")
+        if ca.current_context() is None or not libca.ca_preemtive_callback_is_enabled():
+            # the completions would only be processed while waiting in pend_event
+            raise RuntimeError('The calling thread has no preemptive CA context')
+
+        self.window = window
+        self.group_by = group_by
+
+        # (group key, connection generation, connected) of each channel
+        self._groups = {}
+        # number of values of each channel queued or outstanding, which keep the channel in its group
+        self._pending = collections.defaultdict(int)
+        # number of outstanding requests of each group
+        self._outstanding = collections.defaultdict(int)
+        # queued (chid, value, chtype, callback) of each group
+        self._queued = collections.defaultdict(collections.deque)
+        # (issue time, callback, group key) of the outstanding requests of each channel, in the order of issue
+        self._inflight = collections.defaultdict(collections.deque)
+        # groups being issued by some thread, so that values of the same group are issued in order
+        self._pumping = set()
+        # protects all the above and notifies when all groups become idle
+        self._idle = threading.Condition(threading.Lock())
+
+        self._start_time = None
+        self._completed = 0
+        self._failed = 0
+        self._latency_count = 0
+        self._latency_sum = 0.
+        self._latency_max = 0.
+
+    def _group(self, chid):
+        # called with the lock held
+        if self.group_by == 'channel':
+            return chid
+
+        entry = self._groups.get(chid)
+        if entry is not None and self._pending[chid]:
+            # the values of a channel are issued in order within one group
+            return entry[0]
+        generation = ca.connection_generation()
+        if entry is not None and entry[1:] == (generation, True):
+            return entry[0]
+        # never looked up, disconnected, or any connection changed since, the channel may have moved
+        key = ca.host_name(chid)
+        self._groups[chid] = (key, generation, ca.state(chid) == ca.ChannelState.CONN)
+        return key
+
+    def _account(self, status, latency=None):
+        # called with the lock held
+        if status == ECA.NORMAL:
+            self._completed += 1
+        else:
+            self._failed += 1
+        if latency is not None:
+            self._latency_count += 1
+            self._latency_sum += latency
+            self._latency_max = max(self._latency_max, latency)
+
+    def _reserve(self, key):
+        # take the queued values for which the group has room, called with the lock held
+        requests = []
+        queued = self._queued[key]
+        while queued and self._outstanding[key] < self.window:
+            chid, value, chtype, callback = queued.popleft()
+            entry = (time.time(), callback, key)
+            self._inflight[chid].append(entry)
+            self._outstanding[key] += 1
+            requests.append((chid, value, chtype, callback, entry))
+        return requests
+
+    def _pump(self, key):
+        with self._idle:
+            if key in self._pumping:
+                return
+            self._pumping.add(key)
+
+        while True:
+            with self._idle:
+                requests = self._reserve(key)
+                if not requests:
+                    self._pumping.discard(key)
+                    if not self._outstanding[key] and not self._queued[key]:
+                        self._idle.notify_all()
+                    return
+
+            # The lock is not held while issuing the requests, because the completions may arrive meanwhile.
+            for chid, value, chtype, callback, entry in requests:
+                status = ca.put(chid, value, chtype, callback=self._on_completion)
+                if status == ECA.NORMAL:
+                    continue
+
+                with self._idle:
+                    self._inflight[chid].remove(entry)
+                    self._outstanding[key] -= 1
+                    self._pending[chid] -= 1
+                    self._account(status)
+                if callable(callback):
+                    callback({'chid': chid, 'type': ca.DBR.INVALID, 'count': 0, 'status': status})
+
+            ca.flush_io()
+
+    def _on_completion(self, epics_arg):
+        chid = epics_arg['chid']
+        with self._idle:
+            # the group the request was issued in, even if the channel has moved since
+            issue_time, callback, key = self._inflight[chid].popleft()
+            self._account(epics_arg['status'], time.time() - issue_time)
+            self._outstanding[key] -= 1
+            self._pending[chid] -= 1
+
+        if callable(callback):
+            callback(epics_arg)
+
+        self._pump(key)
+
+    def submit(self, chid, value, chtype=None, callback=None):
+        """
+        Queue a value to be written to the channel. It is issued immediately if the window has room.
+
+        :param chid:     Channel identifier
+        :param value:    A scalar or array value, as accepted by :func:`caffi.ca.put`
+        :param chtype:   The external type of the supplied value. Default is the native type.
+        :param callback: Optional user callback, called with the same argument as for :func:`caffi.ca.put`.
+                         If the request cannot be issued, it is called with the failure status.
+        """
+        with self._idle:
+            if self._start_time is None:
+                self._start_time = time.time()
+            key = self._group(chid)
+            self._queued[key].append((chid, value, chtype, callback))
+            self._pending[chid] += 1
+
+        self._pump(key)
+
+    def wait(self, timeout=None):
+        """
+        Wait until all submitted values have been written and completed.
+
+        :param float timeout: Maximum time to wait in seconds. None to wait forever.
+        :return: True if all have completed, False if timed out.
+        """
+        def idle():
+            return not any(self._outstanding.values()) and not any(self._queued.values())
+
+        with self._idle:
+            if timeout is None:
+                while not idle():
+                    self._idle.wait()
+                return True
+
+            deadline = time.time() + timeout
+            while not idle():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+            return True
+
+    def statistics(self):
+        """
+        :return: A dict of the following fields
+
+            ==============  =============
+            field           value
+            ==============  =============
+            completed       number of puts completed successfully
+            failed          number of puts failed
+            outstanding     number of puts waiting for completion
+            queued          number of values waiting to be issued
+            throughput      completed puts per second since the first submission
+            latency_mean    mean round trip time in seconds, from issue to completion
+            latency_max     maximum round trip time in seconds
+            ==============  =============
+        """
+        with self._idle:
+            elapsed = time.time() - self._start_time if self._start_time is not None else 0
+            return {
+                'completed': self._completed,
+                'failed': self._failed,
+                'outstanding': sum(self._outstanding.values()),
+                'queued': sum(len(queued) for queued in self._queued.values()),
+                'throughput': self._completed / elapsed if elapsed > 0 else 0.,
+                'latency_mean': self._latency_sum / self._latency_count if self._latency_count else 0.,
+                'latency_max': self._latency_max,
+            }
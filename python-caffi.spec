@@ -9,7 +9,7 @@ Vendor: Xiaoqiang Wang <xiaoqiang.wang AT psi DOT ch>
 Url: https://github.com/CaChannel/caffi
 
 BuildRequires: python-setuptools
-Requires: python-cffi python-enum34
+Requires: python-cffi python-enum34 python-futures
 
 # Do not check .so files in the python_sitelib directory
 # or any files in the application's directory for provides
@@ -35,6 +35,8 @@ _version = load_module('_version','caffi/_version.py')
 requirements = ['cffi>=1.3.0']
 if sys.hexversion < 0x03040000:
     requirements.append('enum34')
+if sys.hexversion < 0x03020000:
+    requirements.append('futures')
 
 setup(name='caffi',
       version=_version.__version__,
@@ -0,0 +1,88 @@
+from __future__ import print_function
+import time
+import caffi.ca as ca
+from caffi.cache import ValueCache
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def create_channels(names):
+    chids = []
+    for name in names:
+        status, chid = ca.create_channel(name)
+        assert status == ca.ECA.NORMAL
+        chids.append(chid)
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    return chids
+
+
+def read_value(chid, chtype=None, max_age=None):
+    status, dbrvalue = ca.get(chid, chtype, max_age=max_age)
+    assert status == ca.ECA.NORMAL
+
+    status = ca.pend_io(2)
+    assert status == ca.ECA.NORMAL
+
+    return dbrvalue.get()
+
+
+def test_cache():
+    chids = create_channels(['catest', 'calong', 'cabo'])
+    cache = ValueCache(capacity=2)
+    ca.set_value_cache(cache)
+    try:
+        assert ca.put(chids[0], 1.5) == ca.ECA.NORMAL
+        ca.flush_io()
+
+        # the first read misses and subscribes the channel
+        assert read_value(chids[0], max_age=10) == 1.5
+        assert (cache.hits, cache.misses) == (0, 1)
+        time.sleep(0.5)
+
+        # then served from the monitor updates
+        assert read_value(chids[0], max_age=10) == 1.5
+        assert ca.put(chids[0], 2.5) == ca.ECA.NORMAL
+        ca.flush_io()
+        time.sleep(0.5)
+        assert read_value(chids[0], max_age=10) == 2.5
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        # another DBR class misses
+        assert read_value(chids[0], ca.DBR.TIME_DOUBLE, max_age=10)['value'] == 2.5
+        assert (cache.hits, cache.misses) == (2, 2)
+
+        # not used without max_age
+        assert read_value(chids[0]) == 2.5
+        assert (cache.hits, cache.misses) == (2, 2)
+
+        # the least recently used automatic subscription is evicted, except for pinned channels
+        cache.pin(chids[0])
+        for chid in chids[1:]:
+            read_value(chid, max_age=10)
+        assert cache.evictions == 1
+        time.sleep(0.5)
+        assert read_value(chids[0], max_age=10) == 2.5
+        assert read_value(chids[2], max_age=10) == read_value(chids[2])
+        assert (cache.hits, cache.misses) == (4, 4)
+        # evicted
+        read_value(chids[1], max_age=10)
+        assert (cache.hits, cache.misses) == (4, 5)
+    finally:
+        ca.set_value_cache(None)
+        cache.clear()
+
+    for chid in chids:
+        ca.clear_channel(chid)
+    ca.flush_io()
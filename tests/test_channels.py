@@ -0,0 +1,418 @@
+from __future__ import print_function
+import threading
+import time
+import caffi.ca as ca
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def create_channels():
+    start = time.time()
+    connected, missing = ca.create_channels(['catest', 'calong', 'catest'], 5)
+    # returns as soon as all have connected
+    assert time.time() - start < 2
+    assert sorted(connected) == ['calong', 'catest']
+    assert missing == []
+
+    start = time.time()
+    connected2, missing = ca.create_channels(['cabo', 'catest_missing'], 1)
+    assert time.time() - start < 2
+    assert list(connected2) == ['cabo']
+    assert missing == ['catest_missing']
+    connected.update(connected2)
+
+    # no channel is left for pend_io to wait
+    assert ca.pend_io(1) == ca.ECA.NORMAL
+
+    for chid in connected.values():
+        assert ca.state(chid) == ca.ChannelState.CONN
+        ca.clear_channel(chid)
+    ca.flush_io()
+
+
+def test_create_channels():
+    create_channels()
+
+
+def test_create_channels_non_preemptive():
+    errors = []
+
+    def run():
+        try:
+            # create preemptive disabled context
+            status = ca.create_context(False)
+            assert status == ca.ECA.NORMAL
+            create_channels()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            ca.destroy_context()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    assert not errors
+
+
+def test_registry():
+    from caffi.registry import ChannelRegistry
+    registry = ChannelRegistry()
+
+    status, handle = registry.acquire('catest')
+    assert status == ca.ECA.NORMAL
+    status, other = registry.acquire(b'catest')
+    assert status == ca.ECA.NORMAL
+    status, high = registry.acquire('catest', ca.CA_PRIORITY.MAX)
+    assert status == ca.ECA.NORMAL
+    assert ca.pend_io(2) == ca.ECA.NORMAL
+
+    # shared by name and priority
+    assert handle.chid == other.chid != high.chid
+    assert registry.lookup('catest') == handle.chid
+    assert registry.refcount('catest') == 2
+    assert len(registry) == 2
+
+    handle.release()
+    handle.release()
+    assert registry.refcount('catest') == 1
+    assert ca.state(other.chid) == ca.ChannelState.CONN
+
+    other.release()
+    with high:
+        pass
+    assert registry.lookup('catest') is None
+    assert len(registry) == 0
+
+    # released by a thread without context, the channel is cleared in its own context
+    status, handle = registry.acquire('catest')
+    assert status == ca.ECA.NORMAL
+    errors = []
+
+    def release():
+        try:
+            handle.release()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=release)
+    thread.start()
+    thread.join()
+    assert not errors
+    assert registry.lookup('catest') is None
+    assert ca.connection_statistics(handle.chid) is None
+
+    # the first acquire of a thread without context is keyed under the context it creates
+    found = []
+
+    def acquire():
+        try:
+            status, handle = registry.acquire('catest')
+            found.append(registry.lookup('catest') == handle.chid)
+            handle.release()
+            found.append(registry.lookup('catest') is None)
+        finally:
+            ca.destroy_context()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    thread.join()
+    assert found == [True, True]
+
+
+def test_pool():
+    from caffi.registry import ChannelPool
+    pool = ChannelPool(max_size=2, idle_timeout=0.5)
+
+    status, chid = pool.get('catest')
+    assert status == ca.ECA.NORMAL
+    assert ca.connect_async(chid).result(2) == ca.ECA.NORMAL
+    status, evid = ca.create_subscription(chid, lambda epics_arg: None)
+    assert status == ca.ECA.NORMAL
+
+    for name in ['calong', 'cabo', 'calong']:
+        status, chid = pool.get(name)
+        assert status == ca.ECA.NORMAL
+    # the least recently used without subscription is evicted, and recreated on the next use
+    assert len(pool) == 2
+    assert (pool.hits, pool.created, pool.recreations, pool.evictions) == (0, 4, 1, 2)
+    assert ca.connect_async(chid).result(2) == ca.ECA.NORMAL
+
+    # idle channels are evicted, except for the subscribed
+    time.sleep(0.6)
+    assert pool.evict_idle() == 1
+    assert len(pool) == 1
+    assert ca.subscription_count(pool.get('catest')[1]) == 1
+    assert pool.hits == 1
+
+    pool.clear()
+    assert len(pool) == 0
+
+    # the evicted names are remembered up to the size of the pool
+    pool = ChannelPool(max_size=1)
+    for name in ['catest', 'calong', 'cabo', 'castr']:
+        pool.get(name)
+    assert pool.evictions == 3
+    assert len(pool._evicted) == 1
+    pool.get('castr')
+    pool.get('catest')
+    assert pool.recreations == 0
+    pool.clear()
+
+    # a connection callback using the pool while its channel is evicted
+    pool = ChannelPool(max_size=1)
+    entered = threading.Event()
+
+    def on_connection(epics_arg):
+        entered.set()
+        time.sleep(0.2)
+        pool.get('cabo')
+
+    status, chid = pool.get('catest')
+    ca.change_connection_event(chid, on_connection)
+    ca.flush_io()
+    assert entered.wait(2)
+    context = ca.current_context()
+
+    def evict():
+        ca.attach_context(context)
+        pool.get('calong')
+        ca.detach_context()
+
+    evicting = threading.Thread(target=evict)
+    evicting.daemon = True
+    evicting.start()
+    evicting.join(5)
+    assert not evicting.is_alive()
+
+    # the pool belongs to one context
+    errors = []
+
+    def other_context():
+        ca.create_context(True)
+        try:
+            pool.get('catest')
+        except RuntimeError as e:
+            errors.append(e)
+        finally:
+            ca.destroy_context()
+
+    thread = threading.Thread(target=other_context)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+    pool.clear()
+
+
+def test_connection_index():
+    generation = ca.connection_generation()
+    counts = ca.connection_counts()
+
+    status, chid = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    status, missing = ca.create_channel('catest_missing', lambda epics_arg: None)
+    assert status == ca.ECA.NORMAL
+    assert ca.connection_generation() > generation
+
+    # channels without connection callback are indexed once connected, without polling
+    connected = ca.channels_in_state(ca.ChannelState.CONN)
+    deadline = time.time() + 2
+    while chid not in connected and time.time() < deadline:
+        time.sleep(0.01)
+    assert chid in connected
+    # pend_io still waits for them
+    assert ca.pend_io(2) == ca.ECA.NORMAL
+    assert chid in connected
+    assert missing in ca.channels_in_state(ca.ChannelState.NEVER_CONN)
+    assert ca.connection_counts() == {
+        ca.ChannelState.NEVER_CONN: counts[ca.ChannelState.NEVER_CONN] + 1,
+        ca.ChannelState.CONN: counts[ca.ChannelState.CONN] + 1,
+        ca.ChannelState.PREV_CONN: counts[ca.ChannelState.PREV_CONN],
+    }
+
+    # nothing changed
+    generation = ca.connection_generation()
+    assert ca.connection_generation() == generation
+
+    # the view follows the changes
+    ca.clear_channel(chid)
+    ca.clear_channel(missing)
+    ca.flush_io()
+    assert chid not in connected
+    assert ca.connection_counts() == counts
+    assert ca.connection_generation() > generation
+
+
+def test_connection_statistics():
+    from caffi.stats import connection_summary
+
+    connected, missing = ca.create_channels(['catest', 'calong'], 5)
+    status, never = ca.create_channel('catest_missing', lambda epics_arg: None)
+    assert status == ca.ECA.NORMAL
+
+    chid = connected['catest']
+    statistics = ca.connection_statistics(chid)
+    host = ca.host_name(chid)
+    assert statistics['host'] == host
+    assert statistics['created'] <= statistics['connected']
+    assert 0 <= statistics['connect_time'] < 5
+    assert (statistics['disconnects'], statistics['reconnects'], statistics['downtime']) == (0, 0, 0)
+
+    summary = connection_summary(list(connected.values()) + [never])
+    assert summary[host]['channels'] == 2
+    assert summary[host]['connected'] == 2
+    assert summary[host]['connect_time_p50'] <= summary[host]['connect_time_p99'] <= summary[host]['connect_time_max']
+    assert summary[None]['channels'] == 1
+    assert summary[None]['connect_time_p50'] is None
+
+    # a channel without callback is timed at its connection, not when pend_io notices it
+    status, late = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    time.sleep(1)
+    noticed = time.time()
+    assert ca.pend_io(2) == ca.ECA.NORMAL
+    assert ca.connection_statistics(late)['connected'] < noticed
+    ca.clear_channel(late)
+
+    # the server of a channel connected by its connection handler is looked up when asked for
+    up = threading.Event()
+    status, watched = ca.create_channel('calong', lambda epics_arg: up.set())
+    assert status == ca.ECA.NORMAL
+    assert up.wait(5)
+    assert ca.connection_statistics(watched)['host'] == host
+    assert ca.circuit_statistics()[(host, ca.CA_PRIORITY.DEFAULT)]['channels'] >= 3
+    ca.clear_channel(watched)
+
+    for chid in list(connected.values()) + [never]:
+        ca.clear_channel(chid)
+    ca.flush_io()
+    assert ca.connection_statistics(chid) is None
+
+
+def test_circuit_statistics():
+    from caffi.stats import circuit_table
+
+    connected, missing = ca.create_channels(['catest', 'cawave'], 5)
+    chid = connected['catest']
+    key = (ca.host_name(chid), ca.CA_PRIORITY.DEFAULT)
+    before = ca.circuit_statistics()[key]
+
+    events = []
+    status, evid = ca.create_subscription(chid, events.append)
+    assert status == ca.ECA.NORMAL
+
+    puts = []
+    gets = []
+    assert ca.put(chid, 1) == ca.ECA.NORMAL
+    assert ca.put(chid, 2, callback=puts.append) == ca.ECA.NORMAL
+    assert ca.get(chid, callback=gets.append)[0] == ca.ECA.NORMAL
+    ca.get_many(list(connected.values()))
+    ca.pend_event(1)
+    assert len(puts) == 1 and len(gets) == 1
+
+    after = ca.circuit_statistics()[key]
+    assert after['channels'] >= 2
+    assert after['subscriptions'] == before['subscriptions'] + 1
+    assert after['events'] - before['events'] == len(events) >= 1
+    assert after['bytes'] > before['bytes']
+    assert after['gets'] - before['gets'] == 3
+    assert after['puts'] - before['puts'] == 2
+    assert after['pending_gets'] == after['pending_puts'] == 0
+
+    table = circuit_table()
+    row = [row for row in table if (row['host'], row['priority']) == key][0]
+    assert row['events'] == after['events']
+    assert row['events_per_second'] > 0
+    table = circuit_table(table)
+    assert all(row['events_per_second'] >= 0 for row in table)
+
+    ca.clear_subscription(evid)
+    for chid in connected.values():
+        ca.clear_channel(chid)
+    ca.flush_io()
+
+
+def test_connection_batcher():
+    from caffi.batch import ConnectionBatcher
+
+    names = ['catest', 'calong', 'cabo', 'castr', 'cacalc']
+    batches = []
+    with ConnectionBatcher(batches.append, interval=0.5, max_size=3) as batcher:
+        chids = [ca.create_channel(name, batcher)[1] for name in names]
+        ca.flush_io()
+        start = time.time()
+        while batcher.changes < len(names) and time.time() - start < 5:
+            time.sleep(0.05)
+
+    assert batcher.changes == len(names)
+    assert 2 <= batcher.batches == len(batches) < len(names)
+    assert all(len(batch) <= 3 for batch in batches)
+    changes = [change for batch in batches for change in batch]
+    assert sorted(chid for chid, op in changes) == sorted(chids)
+    assert all(op == ca.CA_OP.CONN_UP for chid, op in changes)
+
+    # without dispatcher thread, deliver on demand
+    batches = []
+    batcher = ConnectionBatcher(batches.append, interval=None)
+    for chid in chids:
+        ca.change_connection_event(chid, batcher)
+    status, chid = ca.create_channel('cawave', batcher)
+    chids.append(chid)
+    ca.pend_event(0.5)
+    assert batcher.pending() == 1
+    assert batcher.dispatch() == 1
+    assert batches == [[(chid, ca.CA_OP.CONN_UP)]]
+
+    for chid in chids:
+        ca.clear_channel(chid)
+    ca.flush_io()
+
+
+def test_connection_batcher_errors():
+    from caffi.batch import ConnectionBatcher
+
+    names = ['catest', 'calong', 'cabo']
+    batches = []
+
+    def on_changes(changes):
+        batches.append(changes)
+        if len(batches) == 1:
+            raise ValueError('first batch')
+
+    with ConnectionBatcher(on_changes, interval=0.5, max_size=2) as batcher:
+        chids = [ca.create_channel(name, batcher)[1] for name in names]
+        ca.flush_io()
+        start = time.time()
+        while batcher.changes < len(names) and time.time() - start < 5:
+            time.sleep(0.05)
+
+    # the dispatcher survives and delivers the rest
+    assert batcher.errors == 1
+    changes = [change for batch in batches for change in batch]
+    assert sorted(chid for chid, op in changes) == sorted(chids)
+
+    # a thread without context cannot create a dispatcher
+    errors = []
+
+    def create():
+        try:
+            ConnectionBatcher(on_changes)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=create)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+
+    for chid in chids:
+        ca.clear_channel(chid)
+    ca.flush_io()
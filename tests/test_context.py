@@ -1,6 +1,10 @@
 from __future__ import (print_function, absolute_import)
 import threading
+import time
+import pytest
 import caffi.ca as ca
+from caffi.context import Context, ContextExecutor
+from caffi.sharding import ShardedClient
 
 
 # each thread creates its own context
@@ -76,3 +80,165 @@ def test_shared_contexts():
 
     # destroy the context
     ca.destroy_context()
+
+
+def test_context_registries():
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+    status, chid = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    status, missing = ca.create_channel('catest_missing')
+    assert status == ca.ECA.NORMAL
+    status = ca.pend_io(5)
+    status, evid = ca.create_subscription(chid, None)
+    assert status == ca.ECA.NORMAL
+    future = ca.connect_async(missing)
+    assert ca.connection_counts()[ca.ChannelState.CONN] == 1
+    assert ca.subscription_count(chid) == 1
+
+    # channels of another context are not visible to its threads
+    results = {}
+
+    def other_context():
+        ca.create_context(True)
+        status, other = ca.create_channel('cawave')
+        ca.pend_io(5)
+        results['counts'] = ca.connection_counts()
+        results['subscriptions'] = ca.subscription_count(chid)
+        results['clear'] = ca.clear_channel(chid)
+        ca.destroy_context()
+
+    tid = threading.Thread(target=other_context)
+    tid.start()
+    tid.join()
+    assert results['counts'][ca.ChannelState.CONN] == 1
+    assert results['counts'][ca.ChannelState.NEVER_CONN] == 0
+    assert results['subscriptions'] == 0
+    assert results['clear'] == ca.ECA.BADCHID
+    assert ca.subscription_count(chid) == 1
+
+    # destroying the context releases its channels in bulk
+    ca.destroy_context()
+    assert future.result(1) == ca.ECA.CHANDESTROY
+
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+    assert sum(ca.connection_counts().values()) == 0
+    assert ca.subscription_count(chid) == 0
+    assert ca.clear_subscription(evid) == ca.ECA.BADCHID
+    ca.destroy_context()
+
+
+def test_sharded_client():
+    names = ['catest', 'calong', 'cabo', 'castr', 'cawave', 'cawavec']
+    with ShardedClient(3) as client:
+        assert len(set(client.contexts)) == 3
+        assert client.shard_of('catest') == client.shard_of('catest')
+
+        chids = {}
+        for name in names:
+            status, chids[name] = client.create_channel(name)
+            assert status == ca.ECA.NORMAL
+        assert client.pend_io(5) == ca.ECA.NORMAL
+        assert sum(client.statistics()) == len(names)
+        # the calling thread is left without context
+        assert ca.current_context() is None
+
+        chid = chids['catest']
+        assert client.call(chid, ca.name, chid) == 'catest'
+        assert client.put(chid, 3.5) == ca.ECA.NORMAL
+
+        values = []
+        status, evid = client.create_subscription(chid, lambda epics_arg: values.append(epics_arg['value']))
+        assert status == ca.ECA.NORMAL
+        client.flush_io()
+
+        status, dbrvalue = client.get(chid)
+        assert status == ca.ECA.NORMAL
+        assert client.pend_io(5) == ca.ECA.NORMAL
+        assert dbrvalue.get() == 3.5
+
+        # the context of the calling thread is restored
+        status = ca.create_context(True)
+        context = ca.current_context()
+        assert client.put(chid, 4.5) == ca.ECA.NORMAL
+        client.flush_io()
+        assert ca.current_context() == context
+        ca.destroy_context()
+
+        time.sleep(1)
+        assert values[-1] == 4.5
+
+        # channels by a key, e.g. the IOC
+        with ShardedClient(2, assign=lambda name: 'ioc') as other:
+            assert other.shard_of('catest') == other.shard_of('cawave')
+
+        assert client.clear_channel(chid) == ca.ECA.NORMAL
+        assert client.clear_subscription(evid) == ca.ECA.BADCHID
+        assert client.get(chid) == (ca.ECA.BADCHID, None)
+
+    with pytest.raises(RuntimeError):
+        client.create_channel('catest')
+
+
+def test_context_object():
+    context = Context()
+    other = Context()
+    assert context.context is not None
+    assert ca.current_context() is None
+
+    with context:
+        assert ca.current_context() == context.context
+        with other:
+            assert ca.current_context() == other.context
+            # already attached
+            with other:
+                assert ca.current_context() == other.context
+            assert ca.current_context() == other.context
+        assert ca.current_context() == context.context
+        assert Context.current() == context
+    assert ca.current_context() is None
+
+    # the threads attach once and share the context
+    initialized = []
+    with context.executor(max_workers=2, initializer=initialized.append, initargs=(1,)) as executor:
+        contexts = list(executor.map(lambda i: ca.current_context(), range(20)))
+    assert set(contexts) == set([context.context])
+    assert 1 <= len(initialized) <= 2
+
+    with pytest.raises(RuntimeError):
+        ContextExecutor()
+
+    # a non preemptive context can neither be joined nor left, as it could not be joined again
+    results = {}
+    own = []
+    created = threading.Event()
+    done = threading.Event()
+
+    def non_preemptive():
+        ca.create_context(False)
+        own.append(ca.current_context())
+        created.set()
+        try:
+            with context:
+                pass
+        except RuntimeError:
+            results['refused'] = True
+        results['kept'] = ca.current_context() == own[0]
+        done.wait()
+        ca.destroy_context()
+
+    tid = threading.Thread(target=non_preemptive)
+    tid.start()
+    created.wait()
+    with pytest.raises(RuntimeError):
+        Context(context=own[0]).attach()
+    assert ca.current_context() is None
+    done.set()
+    tid.join()
+    assert results == {'refused': True, 'kept': True}
+
+    for item in (context, other):
+        item.close()
+        assert item.context is None
@@ -0,0 +1,106 @@
+from __future__ import print_function
+import threading
+import caffi.ca as ca
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def get_put_connect():
+    status, chid = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    status, missing = ca.create_channel('catest_missing')
+    assert status == ca.ECA.NORMAL
+
+    connected = ca.connect_async(chid)
+    never = ca.connect_async(missing)
+    assert ca.wait_all([connected], 5)
+    assert connected.result() == ca.ECA.NORMAL
+    # pend_io does not wait for the channel being waited by a future
+    assert ca.pend_io(1) == ca.ECA.NORMAL
+    # already connected
+    assert ca.connect_async(chid).result(0) == ca.ECA.NORMAL
+
+    futures = [ca.put_async(chid, i) for i in range(10)]
+    assert ca.wait_all(futures, 5)
+    assert [future.result() for future in futures] == [ca.ECA.NORMAL] * 10
+
+    future = ca.get_async(chid)
+    assert ca.wait_all([future], 5)
+    epics_arg = future.result()
+    assert epics_arg['status'] == ca.ECA.NORMAL
+    assert epics_arg['value'] == 9
+
+    assert not ca.wait_all([never], 0.1)
+    ca.clear_channel(missing)
+    assert never.result(0) == ca.ECA.CHANDESTROY
+
+    # requests pending when the channel is cleared
+    status, cleared = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    assert ca.wait_all([ca.connect_async(cleared)], 5)
+    futures = [ca.get_async(cleared), ca.put_async(cleared, 1), ca.put_many_async([cleared], [2])]
+    ca.clear_channel(cleared)
+    assert ca.wait_all(futures, 5)
+    assert futures[0].result()['status'] in (ca.ECA.NORMAL, ca.ECA.CHANDESTROY)
+    assert futures[1].result() in (ca.ECA.NORMAL, ca.ECA.CHANDESTROY)
+    assert futures[2].result()[0] in (ca.ECA.NORMAL, ca.ECA.CHANDESTROY)
+
+    # failures complete immediately
+    ca.clear_channel(chid)
+    assert ca.get_async(chid).result(0)['status'] == ca.ECA.BADCHID
+    assert ca.put_async(chid, 1).result(0) == ca.ECA.BADCHID
+    assert ca.connect_async(chid).result(0) == ca.ECA.BADCHID
+    ca.flush_io()
+
+
+def test_preemptive():
+    get_put_connect()
+
+
+def test_non_preemptive():
+    errors = []
+
+    def run():
+        try:
+            # create preemptive disabled context
+            status = ca.create_context(False)
+            assert status == ca.ECA.NORMAL
+            get_put_connect()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            ca.destroy_context()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    assert not errors
+
+
+def test_wait_without_context():
+    status, chid = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    future = ca.connect_async(chid)
+    results = []
+
+    def wait():
+        results.append(ca.wait_all([future], 5))
+        # waiting did not create a context
+        results.append(ca.current_context())
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    thread.join()
+    assert results == [True, None]
+
+    ca.clear_channel(chid)
+    ca.flush_io()
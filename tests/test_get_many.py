@@ -0,0 +1,88 @@
+from __future__ import print_function
+import time
+import caffi.ca as ca
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def create_channels(names):
+    chids = []
+    for name in names:
+        status, chid = ca.create_channel(name)
+        assert status == ca.ECA.NORMAL
+        chids.append(chid)
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    return chids
+
+
+def clear_channels(chids):
+    for chid in chids:
+        ca.clear_channel(chid)
+    ca.flush_io()
+
+
+def test_get_many():
+    names = ['catest', 'calong', 'cabo', 'castr', 'cawave', 'cawaves', 'cawaveuc']
+    values = [1.5, 3, 1, 'abc', [1, 2, 3], ['1', '2', '3'], [65, 66, 0]]
+    chids = create_channels(names)
+
+    statuses = ca.put_many(chids, values)
+    assert statuses == [ca.ECA.NORMAL] * len(chids)
+
+    result = ca.get_many(chids, count=3)
+    assert result.statuses == [ca.ECA.NORMAL] * len(chids)
+    assert result.values == values
+    assert all(isinstance(severity, ca.AlarmSeverity) for severity in result.severities)
+    assert all(timestamp > 0 for timestamp in result.timestamps)
+
+    result = ca.get_many(chids[-1:], use_bytes=True)
+    assert result.values[0][:2] == b'AB'
+
+    # failed channels do not affect the others
+    ca.clear_channel(chids[0])
+    result = ca.get_many(chids[:2])
+    assert result.statuses == [ca.ECA.BADCHID, ca.ECA.NORMAL]
+    assert result.values == [None, 3]
+    assert result.severities[0] == ca.AlarmSeverity.Invalid
+    assert result.timestamps[0] is None
+
+    clear_channels(chids[1:])
+
+
+def test_get_many_benchmark():
+    count = 10000
+    chids = create_channels(['catest'] * count)
+
+    # warm up so that both measurements use the cached channel plans
+    ca.get_many(chids)
+
+    start = time.time()
+    dbrvalues = []
+    for chid in chids:
+        status, dbrvalue = ca.get(chid, ca.DBR.TIME_DOUBLE)
+        dbrvalues.append(dbrvalue)
+    ca.pend_io(10)
+    values = [dbrvalue.get()['value'] for dbrvalue in dbrvalues]
+    looped = time.time() - start
+
+    start = time.time()
+    result = ca.get_many(chids, timeout=10)
+    bulk = time.time() - start
+    assert result.statuses == [ca.ECA.NORMAL] * count
+    assert result.values == values
+
+    print('%d scalar gets: looped get %.3fs, get_many %.3fs' % (count, looped, bulk))
+
+    clear_channels(chids)
@@ -0,0 +1,99 @@
+from __future__ import print_function
+import time
+import pytest
+import caffi.ca as ca
+from caffi.procpool import ProcessPool, _Ring
+
+pytest.importorskip('multiprocessing.shared_memory')
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def matches(value, expected):
+    # waveforms are compared by the elements written
+    if isinstance(expected, list):
+        return list(value[:len(expected)]) == expected
+    return value == expected
+
+
+def read_until(pool, latest, expected, timeout=5):
+    # keep the latest update of each name until all have the expected values
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        for update in pool.read(timeout=0.1):
+            latest[update.name] = update
+        if all(name in latest and matches(latest[name].value, value) for name, value in expected.items()):
+            return True
+    return False
+
+
+def test_process_pool():
+    names = ['catest', 'calong', 'castr', 'cawave', 'catest_missing']
+    connected, missing = ca.create_channels(['catest', 'castr', 'cawave'], 5)
+    assert not missing
+
+    with ProcessPool(names, workers=2, capacity=1 << 16, timeout=2) as pool:
+        assert pool.connected() == 4
+        assert [item['pid'] is not None for item in pool.statistics()] == [True, True]
+
+        # the current values
+        updates = pool.read(timeout=2)
+        time.sleep(0.5)
+        updates += pool.read()
+        assert set(update.name for update in updates) == set(names[:4])
+
+        # values differing from the previous run, so that the server posts updates
+        value = time.time() % 1000
+        ca.put(connected['catest'], value)
+        ca.put(connected['castr'], 'abc%d' % value)
+        ca.put(connected['cawave'], [value, 2, 3])
+        ca.flush_io()
+        latest = {}
+        assert read_until(pool, latest, {'catest': value, 'castr': 'abc%d' % value, 'cawave': [value, 2, 3]})
+        assert latest['catest'].timestamp > 0
+
+        # a crashed worker is restarted and sends the current values again
+        pool._workers[0].process.kill()
+        deadline = time.time() + 5
+        while not pool.check() and time.time() < deadline:
+            time.sleep(0.1)
+        assert pool.restarts == 1
+        assert pool.statistics()[0]['restarts'] == 1
+
+        ca.put(connected['catest'], value + 1)
+        ca.flush_io()
+        assert read_until(pool, latest, {'catest': value + 1}, 30)
+        assert sum(item['dropped'] for item in pool.statistics()) == 0
+
+
+def test_ring():
+    buf = memoryview(bytearray(_Ring.size(256) + 4096))
+    ring = _Ring(buf, 256)
+    ring.reset()
+    # the other side reads the capacity from the header, whatever the size of its mapping
+    assert _Ring(buf).capacity == 256
+
+    # records of 32 bytes wrap around the 256 bytes
+    for i in range(20):
+        assert ring.write(i, 0, 0, b'd', i, b'abcdefgh')
+        records = ring.read()
+        assert records == [(i, 0, 0, b'd', float(i), b'abcdefgh')]
+    assert ring.pending == 0
+
+    # a full ring drops the new records, records of 48 bytes from offset 128 leave 32 bytes unused at the end
+    written = 0
+    while ring.write(written, 0, 0, b's', 0, b'x' * 20):
+        written += 1
+    assert written == 4
+    assert ring.dropped == 1
+    assert [record[0] for record in ring.read(2)] == [0, 1]
+    assert [record[0] for record in ring.read()] == list(range(2, written))
@@ -0,0 +1,122 @@
+from __future__ import print_function
+import time
+import pytest
+import caffi.ca as ca
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def create_channels(names):
+    chids = []
+    for name in names:
+        status, chid = ca.create_channel(name)
+        assert status == ca.ECA.NORMAL
+        chids.append(chid)
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    return chids
+
+
+def clear_channels(chids):
+    for chid in chids:
+        ca.clear_channel(chid)
+    ca.flush_io()
+
+
+def test_put_many():
+    names = ['catest', 'calong', 'cabo', 'castr', 'cawave', 'cawaves']
+    values = [1.5, 3, 1, 'abc', [1, 2, 3], ['1', '2', '3']]
+    chids = create_channels(names)
+
+    statuses = ca.put_many(chids, values)
+    assert statuses == [ca.ECA.NORMAL] * len(chids)
+
+    dbrvalues = []
+    for chid in chids:
+        status, dbrvalue = ca.get(chid, count=3)
+        assert status == ca.ECA.NORMAL
+        dbrvalues.append(dbrvalue)
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    assert [dbrvalue.get() for dbrvalue in dbrvalues] == values
+
+    # a cleared channel fails without affecting the others
+    ca.clear_channel(chids[0])
+    statuses = ca.put_many(chids, values)
+    assert statuses == [ca.ECA.BADCHID] + [ca.ECA.NORMAL] * (len(chids) - 1)
+
+    # a value out of the range of the request type fails its group, the others are still written
+    statuses = ca.put_many(chids[1:3], [300, 'abc'], ca.DBR.CHAR)
+    assert statuses[0] == ca.ECA.BADTYPE
+
+    with pytest.raises(ValueError):
+        ca.put_many(chids[1:], [1])
+
+    clear_channels(chids[1:])
+
+
+def test_put_many_async():
+    names = ['catest', 'calong', 'cawave', 'catest']
+    values = [2.5, 4, [4, 5, 6], 3.5]
+    chids = create_channels(names)
+
+    future = ca.put_many_async(chids, values)
+    assert future.result(5) == [ca.ECA.NORMAL] * len(chids)
+
+    # put callback completes after the value has been processed
+    status, dbrvalue = ca.get(chids[0])
+    assert status == ca.ECA.NORMAL
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    assert dbrvalue.get() == 3.5
+
+    # channels that cannot be written complete immediately
+    ca.clear_channel(chids[1])
+    future = ca.put_many_async(chids[1:3], values[1:3])
+    assert future.result(5) == [ca.ECA.BADCHID, ca.ECA.NORMAL]
+
+    assert ca.put_many_async([], []).result() == []
+
+    with pytest.raises(ValueError):
+        ca.put_many_async(chids, values[:1])
+
+    clear_channels([chids[0], chids[2], chids[3]])
+
+
+def test_put_many_benchmark():
+    count = 10000
+    chids = create_channels(['catest'] * count)
+    values = [float(i) for i in range(count)]
+
+    # warm up so that both measurements use the cached channel plans
+    ca.put_many(chids, values)
+
+    start = time.time()
+    for chid, value in zip(chids, values):
+        ca.put(chid, value)
+    ca.flush_io()
+    looped = time.time() - start
+
+    start = time.time()
+    statuses = ca.put_many(chids, values)
+    bulk = time.time() - start
+    assert statuses == [ca.ECA.NORMAL] * count
+
+    print('%d scalar puts: looped put %.3fs, put_many %.3fs' % (count, looped, bulk))
+
+    clear_channels(chids)
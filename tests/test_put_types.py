@@ -1,4 +1,5 @@
 from __future__ import print_function
+import array
 import pytest
 import caffi.ca as ca
 
@@ -8,6 +9,29 @@ def setup_module(module):
     assert status == ca.ECA.NORMAL
 
 
+def put_get(name, input):
+    status, chid = ca.create_channel(name)
+    assert status == ca.ECA.NORMAL
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    status = ca.put(chid, input)
+    assert status == ca.ECA.NORMAL
+
+    ca.flush_io()
+
+    status, value = ca.get(chid, count=4)
+    assert status == ca.ECA.NORMAL
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    ca.clear_channel(chid)
+
+    return value.get()
+
+
 @pytest.mark.parametrize("name, input, expected", [
     ('cawaves', ['1', '2', '3', '4'], ['1', '2', '3']),
     ('cawaves', '1', ['1', '', '']),
@@ -23,12 +47,34 @@ def setup_module(module):
     ('catest',  1.23,         None),
     ('catest',  [1, 2, 3, 4], 1),
     ('catest',  '1.23',       1.23),
-    ('cawavec', '1.23',       [49, 46, 50, 51])])
+    ('cawavec', '1.23',       [49, 46, 50, 51]),
+    ('cawavec', b'12',        [49, 50, 0, 0]),
+    ('cawavec', bytearray(b'1234'), [49, 50, 51, 52]),
+    ('cawavec', memoryview(b'4321'), [52, 51, 50, 49])])
 def test_put_get(name, input, expected):
     if expected is None:
         expected = input
 
-    status, chid = ca.create_channel(name)
+    assert put_get(name, input) == expected
+
+
+@pytest.mark.parametrize("name, input", [
+    ('cawave',  array.array('d', [1, 2, 3, 4])),
+    ('cawave',  array.array('i', [1, 2, 3, 4])),
+    ('cawavef', array.array('f', [1, 2, 3, 4])),
+    ('cawaveh', array.array('h', [1, 2, 3, 4])),
+    ('cawavel', array.array('i', [1, 2, 3, 4])),
+    ('cawavel', memoryview(array.array('i', [1, 2, 3, 4])))])
+def test_put_buffer(name, input):
+    assert put_get(name, input) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("input, expected", [
+    ('abcd',     b'abcd\x00'),
+    (b'ab',      b'ab\x00'),
+    (b'abcdefg', b'abcde')])
+def test_put_get_bytes(input, expected):
+    status, chid = ca.create_channel('cawavec')
     assert status == ca.ECA.NORMAL
 
     status = ca.pend_io(10)
@@ -39,7 +85,7 @@ def test_put_get(name, input, expected):
 
     ca.flush_io()
 
-    status, value = ca.get(chid, count=4)
+    status, value = ca.get(chid, count=len(expected), use_bytes=True)
     assert status == ca.ECA.NORMAL
 
     status = ca.pend_io(10)
@@ -49,6 +95,27 @@ def test_put_get(name, input, expected):
 
     ca.clear_channel(chid)
 
+
+@pytest.mark.parametrize("name, dtype", [
+    ('cawave',  'float64'),
+    ('cawave',  '>f8'),
+    ('cawave',  'int32'),
+    ('cawavef', 'float32'),
+    ('cawavef', 'float64'),
+    ('cawaveh', 'int16'),
+    ('cawavel', 'int32'),
+    ('cawavel', 'float64'),
+    ('cawavec', 'uint8')])
+def test_put_numpy(name, dtype):
+    numpy = pytest.importorskip('numpy')
+
+    # contiguous array
+    assert put_get(name, numpy.arange(1, 5, dtype=dtype)) == [1, 2, 3, 4]
+
+    # strided array
+    assert put_get(name, numpy.arange(1, 9, dtype=dtype)[::2] // 2 + 1) == [1, 2, 3, 4]
+
+
 def teardown_module(module):
     # destroy context
     ca.destroy_context()
@@ -0,0 +1,88 @@
+from __future__ import print_function
+import subprocess
+import sys
+import time
+import pytest
+import caffi.ca as ca
+from caffi.shmtable import TablePublisher, TableReader, _SEQUENCE
+
+pytest.importorskip('multiprocessing.shared_memory')
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def wait_for(reader, name, value, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        update = reader.get(name)
+        if update is not None and update.value == value:
+            return update
+        time.sleep(0.01)
+    return None
+
+
+READER = '''
+import sys
+from caffi.shmtable import TableReader
+reader = TableReader(sys.argv[1])
+print(reader.get('catest').value)
+reader.close()
+'''
+
+
+def test_latest_value_table():
+    names = ['catest', 'castr', 'cawave', 'catest_missing']
+    connected, missing = ca.create_channels(['catest', 'castr'], 5)
+    assert not missing
+
+    with TablePublisher('caffi-test-table', names, value_size=16) as publisher:
+        reader = TableReader('caffi-test-table')
+        assert reader.names() == names
+        with pytest.raises(KeyError):
+            reader.get('unknown')
+
+        value = time.time() % 1000
+        ca.put(connected['catest'], value)
+        ca.put(connected['castr'], 'abc%d' % value)
+        ca.flush_io()
+        update = wait_for(reader, 'catest', value)
+        assert update is not None and update.timestamp > 0
+        assert wait_for(reader, 'castr', 'abc%d' % value) is not None
+
+        # never connected
+        assert reader.get('catest_missing') is None
+        # truncated to two doubles
+        assert len(reader.get('cawave').value) == 2
+        assert publisher.truncated >= 1
+
+        # another process reads without CA
+        output = subprocess.check_output([sys.executable, '-c', READER, publisher.table])
+        assert float(output.split()[-1]) == value
+
+        reader.close()
+
+    # the table is removed with the publisher
+    with pytest.raises(Exception):
+        TableReader('caffi-test-table')
+
+
+def test_dead_publisher():
+    with TablePublisher('caffi-test-dead', ['catest_missing']) as publisher:
+        reader = TableReader('caffi-test-dead', timeout=0.1)
+        assert reader.get('catest_missing') is None
+
+        # as if the publisher had died in the middle of a write
+        offset = reader._offsets['catest_missing']
+        _SEQUENCE.pack_into(publisher._shm.buf, offset, 1)
+        with pytest.raises(RuntimeError):
+            reader.get('catest_missing')
+        reader.close()
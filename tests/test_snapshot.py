@@ -0,0 +1,83 @@
+from __future__ import print_function
+import time
+import pytest
+import caffi.ca as ca
+from caffi.snapshot import Snapshot
+
+numpy = pytest.importorskip('numpy')
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def create_channels(names):
+    chids = []
+    for name in names:
+        status, chid = ca.create_channel(name)
+        assert status == ca.ECA.NORMAL
+        chids.append(chid)
+
+    status = ca.pend_io(10)
+    assert status == ca.ECA.NORMAL
+
+    return chids
+
+
+def clear_channels(chids):
+    for chid in chids:
+        ca.clear_channel(chid)
+    ca.flush_io()
+
+
+def test_snapshot():
+    chids = create_channels(['catest', 'calong', 'cabo'])
+
+    with Snapshot(chids, ca.DBR.DOUBLE) as snapshot:
+        values = snapshot.values
+        for i in range(3):
+            assert ca.put_many(chids, [1.5 + i, 3 + i, i % 2]) == [ca.ECA.NORMAL] * 3
+            time.sleep(0.1)
+
+            assert snapshot.acquire(2) == ca.ECA.NORMAL
+            assert snapshot.values.tolist() == [1.5 + i, 3 + i, i % 2]
+            assert snapshot.statuses.tolist() == [ca.ECA.NORMAL] * 3
+            assert (snapshot.timestamps > 0).all()
+            # the same buffers are reused
+            assert snapshot.values is values
+
+    clear_channels(chids)
+
+
+def test_snapshot_waveform():
+    chids = create_channels(['cawave', 'catest'])
+    # a channel with connection callback does not affect pend_io
+    status, missing = ca.create_channel('catest_missing', callback=lambda epics_arg: None)
+    assert status == ca.ECA.NORMAL
+    chids.append(missing)
+
+    assert ca.put(chids[0], [1, 2, 3]) == ca.ECA.NORMAL
+    assert ca.put(chids[1], 4) == ca.ECA.NORMAL
+    ca.flush_io()
+    time.sleep(0.1)
+
+    snapshot = Snapshot(chids, ca.DBR.LONG, 3)
+    # left over from a previous acquisition
+    snapshot.values[1] = 9
+    assert snapshot.acquire(2) == ca.ECA.NORMAL
+    assert snapshot.values.shape == (3, 3)
+    assert snapshot.values[0].tolist() == [1, 2, 3]
+    # the count is limited to the native element count, the other elements are cleared
+    assert snapshot.values[1].tolist() == [4, 0, 0]
+    assert snapshot.counts.tolist() == [3, 1, 0]
+    assert snapshot.statuses.tolist() == [ca.ECA.NORMAL, ca.ECA.NORMAL, ca.ECA.DISCONN]
+    snapshot.close()
+
+    clear_channels(chids)
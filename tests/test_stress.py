@@ -0,0 +1,136 @@
+from __future__ import print_function
+import threading
+import time
+import caffi.ca as ca
+
+NAMES = ['catest', 'calong', 'cabo', 'cacalc', 'cawave', 'cawavef']
+THREADS = 16
+ROUNDS = 50
+
+
+def setup_module(module):
+    # create explicitly a preemptive enabled context
+    # so that it can attached in other threads
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+    global ctx
+    ctx = ca.current_context()
+
+    global shared
+    shared, missing = ca.create_channels(NAMES, 5)
+    assert not missing
+
+
+def teardown_module(module):
+    for chid in shared.values():
+        ca.clear_channel(chid)
+    ca.flush_io()
+    ca.destroy_context()
+
+
+def worker(index, results, errors):
+    try:
+        status = ca.attach_context(ctx)
+        assert status == ca.ECA.NORMAL
+
+        lock = threading.Lock()
+        counts = {'get': 0, 'put': 0, 'event': 0}
+
+        def count(kind):
+            def callback(epics_arg):
+                with lock:
+                    counts[kind] += 1
+            return callback
+
+        issued = {'get': 0, 'put': 0}
+        for i in range(ROUNDS):
+            # shared channels, read and written by all threads
+            for name, chid in shared.items():
+                assert ca.get(chid, callback=count('get'))[0] == ca.ECA.NORMAL
+                issued['get'] += 1
+                if name == 'catest':
+                    assert ca.put(chid, i, callback=count('put')) == ca.ECA.NORMAL
+                    issued['put'] += 1
+            ca.get_many(list(shared.values()), timeout=5)
+
+            # subscriptions of shared channels, created and cleared while others receive updates
+            status, evid = ca.create_subscription(shared['catest'], count('event'))
+            assert status == ca.ECA.NORMAL
+            ca.flush_io()
+            if i % 2:
+                assert ca.clear_subscription(evid) == ca.ECA.NORMAL
+
+            # private channels, created and cleared with pending requests and subscriptions
+            status, chid = ca.create_channel(NAMES[(index + i) % len(NAMES)])
+            assert status == ca.ECA.NORMAL
+            if ca.connect_async(chid).result(5) == ca.ECA.NORMAL:
+                ca.get(chid, callback=count('get'))
+                ca.create_subscription(chid, count('event'))
+            ca.flush_io()
+            assert ca.clear_channel(chid) == ca.ECA.NORMAL
+
+        # every callback of the shared channels arrives exactly once
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            with lock:
+                if counts['get'] >= issued['get'] and counts['put'] == issued['put']:
+                    break
+            time.sleep(0.05)
+        results[index] = (issued, dict(counts))
+        ca.detach_context()
+    except Exception as e:
+        errors.append(e)
+        raise
+
+
+def test_stress():
+    results = [None] * THREADS
+    errors = []
+    threads = [threading.Thread(target=worker, args=(index, results, errors)) for index in range(THREADS)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print('%d threads done in %.2f s' % (THREADS, time.time() - start))
+
+    assert not errors
+    for issued, counts in results:
+        # the private channels may lose their get callback when cleared
+        assert issued['get'] <= counts['get'] <= issued['get'] + ROUNDS
+        assert counts['put'] == issued['put']
+        assert counts['event'] >= ROUNDS
+
+    # the subscriptions cleared by the threads are gone, the others remain
+    assert ca.subscription_count(shared['catest']) == THREADS * ROUNDS // 2
+    for name, chid in shared.items():
+        assert ca.state(chid) == ca.ChannelState.CONN
+    assert ca.connection_counts()[ca.ChannelState.CONN] == len(NAMES)
+
+
+def test_concurrent_clear():
+    for round in range(20):
+        status, chid = ca.create_channel('catest')
+        assert status == ca.ECA.NORMAL
+        for i in range(5):
+            ca.create_subscription(chid, None)
+        barrier = threading.Event()
+        statuses = []
+
+        def clear():
+            ca.attach_context(ctx)
+            barrier.wait()
+            statuses.append(ca.clear_channel(chid))
+            ca.detach_context()
+
+        threads = [threading.Thread(target=clear) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        barrier.set()
+        for thread in threads:
+            thread.join()
+
+        assert statuses.count(ca.ECA.NORMAL) == 1
+        assert statuses.count(ca.ECA.BADCHID) == 7
+    ca.flush_io()
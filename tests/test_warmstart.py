@@ -0,0 +1,63 @@
+from __future__ import print_function
+import json
+import time
+import caffi.ca as ca
+from caffi.warmstart import WarmStartCache
+
+
+def setup_module(module):
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # destroy context
+    ca.destroy_context()
+
+
+def test_warmstart(tmpdir):
+    path = str(tmpdir.join('servers.json'))
+
+    cache = WarmStartCache(path)
+    assert cache.load() == 0
+
+    connected, missing = ca.create_channels(['catest', 'calong'], 5)
+    assert cache.record() >= 2
+    cache.save()
+
+    host, port = ca.host_name(connected['catest']).rsplit(':', 1)
+
+    # a fresh cache learns the servers from the file
+    cache = WarmStartCache(path)
+    assert cache.load() >= 2
+    assert 'catest' in cache
+    assert cache.servers(['catest', 'calong', 'unknown']) == [(host, int(port))]
+
+    environ = {'EPICS_CA_ADDR_LIST': '10.0.0.255'}
+    assert cache.configure(['catest'], environ=environ) == [host]
+    assert environ == {'EPICS_CA_ADDR_LIST': '%s 10.0.0.255' % host}
+
+    environ = {}
+    assert cache.configure(['catest'], mode='name_servers', exclusive=True, environ=environ) == ['%s:%s' % (host, port)]
+    assert environ == {'EPICS_CA_NAME_SERVERS': '%s:%s' % (host, port), 'EPICS_CA_AUTO_ADDR_LIST': 'NO'}
+
+    # malformed and expired entries are dropped
+    with open(path, 'w') as f:
+        json.dump({'version': 1, 'entries': {
+            'catest': [host, int(port), time.time()],
+            'calong': [host, int(port), time.time() - 3600],
+            'cabo': [host, 'port', time.time()],
+            'castr': [host],
+        }}, f)
+    cache = WarmStartCache(path, max_age=60)
+    assert cache.load() == 1
+    assert 'catest' in cache and 'calong' not in cache
+
+    with open(path, 'w') as f:
+        f.write('{')
+    assert cache.load() == 0
+
+    for chid in connected.values():
+        ca.clear_channel(chid)
+    ca.flush_io()
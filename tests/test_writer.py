@@ -0,0 +1,159 @@
+from __future__ import print_function
+import threading
+import time
+import caffi.ca as ca
+from caffi.writer import CoalescingWriter, PipelinedWriter
+
+
+def setup_module(module):
+    global chid
+    # create preemptive enabled context
+    status = ca.create_context(True)
+    assert status == ca.ECA.NORMAL
+
+    # create channel
+    status, chid = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+
+    # wait for connection
+    status = ca.pend_io(2)
+    assert status == ca.ECA.NORMAL
+
+
+def teardown_module(module):
+    # clear channel
+    ca.clear_channel(chid)
+    ca.flush_io()
+
+    # destroy context
+    ca.destroy_context()
+
+
+def read_value():
+    status, dbrvalue = ca.get(chid)
+    assert status == ca.ECA.NORMAL
+
+    status = ca.pend_io(2)
+    assert status == ca.ECA.NORMAL
+
+    return dbrvalue.get()
+
+
+def test_coalescing_explicit_flush():
+    writer = CoalescingWriter(rate=None)
+    for i in range(100):
+        writer.submit(chid, i)
+    assert writer.pending() == 1
+
+    assert writer.flush_io() == 1
+    assert writer.pending() == 0
+    assert writer.submitted == 100
+    assert writer.superseded == 99
+    assert writer.written == 1
+    assert writer.failed == 0
+
+    # nothing left to write
+    assert writer.flush_io() == 0
+
+    assert read_value() == 99
+
+
+def test_coalescing_background_flush():
+    with CoalescingWriter(rate=100) as writer:
+        for i in range(10000):
+            writer.submit(chid, i)
+
+    assert writer.submitted == 10000
+    assert writer.written + writer.superseded == 10000
+    assert writer.flushes == writer.written
+
+    assert read_value() == 9999
+
+
+def test_coalescing_background_errors():
+    with CoalescingWriter(rate=100) as writer:
+        # an invalid value makes the flush raise
+        writer.submit(chid, 'invalid')
+        deadline = time.time() + 2
+        while writer.errors == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert writer.errors == 1
+        assert writer.failed == 1
+
+        # the flusher carries on
+        writer.submit(chid, 98)
+        deadline = time.time() + 2
+        while writer.written == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert writer.written == 1
+
+    assert read_value() == 98
+
+
+def test_writers_require_context():
+    errors = []
+
+    def create():
+        for create_writer in (lambda: CoalescingWriter(rate=10), PipelinedWriter):
+            try:
+                create_writer()
+            except RuntimeError as e:
+                errors.append(e)
+
+    # a thread without context
+    thread = threading.Thread(target=create)
+    thread.start()
+    thread.join()
+    assert len(errors) == 2
+
+
+def test_pipelined():
+    completions = []
+    writer = PipelinedWriter(window=4)
+    for i in range(1000):
+        writer.submit(chid, float(i), callback=completions.append)
+    assert writer.wait(10)
+
+    statistics = writer.statistics()
+    assert statistics['completed'] == 1000
+    assert statistics['failed'] == 0
+    assert statistics['outstanding'] == 0
+    assert statistics['queued'] == 0
+    assert statistics['latency_max'] >= statistics['latency_mean'] > 0
+
+    assert len(completions) == 1000
+    assert all(epics_arg['status'] == ca.ECA.NORMAL for epics_arg in completions)
+
+    assert read_value() == 999
+
+
+def test_pipelined_per_channel():
+    writer = PipelinedWriter(window=1, group_by='channel')
+    for i in range(100):
+        writer.submit(chid, float(i))
+    assert writer.wait(10)
+    assert writer.statistics()['completed'] == 100
+
+    assert read_value() == 99
+
+
+def test_pipelined_regroup():
+    status, late = ca.create_channel('catest')
+    assert status == ca.ECA.NORMAL
+    writer = PipelinedWriter(window=4)
+
+    # not connected yet, the put fails, and the group is looked up again once connected
+    failures = []
+    writer.submit(late, 1., ca.DBR.DOUBLE, callback=failures.append)
+    assert writer.wait(1)
+    assert len(failures) == 1 and failures[0]['status'] != ca.ECA.NORMAL
+    disconnected = writer._group(late)
+
+    assert ca.pend_io(2) == ca.ECA.NORMAL
+    assert writer._group(late) == ca.host_name(late) != disconnected
+    writer.submit(late, 2.)
+    assert writer.wait(5)
+    assert writer.statistics()['completed'] == 1
+
+    ca.clear_channel(late)
+    ca.flush_io()